@@ -0,0 +1,25 @@
+class Agent:
+    """Base class of the agents of the model, a compact replacement for mesa's Agent.
+
+    The agents only hold the attributes declared in the __slots__ of their classes, without a
+    per instance __dict__. Every subclass must therefore declare __slots__ for the attributes
+    it sets.
+    """
+
+    __slots__ = ("unique_id", "model", "pos")
+
+    def __init__(self, unique_id, model):
+        self.unique_id = unique_id
+        self.model = model
+        self.pos = None
+
+    def step(self):
+        """A single step of the agent. """
+        pass
+
+    def advance(self):
+        pass
+
+    @property
+    def random(self):
+        return self.model.random
@@ -1,31 +1,35 @@
-import random
-import uuid
-import numpy as np
-
-from mesa import Agent
+from agents.agent import Agent
 from agents.cognitive_agents.victimAgent import PossibleVictim
-from agents.environmental_agents import GeneratorLoc
-from agents.environmental_agents.CrimeAttractor import AttractorLoc, CrimeAttractor
+from agents.environmental_agents.CrimeAttractor import CrimeAttractor
+from model.distance import manhattan
 
 
 class PossibleOffender(Agent):
     """These agents commit crimes depending on internal and external factors and intensities. """
 
+    __slots__ = ("step_random", "CRIMINAL_PREFERENCE", "criminal_fulfillment", "VISIBILITY",
+                 "AREA_PREFERENCE")
+
     def __init__(self, unique_id, model, max_criminal_preference):
         super().__init__(unique_id, model)
 
+        # Random number streams of the model for the internal levels of the offenders, and for
+        # their decisions with every step.
+        init_random = model.streams.stream("offender.init")
+        self.step_random = model.streams.stream("offender.step")
+
         # Level of criminal fulfillment with which this agent feels satisfied.
-        self.CRIMINAL_PREFERENCE = round(random.uniform(0, max_criminal_preference), 3)
+        self.CRIMINAL_PREFERENCE = round(init_random.uniform(0, max_criminal_preference), 3)
 
         # The greater the difference between CRIMINAL_PREFERENCE and the criminal_fulfillment,
         # the higher the chances the offender will commit a crime.
-        self.criminal_fulfillment = round(random.uniform(0, 1), 3)
+        self.criminal_fulfillment = round(init_random.uniform(0, 1), 3)
 
         # The extent to which this agent can look around.
         self.VISIBILITY = 5
 
         # Preference the agent has for criminal areas.
-        self.AREA_PREFERENCE = round(random.uniform(0, 1), 3)
+        self.AREA_PREFERENCE = round(init_random.uniform(0, 1), 3)
 
     def get_surr_pos(self, pos, visibility=1):
         """Get the positions surrounding pos given the visibility, 1 by default"""
@@ -33,27 +37,25 @@ class PossibleOffender(Agent):
 
     def get_surr_crime(self):
         """Get the visible surrounding criminal area positions
-            :return List of AttractorLoc and GeneratorLoc agents. """
-
-        surr_pos = self.get_surr_pos(self.pos, self.VISIBILITY)
-        cell_contents = self.model.grid.get_cell_list_contents(surr_pos)
-        criminal_area_cell_contents = [agent for agent in cell_contents if
-                                       (isinstance(agent, AttractorLoc) or
-                                        isinstance(agent, GeneratorLoc))]
+            :return List of positions with a criminal reputation. """
+        return self.model.crime_field.get_crime_positions(self.pos, self.VISIBILITY)
 
-        return criminal_area_cell_contents
+    def count_surr_crime(self):
+        """Return the number of visible surrounding criminal area positions. """
+        return self.model.crime_field.window_sums(self.pos, self.VISIBILITY)[0]
 
-    def get_min_dist_to_crime_pos(self, surr_crime):
+    def get_min_dist_to_crime_pos(self):
         """Returns the minimum distance and the position of the nearest criminal position. """
-        crime_dist = [(self.evaluate_distance(self.pos, surr_pos.position), surr_pos.position)
-                      for surr_pos in surr_crime]
-        return min(crime_dist)
-
-    def evaluate_distance(self, a, b):
-        """ Calculate the manhattan distance between two positions a and b on the grid. """
-        return np.abs(np.array(a) - np.array(b)).sum()
+        # The nearest criminal position in the grid is visible if it is within the visibility,
+        # otherwise look for the nearest of the visible ones.
+        dist, crime_pos = self.model.crime_field.get_nearest_crime(self.pos)
+        if dist <= self.VISIBILITY:
+            return dist, crime_pos
+        surr_crime = self.get_surr_crime()
+        self.model.instrumentation.count("distance_evaluations", len(surr_crime))
+        return min((manhattan(self.pos, surr_pos), surr_pos) for surr_pos in surr_crime)
 
-    def get_criminal_motive_intensity(self, surr_crime):
+    def get_criminal_motive_intensity(self, n_surr_crime):
         """This is the criminal motive intensity to commit a crime.
         The relationships are the following:
             high criminal preference & low criminal fulfillment = most likely to commit crime
@@ -72,7 +74,7 @@ class PossibleOffender(Agent):
         # Take into consideration the preference this agent has for criminal areas.
         # If there is no surrounding crime, decrease the criminal motive intensity proportionally
         # to their preference to commit crimes in criminal areas.
-        if not surr_crime:
+        if not n_surr_crime:
             criminal_motive_intensity -= criminal_motive_intensity * self.AREA_PREFERENCE
 
         else:
@@ -83,7 +85,7 @@ class PossibleOffender(Agent):
             # Get a list of all the distances and positions of surrounding crime and select the
             # nearest crime position
 
-            min_dist_crime = self.get_min_dist_to_crime_pos(surr_crime)
+            min_dist_crime = self.get_min_dist_to_crime_pos()
 
             # Decrease the criminal motive intensity depending on the preference this agent
             # has for criminal areas and the distance from the criminal areas.
@@ -97,13 +99,12 @@ class PossibleOffender(Agent):
         """Returns the closest PossibleVictim from the offender"""
 
         # Get surrounding possible victims
-        surr_pos = self.get_surr_pos(self.pos, self.VISIBILITY)
-        cell_contents = self.model.grid.get_cell_list_contents(surr_pos)
-        surr_victims = [agent for agent in cell_contents if isinstance(agent, PossibleVictim)]
+        surr_victims = self.model.grid.get_typed_neighbors(self.pos, PossibleVictim, self.VISIBILITY)
 
         target = None
         if surr_victims:
-            dist_victims = [(self.evaluate_distance(self.pos, v.pos), v) for v in surr_victims]
+            self.model.instrumentation.count("distance_evaluations", len(surr_victims))
+            dist_victims = [(manhattan(self.pos, v.pos), v) for v in surr_victims]
             target = min(dist_victims, key=lambda x: x[0])[1]
         return target
 
@@ -114,14 +115,13 @@ class PossibleOffender(Agent):
 
         # Decrease the criminal fulfillment, but not by as much as you would decrease it
         # by if the agent were not chasing a victim.
-        decrease_factor = random.uniform(0, 0.01)
+        decrease_factor = self.step_random.uniform(0, 0.01)
         self.criminal_fulfillment -= (self.criminal_fulfillment * decrease_factor)
 
         # Move which results in the smallest distance from the target.
         next_moves = self.get_surr_pos(self.pos)
-        moves_target_dist = [(self.evaluate_distance(move, target.pos), move) for move
-                             in next_moves]
-        next_move = min(moves_target_dist)[1]
+        self.model.instrumentation.count("distance_evaluations", len(next_moves))
+        next_move = min((manhattan(move, target.pos), move) for move in next_moves)[1]
         self.model.grid.move_agent(self, next_move)
 
         if target.pos == self.pos:
@@ -132,41 +132,41 @@ class PossibleOffender(Agent):
         coincide in the same location. """
 
         # Remove this victim agent from the simulation.
+        target.leave_aggregates()
         self.model.grid._remove_agent(self.pos, target)
         self.model.schedule.remove(target)
 
         # Increase the criminal fulfillment of this offender
-        fulfillment_increase = random.uniform(0.4, 1)
+        fulfillment_increase = self.step_random.uniform(0.4, 1)
         self.criminal_fulfillment += fulfillment_increase
 
         # Record this crime in the model and add a crime attractor.
         self.model.increment_crimes()
-        CrimeAttractor(uuid.uuid4(), self.model, self.pos, self.model.hotspot_rad)
+        CrimeAttractor(self.model.next_id(), self.model, self.pos, self.model.hotspot_rad)
 
-    def move_towards_crime_area(self, surr_crime):
+    def move_towards_crime_area(self):
         """Move towards the nearest crime area, given the visibility of the agent. """
 
         # Get the min distance from the agent to a surrounding criminal position.
-        min_crime_dist = self.get_min_dist_to_crime_pos(surr_crime)
+        min_crime_dist = self.get_min_dist_to_crime_pos()
 
         # Determine the next move based on the resulting distance from that move to the nearest
         # criminal position.
         next_moves = self.get_surr_pos(self.pos)
         crime_dist, crime_pos = min_crime_dist
 
-        move_crime_dist = [(self.evaluate_distance(move, crime_pos), move) for move in
-                           next_moves]
-        next_move = min(move_crime_dist)[1]
+        self.model.instrumentation.count("distance_evaluations", len(next_moves))
+        next_move = min((manhattan(move, crime_pos), move) for move in next_moves)[1]
         self.model.grid.move_agent(self, next_move)
 
     def random_move(self):
         """Move to a random location on the grid and decrease the criminal fulfillment."""
         # Decrease the criminal fulfilment
-        decrease_factor = random.uniform(0, 0.02)
+        decrease_factor = self.step_random.uniform(0, 0.02)
         self.criminal_fulfillment -= decrease_factor
 
         next_moves = self.get_surr_pos(self.pos)
-        next_move = self.random.choice(next_moves)
+        next_move = self.step_random.choice(next_moves)
         self.model.grid.move_agent(self, next_move)
 
     def step(self):
@@ -178,11 +178,11 @@ class PossibleOffender(Agent):
             - continue luring the area.
          """
 
-        surr_crime = self.get_surr_crime()
-        criminal_motive_intensity = self.get_criminal_motive_intensity(surr_crime)
+        n_surr_crime = self.count_surr_crime()
+        criminal_motive_intensity = self.get_criminal_motive_intensity(n_surr_crime)
 
-        sample_probability_motivation = round(random.uniform(0, 1), 3)
-        sample_probability_opportunity = round(random.uniform(0, 1), 3)
+        sample_probability_motivation = round(self.step_random.uniform(0, 1), 3)
+        sample_probability_opportunity = round(self.step_random.uniform(0, 1), 3)
         target = self.get_target()
 
         # If the criminal motive intensity of the agent is high enough,
@@ -196,12 +196,12 @@ class PossibleOffender(Agent):
                 self.random_move()
         else:
             # If the criminal motive intensity is not high enough
-            sample_probability = round(random.uniform(0, 1), 3)
+            sample_probability = round(self.step_random.uniform(0, 1), 3)
 
             # If the preference towards criminal areas is high enough and there is a criminal
             # area within the visibility of the agent, move towards the nearest criminal area,
             # otherwise move randomly about the grid.
-            if self.AREA_PREFERENCE > sample_probability and surr_crime:
-                self.move_towards_crime_area(surr_crime)
+            if self.AREA_PREFERENCE > sample_probability and n_surr_crime:
+                self.move_towards_crime_area()
             else:
                 self.random_move()
\ No newline at end of file
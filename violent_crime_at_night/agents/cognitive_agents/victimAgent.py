@@ -1,12 +1,8 @@
 import operator
-import random
 import statistics
-import numpy as np
 
-from mesa import Agent
-from agents.environmental_agents.CrimeAttractor import AttractorLoc
-from agents.environmental_agents.CrimeGenerator import GeneratorLoc
-from agents.environmental_agents.lightAgent import Light
+from agents.agent import Agent
+from model.distance import chebyshev, manhattan
 
 
 class SafeLocation(Agent):
@@ -14,6 +10,9 @@ class SafeLocation(Agent):
     Safe locations for the agents. Each agent has an associated safe location.
     The safe location must be removed when the agent has reached it.
     """
+
+    __slots__ = ()
+
     def __init__(self, unique_id, model):
         super().__init__(unique_id, model)
 
@@ -29,23 +28,33 @@ class PossibleVictim(Agent):
     their destination.
     """
 
+    __slots__ = ("goal", "goal_pos", "is_safe", "_fear", "step_random", "PERCEPTION_CAPABILITIES",
+                 "FEAR_SUSCEPTIBILITY", "ENVIRONMENTAL_INFLUENCE", "VISIBILITY",
+                 "SAFE_AREA_PERIMETER", "LIGHT_PREFERENCE")
+
     def __init__(self, unique_id, model, goal):
         super().__init__(unique_id, model)
 
+        # Random number streams of the model for the internal levels of the victims, and for
+        # their decisions with every step.
+        init_random = model.streams.stream("victim.init")
+        self.step_random = model.streams.stream("victim.step")
+
         # This is the destination of the agent - its home location.
         self.goal = goal
         self.goal_pos = goal.pos
         self.is_safe = False  # Indicates whether the agent has reached the goal location.
 
         # Represents the emotional state of fear of the agent - initially the agent feels completly safe.
-        self.fear = 0
+        self._fear = 0
+        model.aggregates.add("victims", 1)
 
         # The ability this victim has to recognise and evaluate the environment accurately.
-        self.PERCEPTION_CAPABILITIES = round(random.uniform(0, 1), 3)
+        self.PERCEPTION_CAPABILITIES = round(init_random.uniform(0, 1), 3)
 
         # Represents how scared the agent gets generally - how much or how little its
         # fear is affected when in dangerous situations.
-        self.FEAR_SUSCEPTIBILITY = round(random.uniform(0, 1), 3)
+        self.FEAR_SUSCEPTIBILITY = round(init_random.uniform(0, 1), 3)
 
         # Represents to what extent the agent is influenced by its surroundings,
         # by keeping in mind their perception capabilities and their fear susceptibility.
@@ -58,32 +67,35 @@ class PossibleVictim(Agent):
         self.SAFE_AREA_PERIMETER = 4
 
         # Represents the preference this agent has for the illuminance on the street
-        self.LIGHT_PREFERENCE = round(random.uniform(0, 1), 3)
+        self.LIGHT_PREFERENCE = round(init_random.uniform(0, 1), 3)
+
+    @property
+    def fear(self):
+        return self._fear
+
+    @fear.setter
+    def fear(self, fear):
+        # Keep the sum of the fear of the victims in the model up to date.
+        self.model.aggregates.add("fear", fear - self._fear)
+        self._fear = fear
 
     def get_surr_pos(self, pos, visibility=1):
         """Get the positions surrounding pos given the visibility, 1 by default"""
         return self.model.grid.get_neighborhood(pos, moore=True, include_center=False, radius=visibility)
 
-    def evaluate_distance(self, a, b):
-        """Evaluate the manhattan distance between points a and b on the grid"""
-        return np.abs(np.array(a) - np.array(b)).sum()
-
     def familiar_area(self):
         """Returns True if the agent is familiar with the area
                 - the agent's visibility allows the perception of the
                 perimeter of its safe location.
          False otherwise. """
-        familiar_area = self.get_surr_pos(self.goal_pos, visibility=self.SAFE_AREA_PERIMETER)
-        surr_curr_pos = self.get_surr_pos(self.pos, visibility=self.VISIBILITY)
-
-        if list(set(familiar_area) & set(surr_curr_pos)):
-            return True
-        else:
-            return False
+        # The perimeter of the safe location and the surroundings of the agent overlap
+        # if the moore neighbourhoods of both positions share a position.
+        return chebyshev(self.pos, self.goal_pos) <= self.SAFE_AREA_PERIMETER + self.VISIBILITY
 
     def move_towards_safe_location(self):
         """Move towards the safe location """
-        curr_dist = self.evaluate_distance(self.pos, self.goal_pos)
+        curr_dist = manhattan(self.pos, self.goal_pos)
+        self.model.instrumentation.count("distance_evaluations")
         self.move(curr_dist, self.goal_pos, 'closer')
 
     def move_away_from_danger(self, surr_danger):
@@ -96,10 +108,6 @@ class PossibleVictim(Agent):
         - the highest incident illuminance
         """
 
-        def find_move_pair(tuple_list, search):
-            """Find the search item in the list of tuples. """
-            return [item for item in tuple_list if item[1] == search]
-
         # List of possible next moves.
         next_moves = self.model.grid.get_neighborhood(self.pos, moore=True, include_center=False, radius=1)
 
@@ -109,19 +117,16 @@ class PossibleVictim(Agent):
         moves_reps = self.moves_according_to_crime_rep(next_moves, surr_danger)
         moves_light = self.moves_according_to_light(next_moves)
 
-        move_tradeoff = []
-        for (dist, move) in moves_goal_dist:
-            move_goal_dist_idx = moves_goal_dist.index((dist, move)) + 1
-            move_min_crime_dists_idx = moves_min_crime_dists.index(find_move_pair(moves_min_crime_dists, move)[0]) + 1
-            move_reps_idx = moves_reps.index(find_move_pair(moves_reps, move)[0]) + 1
-            move_light_idx = moves_light.index(find_move_pair(moves_light, move)[0]) + 1
-
-            idx_sum = move_goal_dist_idx + move_reps_idx + move_min_crime_dists_idx + move_light_idx
-            move_tradeoff.append((idx_sum, move))
+        # Sum the position of each move in each of the ordered lists.
+        idx_sums = dict.fromkeys(next_moves, 0)
+        for ordered_moves in (moves_goal_dist, moves_min_crime_dists, moves_reps, moves_light):
+            for idx, (_, move) in enumerate(ordered_moves, start=1):
+                idx_sums[move] += idx
 
+        move_tradeoff = [(idx_sums[move], move) for (dist, move) in moves_goal_dist]
         next_move = min(move_tradeoff)[1]
 
-        fear_decrease_factor = random.uniform(0, 0.6)
+        fear_decrease_factor = self.step_random.uniform(0, 0.6)
         self.fear -= self.fear * fear_decrease_factor
 
         self.model.grid.move_agent(self, next_move)
@@ -129,19 +134,25 @@ class PossibleVictim(Agent):
     def moves_according_to_goal_distance(self, next_moves):
         """ Create a list with all the possible moves, sorted in increasing order of resulting
             distance from the goal. """
-        return sorted([(self.evaluate_distance(pos, self.goal_pos), pos) for pos
-                       in next_moves])
+        self.model.instrumentation.count("distance_evaluations", len(next_moves))
+        return sorted([(manhattan(pos, self.goal_pos), pos) for pos in next_moves])
 
     def moves_according_to_crime_dist(self, next_moves, surr_danger):
         """ Create a list with all the possible moves, sorted in decreasing order of resulting
                 distances from the positions to the nearest criminal location. """
+        crime_field = self.model.crime_field
+        crime_poss = [pos for (rep, pos, dist) in surr_danger]
+
+        # The nearest criminal position to a move is visible if it is within the visibility
+        # minus the move, unless it is the position of this agent (which is not visible).
+        own_crime = crime_field.reputation[self.pos] > 0
         move_min_crime_dists = []
         for move in next_moves:
-            move_dist = []
-            for (rep, pos, dist) in surr_danger:
-                resulting_dist = self.evaluate_distance(move, pos)
-                move_dist.append((resulting_dist, move))
-            move_min_crime_dists.append(min(move_dist))
+            dist = crime_field.get_nearest_crime(move)[0]
+            if own_crime or dist > self.VISIBILITY - 1:
+                self.model.instrumentation.count("distance_evaluations", len(crime_poss))
+                dist = min(manhattan(move, pos) for pos in crime_poss)
+            move_min_crime_dists.append((dist, move))
 
         return sorted(move_min_crime_dists, reverse=True)
 
@@ -149,27 +160,19 @@ class PossibleVictim(Agent):
         """ Create a list with all the possible moves, sorted in increasing order of
         resulting, criminal reputations, 0 if none. """
 
-        def find_move_pair(tuple_list, search):
-            """Find the search item in the list of tuples. """
-            return [item for item in tuple_list if item[1] == search]
-
-        move_reps = []
-        for move in next_moves:
-            rep_pos_dist = find_move_pair(surr_danger, move)
-            if not rep_pos_dist:
-                move_reps.append((0, move))
-            else:
-                rep_pos_pair = (rep_pos_dist[0][0], rep_pos_dist[0][1])
-                move_reps.append(rep_pos_pair)
-        return sorted(move_reps)
+        move_reps = dict.fromkeys(next_moves, 0)
+        for (rep, pos, dist) in surr_danger:
+            if pos in move_reps:
+                move_reps[pos] = rep
+        return sorted((rep, move) for move, rep in move_reps.items())
 
     def moves_according_to_light(self, next_moves):
-        cell_contents = self.model.grid.get_cell_list_contents(next_moves)
-        surr_light = sorted([(agent.illuminance, agent.pos) for agent in cell_contents
-                             if isinstance(agent, Light)])
+        """ Create a list with all the possible moves, sorted in increasing order of
+        incident illuminance. """
+        illuminance = self.model.illuminance
+        surr_light = sorted([(illuminance[x, y], (x, y)) for (x, y) in next_moves])
 
         return surr_light
-        # self.model.grid.move_agent(self, new_pos.pos)
 
     def move(self, curr_dist, pos, condition):
         """Move (according to the condition) either further or closer to pos"""
@@ -183,13 +186,14 @@ class PossibleVictim(Agent):
                    'further': operator.lt}
             return ops[comparator](a, b)
 
+        self.model.instrumentation.count("distance_evaluations", len(next_moves))
         next_move = next_moves[0]
         for n_pos in next_moves:
-            if compare(curr_dist, condition, self.evaluate_distance(pos, n_pos)):
-                curr_dist = self.evaluate_distance(pos, n_pos)
+            if compare(curr_dist, condition, manhattan(pos, n_pos)):
+                curr_dist = manhattan(pos, n_pos)
                 next_move = n_pos
 
-        fear_decrease_factor = random.uniform(0, 0.6)
+        fear_decrease_factor = self.step_random.uniform(0, 0.6)
         self.fear -= self.fear * fear_decrease_factor
 
         self.model.grid.move_agent(self, next_move)
@@ -201,23 +205,40 @@ class PossibleVictim(Agent):
             - distance is the distance from the agent to the criminal position
         All the tuples returned are within the agents' visibility."""
 
-        surr_danger = [(crime_pos.reputation, crime_pos.position,
-                        self.evaluate_distance(crime_pos.position, self.pos))
+        crime_field = self.model.crime_field
+        surr_danger = [(crime_field.reputation[crime_pos], crime_pos,
+                        manhattan(crime_pos, self.pos))
                        for crime_pos in
-                       self.model.grid.get_neighbors(self.pos, moore=True, radius=self.VISIBILITY)
-                       if (isinstance(crime_pos, AttractorLoc) or
-                           isinstance(crime_pos, GeneratorLoc))]
+                       crime_field.get_crime_positions(self.pos, self.VISIBILITY, include_center=False)]
+        self.model.instrumentation.count("distance_evaluations", len(surr_danger))
 
         return surr_danger
 
-    def average_surr_reputation(self, surr_danger):
-        """Return an average of the surrounding criminal reputations. """
-        reps = [rep for (rep, pos, dist) in surr_danger]
-        average = sum(reps) / len(reps)
-        return round(average, 3)
+    def surrounding_danger_level(self):
+        """Return the number of criminal positions within the agent's visibility, and an
+        average of their criminal reputations, read from the summed area tables of the
+        crime field. """
+        crime_field = self.model.crime_field
+        n_danger, reputation = crime_field.window_sums(self.pos, self.VISIBILITY)
+
+        # The position of the agent is not part of its surroundings.
+        own_reputation = crime_field.reputation[self.pos]
+        if own_reputation > 0:
+            n_danger -= 1
+            reputation -= own_reputation
+
+        if not n_danger:
+            return 0, 0
+        return n_danger, round(reputation / n_danger, 3)
+
+    def leave_aggregates(self):
+        """Remove this victim from the running aggregates of the model. """
+        self.model.aggregates.add("victims", -1)
+        self.model.aggregates.add("fear", -self._fear)
 
     def remove_agent(self):
         """Remove the agent and its safe location from the grid"""
+        self.leave_aggregates()
         self.goal.remove()
         self.model.grid._remove_agent(self.pos, self)
         self.model.schedule.remove(self)
@@ -236,11 +257,9 @@ class PossibleVictim(Agent):
             self.remove_agent()
 
         else:
-            # Check for surrounding danger
-            surr_danger = self.surrounding_danger()
-            if surr_danger:
-                # Average criminal reputation of surrounding danger.
-                avg_surr_reputation = self.average_surr_reputation(surr_danger)
+            # Check for surrounding danger, and its average criminal reputation.
+            n_danger, avg_surr_reputation = self.surrounding_danger_level()
+            if n_danger:
 
                 # Check familiarity of the agent with surroundings.
                 if not self.familiar_area():
@@ -249,15 +268,15 @@ class PossibleVictim(Agent):
                     self.fear += (avg_surr_reputation * self.ENVIRONMENTAL_INFLUENCE)
                 else:
                     # Decrease the fear of the agent, as it is familiar with the area.
-                    fear_decrease_factor = random.uniform(0, 0.1)
+                    fear_decrease_factor = self.step_random.uniform(0, 0.1)
                     self.fear -= self.fear * fear_decrease_factor
 
             # If the fear is high enough, and there is surrounding danger
             # move away from the danger location,
             # otherwise continue moving in the direction of the goal position.
-            sample_probability = random.uniform(0, 1)
+            sample_probability = self.step_random.uniform(0, 1)
 
-            if surr_danger and self.fear > sample_probability:
-                self.move_away_from_danger(surr_danger)
+            if n_danger and self.fear > sample_probability:
+                self.move_away_from_danger(self.surrounding_danger())
             else:
                 self.move_towards_safe_location()
\ No newline at end of file
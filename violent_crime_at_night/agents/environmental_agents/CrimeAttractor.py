@@ -1,5 +1,4 @@
-import uuid
-from agents.environmental_agents import CrimeGenerator, GeneratorLoc
+from agents.environmental_agents.CrimeGenerator import CrimeGenerator
 
 
 class CrimeAttractor(CrimeGenerator):
@@ -13,12 +12,21 @@ class CrimeAttractor(CrimeGenerator):
         commited within a certain ratio.
 
         The centroid of the area (where the crime has been committed) is the most dangerous,
-        whilst the surrounding positions become less and less dangerous.
+        whilst the surrounding positions become less and less dangerous. The reputation of every
+        position deteriorates by a fixed fraction of its initial reputation with every tick of
+        the model, until it is removed from the crime field.
 
         They inherit from the crime generator class.
         """
 
+    __slots__ = ("reputation_decrease_factor", "area_id")
+
+    RANDOM_STREAM = "crime_attractor"
+
     def __init__(self, unique_id, model, cent_pos, rad):
+        # Fraction of the initial reputation of each position lost with every tick.
+        self.reputation_decrease_factor = 0.15
+        self.area_id = None  # Id of the hotspot this attractor represents in the crime field.
         super(CrimeAttractor, self).__init__(unique_id, model, cent_pos, rad)
 
     def recalculate_centroid(self, centroids):
@@ -35,92 +43,24 @@ class CrimeAttractor(CrimeGenerator):
 
     def get_overlap(self):
         """Return the overlapping hotspots, if any. """
-        hotspot_poss = self.model.grid.get_neighborhood(self.centroid, moore=True, include_center=True,
-                                                        radius=(self.radius + 1))
-        overlapping_hotspots = set([hotspot_pos.area for hotspot_pos in
-                                    self.model.grid.get_cell_list_contents(hotspot_poss)
-                                    if isinstance(hotspot_pos, AttractorLoc)])
-        return overlapping_hotspots
-
-    def delete_hotspots(self, hotspots):
-        """Delete hotspot so there is only one remaining hotspot. """
-        for h in hotspots:
-            for h_pos in h.poss:
-                self.model.grid._remove_agent(h_pos.pos, h_pos)
-                self.model.schedule.remove(h_pos)
-
-    def get_distances_from_centroid(self):
-        distances = []
-        for pos in self.poss:
-            distances.append(pos.evaluate_distance(pos.position, self.centroid))
+        return self.model.crime_field.get_attractors(self.centroid, self.radius + 1)
 
     def merge_hotspots(self, hotspots):
-        """Merge all overlapping hotspots. """
-        hotspots.add(self)
+        """Take the centroid and the criminal reputation of the hotspot merged from this one
+        and the overlapping hotspots. """
+        hotspots = hotspots | {self}
 
         self.centroid = self.recalculate_centroid([h.centroid for h in hotspots])
-        self.radius = sum([h.radius for h in hotspots])
         self.criminal_reputation = self.recalculate_criminal_reputation([h.criminal_reputation for h in hotspots])
-        self.poss = self.get_poss()
-
-        hotspots.remove(self)
-        self.delete_hotspots(hotspots)
 
     def add_to_model(self):
-        """Add the new hotspot to the model. """
+        """Add the new hotspot to the model, merged with the hotspots it overlaps. The
+        positions of the merged hotspots are kept in place, and the positions around this
+        crime are added to them. Every position of the merged hotspot then takes its
+        reputation from the merged centroid and criminal reputation. """
         overlapping_hotspots = self.get_overlap()
-        while overlapping_hotspots:
+        self.model.crime_field.add_attractor(self, self.reputation_decrease_factor, overlapping_hotspots)
+        if overlapping_hotspots:
             self.merge_hotspots(overlapping_hotspots)
-            overlapping_hotspots = self.get_overlap()
-
-        for hotspot_pos in self.poss:
-            hotspot_pos.set_reputation(self.centroid, self.radius)
-            self.model.grid.place_agent(hotspot_pos, hotspot_pos.position)
-            self.model.schedule.add(hotspot_pos)
-
-    def get_poss(self):
-        """From the each of the positions in the hotspot, convert pos tuple to HotspotPos.
-        Update the positions to portray this. """
-        # Get a radius of positions surrounding the centroid.
-        poss = self.model.grid.get_neighborhood(self.centroid, moore=True, include_center=True, radius=self.radius)
-
-        hotspot_poss = []
-        for pos in poss:
-            crime_pos = AttractorLoc(uuid.uuid4(), self.model, self, self.criminal_reputation, pos)
-            crime_pos.set_reputation(self.centroid, self.radius)
-            hotspot_poss.append(crime_pos)
-
-        return hotspot_poss
-
-    def remove_pos(self, h_pos):
-        self.poss.remove(h_pos)
-
-
-class AttractorLoc(GeneratorLoc):
-    """ Represents a single location within a hotspot area.
-    Inherits from the more general class CrimeAreaPos"""
-
-    def __int__(self, unique_id, model, area, centroid_reputation, pos):
-        super(AttractorLoc, self).__init__(unique_id, model, area, centroid_reputation, pos)
-        self.reputation = 0
-
-    def __init__(self, unique_id, model, area, centroid_reputation, pos):
-        super(AttractorLoc, self).__init__(unique_id, model, area, centroid_reputation, pos)
-        self.reputation_decrease_factor = 0.15
-        self.reputation_decrease = 0
-
-    def set_reputation(self, centroid, radius):
-        """Set the reputation of the position depending on the reputation of the
-        centroid and its distance from it. """
-        distance_from_centroid = self.evaluate_distance(centroid, self.position)
-        self.reputation = self.centroid_reputation / (distance_from_centroid + 1)
-
-        self.reputation_decrease = self.reputation * self.reputation_decrease_factor
-
-    def step(self):
-        """Deteriorate the reputation of the position by a percentage at each tick of the model"""
-        self.reputation = self.reputation - self.reputation_decrease
-        if self.reputation <= 0:
-            self.model.grid._remove_agent(self.pos, self)
-            self.model.schedule.remove(self)
-            self.area.remove_pos(self)
\ No newline at end of file
+            self.model.crime_field.stamp_area(self, self.reputation_decrease_factor)
+            self.model.instrumentation.count("hotspot_merges", len(overlapping_hotspots))
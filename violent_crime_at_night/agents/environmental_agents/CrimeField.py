@@ -0,0 +1,281 @@
+import numpy as np
+
+from model.disjoint_set import DisjointSet
+from model.distance import distance_table, manhattan_transform, table_window
+from model.instrumentation import NULL_INSTRUMENTATION
+
+
+def window_sums(count_table, reputation_table, poss, radius, groups=None,
+                instrumentation=NULL_INSTRUMENTATION):
+    """Return the number of criminal positions within radius of each of the (n, 2) array of
+    positions, and the sum of their reputations, from the summed area tables of a crime field.
+    If the tables have a leading axis (such as the replicates of a batched model), each
+    position is read from the tables of its group, given by groups. Every window is counted
+    by the instrumentation as a query scanning the positions it covers. """
+    width, height = count_table.shape[-2] - 1, count_table.shape[-1] - 1
+    x0 = np.clip(poss[:, 0] - radius, 0, width)
+    x1 = np.clip(poss[:, 0] + radius + 1, 0, width)
+    y0 = np.clip(poss[:, 1] - radius, 0, height)
+    y1 = np.clip(poss[:, 1] + radius + 1, 0, height)
+
+    instrumentation.count("neighborhood_queries", len(poss))
+    instrumentation.count("cells_scanned", int(((x1 - x0) * (y1 - y0)).sum()))
+
+    group = () if count_table.ndim == 2 else (groups,)
+
+    def window_sum(table):
+        return (table[group + (x1, y1)] - table[group + (x0, y1)] -
+                table[group + (x1, y0)] + table[group + (x0, y0)])
+
+    return window_sum(count_table), window_sum(reputation_table)
+
+
+class CrimeField:
+    """The criminal reputation of every position in the grid.
+
+    Rather than representing each position of a criminal area as an agent, the reputation of the
+    positions is stored in rasters indexed as [x, y]:
+        - generator_reputation holds the static reputation of the crime generators.
+        - attractor_reputation holds the reputation of the crime attractors (hotspots),
+          which deteriorates with every tick of the model.
+
+    Every crime attractor is given an integer id in a disjoint set, and the area_id raster
+    records which attractor set the reputation of each position, -1 if none. Overlapping
+    attractors are merged into one hotspot by the union of their sets, so the positions of a
+    hotspot are those whose id has the root of the hotspot, and merging never rewrites the ids.
+    The reputation of the positions of a merged hotspot is stamped again from its centroid and
+    criminal reputation by stamp_area.
+    A position is a criminal position if its reputation is greater than 0.
+    """
+
+    # Counts the queries of the field, set by the model.
+    instrumentation = NULL_INSTRUMENTATION
+
+    def __init__(self, width, height, views=None):
+        self.width = width
+        self.height = height
+
+        # The reputation and the summed area tables below may be given as views, such as those
+        # of the arrays of a BatchedCrimeField, which are then updated in place.
+        views = views or {}
+
+        def raster(name, shape, dtype=float):
+            return views[name] if name in views else np.zeros(shape, dtype=dtype)
+
+        self.generator_reputation = np.zeros((width, height))
+        self.attractor_reputation = np.zeros((width, height))
+
+        # Amount by which the reputation of each hotspot position deteriorates with every tick.
+        self.reputation_decrease = np.zeros((width, height))
+
+        # Attractor owning each position, the sets of merged attractors, and the hotspots, their
+        # number of positions and the (x0, x1, y0, y1) bounds of those positions by the root of
+        # their set.
+        self.area_id = np.full((width, height), -1, dtype=int)
+        self.hotspots = DisjointSet()
+        self.areas = {}
+        self.area_cells = {}
+        self.area_bounds = {}
+
+        # Reputation of each position, the highest of the generator and attractor reputations.
+        self.reputation = raster("reputation", (width, height))
+
+        # Manhattan distance from each position to the nearest criminal position, and the flat
+        # index of that position. They are recomputed when next needed after the criminal
+        # positions have changed (a crime area is added or hotspot positions expire).
+        self.crime_distance = None
+        self.nearest_crime = None
+        self.crime_changed = True
+
+        # Summed area tables of the reputation and of the number of criminal positions, indexed
+        # as [x, y] with a leading row and column of zeros. They are rebuilt when next needed
+        # after the reputation has changed (at most once per tick).
+        self.reputation_table = raster("reputation_table", (width + 1, height + 1))
+        self.crime_count_table = raster("crime_count_table", (width + 1, height + 1), dtype=int)
+        self.reputation_changed = True
+
+    def window(self, pos, radius):
+        """Return the slices of the rasters covering the positions within radius of pos. """
+        x, y = pos
+        return (slice(max(x - radius, 0), min(x + radius + 1, self.width)),
+                slice(max(y - radius, 0), min(y + radius + 1, self.height)))
+
+    def distances_from(self, pos, radius, window):
+        """Return the (rounded euclidean) distances from pos to every position in the window. """
+        return np.rint(table_window(distance_table(radius, "euclidean"), pos, *window))
+
+    def update_reputation(self, window=None):
+        """Recalculate the reputation of the positions within the window, every position by default. """
+        if window is None:
+            window = (slice(None), slice(None))
+        np.maximum(self.generator_reputation[window], self.attractor_reputation[window],
+                   out=self.reputation[window])
+        self.reputation_changed = True
+
+    def update_summed_area(self):
+        """Rebuild the summed area tables of the reputation and of the criminal positions. """
+        self.reputation_table[1:, 1:] = self.reputation.cumsum(axis=0).cumsum(axis=1)
+        self.crime_count_table[1:, 1:] = (self.reputation > 0).cumsum(axis=0).cumsum(axis=1)
+        self.reputation_changed = False
+
+    def window_sums(self, pos, radius):
+        """Return the number of criminal positions within radius of pos, and the sum of their
+        reputations, in constant time. """
+        if self.reputation_changed:
+            self.update_summed_area()
+        xs, ys = self.window(pos, radius)
+        x0, x1, y0, y1 = xs.start, xs.stop, ys.start, ys.stop
+        self.instrumentation.query((x1 - x0) * (y1 - y0))
+
+        count = self.crime_count_table
+        n_crime = count[x1, y1] - count[x0, y1] - count[x1, y0] + count[x0, y0]
+        reputation = self.reputation_table
+        reputation_sum = reputation[x1, y1] - reputation[x0, y1] - reputation[x1, y0] + reputation[x0, y0]
+        return int(n_crime), float(reputation_sum)
+
+    def window_sums_many(self, poss, radius, replicates=None):
+        """Return window_sums for each of the (n, 2) array of positions, as two arrays. The
+        replicates, taken by BatchedCrimeField.window_sums_many, are ignored. """
+        if self.reputation_changed:
+            self.update_summed_area()
+        return window_sums(self.crime_count_table, self.reputation_table, poss, radius,
+                           instrumentation=self.instrumentation)
+
+    def add_generator(self, generator):
+        """Add the positions of the crime generator to the field. The reputation of each
+        position decreases with its distance from the centroid. """
+        window = self.window(generator.centroid, generator.radius)
+        reputation = np.round(generator.criminal_reputation /
+                              (self.distances_from(generator.centroid, generator.radius, window) + 1), 3)
+        np.maximum(self.generator_reputation[window], reputation, out=self.generator_reputation[window])
+        self.update_reputation(window)
+        self.crime_changed = True
+
+    def add_attractor(self, attractor, reputation_decrease_factor, merge=()):
+        """Add the positions of the crime attractor to the field, and merge it with the hotspots
+        given, which must include every hotspot owning a position within its area. The attractor
+        becomes the hotspot representing the merged set.
+
+        Positions already in the merged hotspots keep their reputation if it is higher than the
+        one the attractor would give them. """
+        window = self.window(attractor.centroid, attractor.radius)
+        x0, x1, y0, y1 = window[0].start, window[0].stop, window[1].start, window[1].stop
+
+        attractor_id = self.hotspots.make_set()
+        root = attractor_id
+        n_cells = 0
+        for hotspot in merge:
+            root = self.hotspots.union(root, hotspot.area_id)
+            n_cells += self.area_cells.pop(hotspot.area_id)
+            del self.areas[hotspot.area_id]
+            bx0, bx1, by0, by1 = self.area_bounds.pop(hotspot.area_id)
+            x0, x1, y0, y1 = min(x0, bx0), max(x1, bx1), min(y0, by0), max(y1, by1)
+        self.instrumentation.count("agents_removed", len(merge))
+
+        reputation = attractor.criminal_reputation / \
+            (self.distances_from(attractor.centroid, attractor.radius, window) + 1)
+        update = reputation > self.attractor_reputation[window]
+        n_cells += int((update & (self.area_id[window] < 0)).sum())
+
+        self.area_id[window][update] = attractor_id
+        self.attractor_reputation[window][update] = reputation[update]
+        self.reputation_decrease[window][update] = reputation[update] * reputation_decrease_factor
+        self.update_reputation(window)
+        self.crime_changed = True
+
+        attractor.area_id = root
+        self.areas[root] = attractor
+        self.area_cells[root] = n_cells
+        self.area_bounds[root] = (x0, x1, y0, y1)
+
+    def stamp_area(self, attractor, reputation_decrease_factor):
+        """Set the reputation of every position of the hotspot of the attractor from its
+        centroid and criminal reputation, as add_attractor does for the positions of a new one.
+        This applies the centroid and reputation of a merged hotspot to all of its positions. """
+        x0, x1, y0, y1 = self.area_bounds[attractor.area_id]
+        window = (slice(x0, x1), slice(y0, y1))
+        ids = self.area_id[window]
+        owned = ids >= 0
+        owned[owned] = self.hotspots.find_many(ids[owned]) == attractor.area_id
+
+        x, y = np.nonzero(owned)
+        distances = np.rint(np.hypot(x + x0 - attractor.centroid[0], y + y0 - attractor.centroid[1]))
+        reputation = attractor.criminal_reputation / (distances + 1)
+        self.attractor_reputation[window][owned] = reputation
+        self.reputation_decrease[window][owned] = reputation * reputation_decrease_factor
+        self.update_reputation(window)
+        self.crime_changed = True
+
+    def get_nearest_crime(self, pos):
+        """Return the manhattan distance from pos to the nearest criminal position, and that
+        position (the lowest one if several are as near), (inf, None) if there is none. """
+        if self.crime_changed:
+            self.crime_distance, self.nearest_crime = manhattan_transform(self.reputation > 0)
+            self.crime_changed = False
+
+        distance = self.crime_distance[pos]
+        if distance == np.inf:
+            return distance, None
+        return int(distance), divmod(int(self.nearest_crime[pos]), self.height)
+
+    def get_area(self, pos):
+        """Return the hotspot owning the position, None if there is none. """
+        i = self.area_id[pos]
+        if i < 0:
+            return None
+        return self.areas[self.hotspots.find(i)]
+
+    def area_reputation(self):
+        """Return the criminal reputation of the hotspot owning every position, 0 if none. """
+        reputation = np.zeros(len(self.hotspots))
+        for root, area in self.areas.items():
+            reputation[root] = area.criminal_reputation
+        owned = self.area_id >= 0
+        result = np.zeros((self.width, self.height))
+        result[owned] = reputation[self.hotspots.find_many(self.area_id[owned])]
+        return result
+
+    def get_attractors(self, pos, radius):
+        """Return the hotspots owning any position within radius of pos. """
+        ids = np.unique(self.area_id[self.window(pos, radius)])
+        ids = ids[ids >= 0]
+        if not ids.size:
+            return set()
+        return set(self.areas[i] for i in np.unique(self.hotspots.find_many(ids)).tolist())
+
+    def get_crime_positions(self, pos, radius, include_center=True):
+        """Return the criminal positions within radius of pos. """
+        xs, ys = self.window(pos, radius)
+        self.instrumentation.query((xs.stop - xs.start) * (ys.stop - ys.start))
+        x_idx, y_idx = np.nonzero(self.reputation[xs, ys] > 0)
+        crime_poss = list(zip((x_idx + xs.start).tolist(), (y_idx + ys.start).tolist()))
+        if not include_center and self.reputation[pos] > 0:
+            crime_poss.remove(tuple(pos))
+        return crime_poss
+
+    def step(self):
+        """Deteriorate the reputation of every hotspot position, and remove the positions
+        whose reputation has run out. """
+        hotspot = self.area_id >= 0
+        if not hotspot.any():
+            return
+
+        self.attractor_reputation[hotspot] -= self.reputation_decrease[hotspot]
+        expired = hotspot & (self.attractor_reputation <= 0)
+
+        if expired.any():
+            roots = self.hotspots.find_many(self.area_id[expired])
+            ids, counts = np.unique(roots, return_counts=True)
+            for i, count in zip(ids.tolist(), counts.tolist()):
+                self.area_cells[i] -= count
+                if self.area_cells[i] <= 0:
+                    del self.area_cells[i]
+                    del self.areas[i]
+                    del self.area_bounds[i]
+                    self.instrumentation.count("agents_removed")
+            self.area_id[expired] = -1
+            self.attractor_reputation[expired] = 0
+            self.reputation_decrease[expired] = 0
+            self.crime_changed = True
+
+        self.update_reputation()
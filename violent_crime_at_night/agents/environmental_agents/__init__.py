@@ -1,3 +1,2 @@
-from agents.environmental_agents.CrimeGenerator import CrimeGenerator, GeneratorLoc
-
-
+from agents.environmental_agents.CrimeField import CrimeField
+from agents.environmental_agents.CrimeGenerator import CrimeGenerator
@@ -0,0 +1,4 @@
+from batch.adaptive import AdaptiveSweepRunner
+from batch.batched import BatchedSweepRunner
+from batch.cache import RunCache
+from batch.sweep import SweepRunner
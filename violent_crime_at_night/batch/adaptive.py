@@ -0,0 +1,203 @@
+import math
+import statistics
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from batch.sweep import SweepRunner, run_job
+
+
+def t_cdf(t, df):
+    """Return the cumulative distribution function of Student's t distribution with df (an
+    integer) degrees of freedom at t, by the finite series of Abramowitz and Stegun 26.7.3-4. """
+    theta = math.atan(t / math.sqrt(df))
+    c2 = math.cos(theta) ** 2
+    if df % 2:
+        term, series = math.cos(theta), 0.0
+        for k in range(1, (df - 1) // 2 + 1):
+            series += term
+            term *= c2 * 2 * k / (2 * k + 1)
+        a = 2 / math.pi * (theta + math.sin(theta) * series) if df > 1 else 2 * theta / math.pi
+    else:
+        term, series = 1.0, 0.0
+        for k in range(1, df // 2 + 1):
+            series += term
+            term *= c2 * (2 * k - 1) / (2 * k)
+        a = math.sin(theta) * series
+    # a is the probability of |T| < |t|.
+    return (1 + a) / 2
+
+
+def t_quantile(p, df):
+    """Return the p quantile of Student's t distribution with df (an integer) degrees of
+    freedom, by bisection of t_cdf. """
+    if p < 0.5:
+        return -t_quantile(1 - p, df)
+    low, high = 0.0, 1.0
+    while t_cdf(high, df) < p:
+        low, high = high, 2 * high
+    for _ in range(200):
+        middle = (low + high) / 2
+        if middle in (low, high):
+            break
+        if t_cdf(middle, df) < p:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+def ci_width(values, confidence=0.95):
+    """Return the width of the confidence interval of the mean of the values, nan if any of
+    them is missing (None). """
+    n = len(values)
+    if n < 2:
+        return math.inf
+    if any(value is None or math.isnan(value) for value in values):
+        return math.nan
+    return 2 * t_quantile((1 + confidence) / 2, n - 1) * statistics.stdev(values) / math.sqrt(n)
+
+
+class AdaptiveSweepRunner(SweepRunner):
+    """A SweepRunner which runs every combination of the variable parameters only as many times
+    as needed for the confidence interval of the mean of one of the model reporters to be no
+    wider than target_width.
+
+    Every combination is run at least min_iterations and at most max_iterations times. The
+    runs are spread over the pool of processes one at a time, so a model which stops early
+    frees its process for the next run at once. Once the pool has a free process, the next run
+    goes to the unfinished combination with the fewest runs.
+
+    Iteration i of every combination is passed the same seed, as with SweepRunner. Whether a
+    combination is finished is decided on its iterations in order, and the runs made beyond the
+    first iteration count meeting the target are dropped, so the runs kept do not depend on the
+    order in which the processes finish them.
+    """
+
+    def __init__(self, model_cls, variable_parameters=None, fixed_parameters=None, reporter=None,
+                 target_width=0.1, confidence=0.95, min_iterations=3, max_iterations=30,
+                 max_steps=1000, model_reporters=None, processes=None, collect_datacollector=False,
+                 seed=None, cache=None):
+        super().__init__(model_cls, variable_parameters, fixed_parameters, max_iterations, max_steps,
+                         model_reporters, processes, collect_datacollector, seed, cache)
+        if reporter not in self.model_reporters:
+            raise ValueError("The reporter must be one of the model reporters, not " + repr(reporter))
+        if not 2 <= min_iterations <= max_iterations:
+            raise ValueError("min_iterations must be at least 2, and at most max_iterations")
+        self.reporter = reporter
+        self.target_width = target_width
+        self.confidence = confidence
+        self.min_iterations = min_iterations
+        self.max_iterations = max_iterations
+
+        # Number of iterations kept for every combination, by index, once it is finished.
+        self.iterations_needed = {}
+
+    def job_kwargs(self, params, iteration):
+        """Return the arguments of the model of the iteration of the combination. """
+        kwargs = dict(params, **self.fixed_parameters)
+        if self.seed is not None:
+            kwargs["seed"] = self.iteration_seed(iteration)
+        return kwargs
+
+    def run_all(self):
+        """Run the model at all parameter combinations until their confidence intervals are
+        narrow enough, and store the results. """
+        points = self.parameters_list()
+        self.iterations_needed = {}
+        results = [{} for _ in points]  # Reporters and datacollector of each iteration, by point.
+        submitted = [0] * len(points)
+        completed = [0] * len(points)  # Number of iterations completed in order, by point.
+        checked = [0] * len(points)  # Number of iterations whose interval has been checked.
+        pending = {}
+        pool = ProcessPoolExecutor(self.processes) if self.processes > 1 else None
+
+        def finished(point):
+            """Return whether the combination is finished, checking the iterations it has
+            completed in order. """
+            if point in self.iterations_needed:
+                return True
+            runs = results[point]
+            while completed[point] in runs:
+                completed[point] += 1
+            while checked[point] < completed[point]:
+                checked[point] += 1
+                if checked[point] < self.min_iterations:
+                    continue
+                values = [runs[i][0][self.reporter] for i in range(checked[point])]
+                if ci_width(values, self.confidence) <= self.target_width or \
+                        checked[point] == self.max_iterations:
+                    self.iterations_needed[point] = checked[point]
+                    return True
+            return False
+
+        def submit(point):
+            iteration = submitted[point]
+            submitted[point] += 1
+            kwargs = self.job_kwargs(points[point], iteration)
+            key = None
+            if self.cache is not None:
+                key = self.cache.key(self.model_cls, kwargs, self.max_steps, self.model_reporters,
+                                     self.collect_datacollector)
+                cached = self.cache.get(key) if key is not None else None
+                if cached is not None:
+                    results[point][iteration] = cached
+                    return
+            job = ((point, iteration, key), self.model_cls, kwargs, self.max_steps, self.model_reporters,
+                   self.collect_datacollector)
+            if pool is None:
+                complete(*run_job(job))
+            else:
+                pending[pool.submit(run_job, job)] = point
+
+        def complete(run, model_vars, datacollector_vars):
+            point, iteration, key = run
+            results[point][iteration] = (model_vars, datacollector_vars)
+            if key is not None:
+                self.cache.put(key, model_vars, datacollector_vars)
+
+        def fill():
+            """Give the free processes the next runs of the unfinished combinations. """
+            while len(pending) < self.processes:
+                unfinished = [point for point in range(len(points))
+                              if submitted[point] < self.max_iterations and not finished(point)]
+                if not unfinished:
+                    return
+                submit(min(unfinished, key=lambda point: submitted[point]))
+
+        try:
+            for point in range(len(points)):
+                for _ in range(self.min_iterations):
+                    submit(point)
+            fill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del pending[future]
+                    complete(*future.result())
+                fill()
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        # Number the runs kept as SweepRunner does, by combination then iteration.
+        run = 0
+        for point, params in enumerate(points):
+            finished(point)
+            for iteration in range(self.iterations_needed[point]):
+                self.store(params, run, *results[point][iteration])
+                run += 1
+
+    def get_iterations_dataframe(self):
+        """Return a DataFrame with the number of runs kept for every combination, and the mean
+        and confidence interval width of the reporter over them. """
+        df = self.get_model_vars_dataframe()
+        names = list(self.variable_parameters.keys())
+        grouped = df.groupby(names, sort=False)[self.reporter] if names else [((), df[self.reporter])]
+        records = []
+        for key, values in grouped:
+            key = key if isinstance(key, tuple) else (key,)
+            values = values.tolist()
+            records.append(dict(zip(names, key), iterations=len(values), mean=statistics.mean(values),
+                                ci_width=ci_width(values, self.confidence)))
+        return pd.DataFrame(records)
@@ -0,0 +1,75 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from batch.sweep import SweepRunner
+from model.batched import BatchedModel
+from model.model import Model
+
+
+def run_batch(job):
+    """Run the iterations of a combination of the sweep as the replicates of a BatchedModel,
+    and return the values of the model reporters and of the datacollector of every run. """
+    runs, kwargs, seeds, max_steps, model_reporters, collect_datacollector = job
+
+    model = BatchedModel(seeds, **kwargs)
+    model.run(max_steps)
+
+    results = []
+    for run, replicate in zip(runs, model.replicates):
+        model_vars = {var: reporter(replicate) for var, reporter in model_reporters.items()}
+        datacollector_vars = None
+        if collect_datacollector:
+            datacollector_vars = replicate.datacollector.get_model_vars_dataframe()
+        results.append((run, model_vars, datacollector_vars))
+    return results
+
+
+class BatchedSweepRunner(SweepRunner):
+    """A SweepRunner which runs the iterations of every combination of the variable parameters
+    as the replicates of a single BatchedModel, rather than as a model each. The combinations
+    are spread over the pool of processes.
+
+    The runs are those of Model with the array engine, and give the same results, so they are
+    cached under the same keys. The model reporters are passed the Replicate of each run, so
+    they may only read the attributes it has, as the reporters of the model module do.
+    """
+
+    def __init__(self, variable_parameters=None, fixed_parameters=None, iterations=1, max_steps=1000,
+                 model_reporters=None, processes=None, collect_datacollector=False, seed=None, cache=None):
+        if (fixed_parameters or {}).get("engine", "array") != "array":
+            raise ValueError("BatchedSweepRunner only runs the array engine")
+        super().__init__(Model, variable_parameters, fixed_parameters, iterations, max_steps,
+                         model_reporters, processes, collect_datacollector, seed, cache)
+
+    def run_all(self):
+        """Run the model at all parameter combinations and store the results. """
+        # Group the runs by combination, taking those in the cache from it.
+        batches = {}
+        params_by_run = {}
+        keys = {}
+        for run, params, iteration, kwargs in self.jobs():
+            params_by_run[run] = params
+            if self.cache is not None:
+                keys[run] = self.cache.key(self.model_cls, dict(kwargs, engine="array"), self.max_steps,
+                                           self.model_reporters, self.collect_datacollector)
+                cached = self.cache.get(keys[run]) if keys[run] is not None else None
+                if cached is not None:
+                    self.store(params, run, *cached)
+                    continue
+            seed = kwargs.pop("seed", None)
+            kwargs.pop("engine", None)
+            runs, batch_kwargs, seeds = batches.setdefault(tuple(params.values()), ([], kwargs, []))
+            runs.append(run)
+            seeds.append(seed)
+
+        job_args = [(runs, kwargs, seeds, self.max_steps, self.model_reporters, self.collect_datacollector)
+                    for runs, kwargs, seeds in batches.values()]
+        if self.processes > 1 and len(job_args) > 1:
+            with ProcessPoolExecutor(self.processes) as pool:
+                results = [result for batch in pool.map(run_batch, job_args) for result in batch]
+        else:
+            results = [result for job in job_args for result in run_batch(job)]
+
+        for run, model_vars, datacollector_vars in results:
+            self.store(params_by_run[run], run, model_vars, datacollector_vars)
+            if keys.get(run) is not None:
+                self.cache.put(keys[run], model_vars, datacollector_vars)
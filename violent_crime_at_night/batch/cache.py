@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+# Directory of the project, which holds the packages below.
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Packages whose sources determine the results of a run: the simulation (the model and its
+# agents), and the runners of this package which run the models and read their reporters.
+SOURCE_PACKAGES = ("model", "agents", "batch")
+
+
+def source_hash(root=PROJECT_ROOT):
+    """Return a hash of the source of every module of the source packages of the project. The
+    modules hashed do not depend on which ones have been imported, and the scripts of the
+    project (such as run.py) are left out, so changing the plots does not invalidate the cache. """
+    paths = []
+    for package in SOURCE_PACKAGES:
+        for directory, _, names in os.walk(os.path.join(root, package)):
+            paths.extend(os.path.join(directory, name) for name in names if name.endswith(".py"))
+
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(os.path.relpath(path, root).replace(os.sep, "/").encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def encode(value):
+    """Encode values which json can not serialise, such as numpy scalars. """
+    if isinstance(value, np.generic):
+        return value.item()
+    if callable(value):
+        return value.__module__ + "." + value.__qualname__
+    return repr(value)
+
+
+class RunCache:
+    """Content addressed cache of completed runs, stored on disk.
+
+    Each run is stored in its own .npz file, named after the hash of everything which
+    determines its results: the model class and the hash of the sources, its parameters
+    (including the seed), the max steps, and the model reporters. The values of the model
+    reporters are stored as json, and the series of the datacollector of the model, if any,
+    are stored one array per column, with an array for their index (the collection steps).
+
+    Only runs with a seed are reproducible, so only those are cached.
+
+    If max_bytes is given, the least recently used runs are removed once the cache outgrows it.
+    """
+
+    def __init__(self, directory, max_bytes=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.source = None
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, model_cls, kwargs, max_steps, model_reporters, collect_datacollector=False):
+        """Return the key of a run, or None if the run can not be cached. """
+        if kwargs.get("seed") is None:
+            return None
+        if self.source is None:
+            self.source = source_hash()
+
+        description = {"model": encode(model_cls),
+                       "source": self.source,
+                       "kwargs": kwargs,
+                       "max_steps": max_steps,
+                       "model_reporters": model_reporters,
+                       "collect_datacollector": collect_datacollector}
+        description = json.dumps(description, sort_keys=True, default=encode)
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def path(self, key):
+        """Return the path of the file of the run. """
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, key):
+        """Return the model reporters and the datacollector DataFrame of the run, or None if
+        the run is not in the cache. """
+        path = self.path(key)
+        try:
+            with np.load(path) as data:
+                model_vars = json.loads(str(data["model_vars"]))
+                columns = json.loads(str(data["columns"]))
+                datacollector_vars = None
+                if columns is not None:
+                    datacollector_vars = pd.DataFrame({col: data["column_%d" % i]
+                                                       for i, col in enumerate(columns)},
+                                                      index=data["index"], columns=columns)
+        except (OSError, KeyError, ValueError):
+            return None
+
+        # Mark the run as recently used.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return model_vars, datacollector_vars
+
+    def put(self, key, model_vars, datacollector_vars=None):
+        """Store the results of a run, and evict old runs if the cache is too large. """
+        arrays = {"model_vars": np.array(json.dumps(model_vars, default=encode))}
+        columns = None
+        if datacollector_vars is not None:
+            columns = [str(col) for col in datacollector_vars.columns]
+            arrays["index"] = datacollector_vars.index.to_numpy()
+            for i, col in enumerate(datacollector_vars.columns):
+                arrays["column_%d" % i] = pd.to_numeric(datacollector_vars[col]).to_numpy(dtype=float)
+        arrays["columns"] = np.array(json.dumps(columns))
+
+        # Write to a temporary file first, so other processes never read a partial run.
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        if self.max_bytes is not None:
+            self.evict(self.max_bytes)
+
+    def entries(self):
+        """Return the (last used, size, path) of every run in the cache. """
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".npz"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self, max_bytes):
+        """Remove the least recently used runs until the cache takes at most max_bytes. """
+        entries = sorted(self.entries())
+        size = sum(entry[1] for entry in entries)
+        for mtime, entry_size, path in entries:
+            if size <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= entry_size
+
+    def clear(self):
+        """Remove every run from the cache. """
+        self.evict(0)
@@ -0,0 +1,137 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import pandas as pd
+
+from model.rng import derive_seed
+
+
+def run_job(job):
+    """Run a single model of the sweep to completion, or until reaching max steps, and
+    return the values of the model reporters and of its datacollector.
+
+    This runs in the worker processes, so only the results are sent back to the runner. """
+    run, model_cls, kwargs, max_steps, model_reporters, collect_datacollector = job
+
+    model = model_cls(**kwargs)
+    while model.running and model.schedule.steps < max_steps:
+        model.step()
+
+    model_vars = {var: reporter(model) for var, reporter in model_reporters.items()}
+    datacollector_vars = None
+    if collect_datacollector and hasattr(model, "datacollector"):
+        datacollector_vars = model.datacollector.get_model_vars_dataframe()
+    return run, model_vars, datacollector_vars
+
+
+class SweepRunner:
+    """Run a parameter sweep of a model, spreading the runs over a pool of processes.
+
+    It takes the same arguments as mesa's BatchRunner: the model is run iterations times for
+    every combination of the variable parameters, always passing the fixed parameters. The
+    model reporters are collected in the worker processes at the end of each run, and must
+    therefore be picklable (module level functions).
+
+    The results are returned in the same shape as BatchRunner.get_model_vars_dataframe:
+    one row per run, with the variable parameters, the Run number, the model reporters and
+    the fixed parameters as columns.
+
+    If a seed is given, each iteration is passed its own seed derived from it, the same at
+    every combination of the variable parameters, so the combinations are compared with common
+    random numbers and the sweep is reproducible. Otherwise every model seeds itself.
+
+    If a RunCache is given, the seeded runs already in the cache are not run again, and the
+    runs which are computed are added to it.
+    """
+
+    def __init__(self, model_cls, variable_parameters=None, fixed_parameters=None, iterations=1,
+                 max_steps=1000, model_reporters=None, processes=None, collect_datacollector=False,
+                 seed=None, cache=None):
+        self.model_cls = model_cls
+        self.variable_parameters = variable_parameters or {}
+        self.fixed_parameters = fixed_parameters or {}
+        self.iterations = iterations
+        self.max_steps = max_steps
+        self.model_reporters = model_reporters or {}
+        self.processes = processes or os.cpu_count()
+        self.collect_datacollector = collect_datacollector
+        self.seed = seed
+        self.cache = cache
+
+        self.model_vars = {}
+        self.datacollector_model_vars = {}
+
+    def parameters_list(self):
+        """Return a list with every combination of the variable parameters. """
+        names = list(self.variable_parameters.keys())
+        values = product(*[self.variable_parameters[name] for name in names])
+        return [dict(zip(names, v)) for v in values] or [{}]
+
+    def jobs(self):
+        """Return the (run, params, iteration) jobs of the sweep, numbered in the same order
+        as BatchRunner numbers its runs. """
+        jobs = []
+        for params in self.parameters_list():
+            for iteration in range(self.iterations):
+                kwargs = dict(params, **self.fixed_parameters)
+                if self.seed is not None:
+                    kwargs["seed"] = self.iteration_seed(iteration)
+                jobs.append((len(jobs), params, iteration, kwargs))
+        return jobs
+
+    def iteration_seed(self, iteration):
+        """Return the seed of the models of the iteration. """
+        return derive_seed(self.seed, "iteration", iteration)
+
+    def run_all(self):
+        """Run the model at all parameter combinations and store the results. """
+        jobs = self.jobs()
+        params_by_run = {run: params for (run, params, iteration, kwargs) in jobs}
+
+        # Take the runs in the cache from it, and run the rest.
+        keys = {}
+        job_args = []
+        for run, params, iteration, kwargs in jobs:
+            if self.cache is not None:
+                keys[run] = self.cache.key(self.model_cls, kwargs, self.max_steps,
+                                           self.model_reporters, self.collect_datacollector)
+                cached = self.cache.get(keys[run]) if keys[run] is not None else None
+                if cached is not None:
+                    self.store(params, run, *cached)
+                    continue
+            job_args.append((run, self.model_cls, kwargs, self.max_steps, self.model_reporters,
+                             self.collect_datacollector))
+
+        if self.processes > 1 and len(job_args) > 1:
+            with ProcessPoolExecutor(self.processes) as pool:
+                results = list(pool.map(run_job, job_args))
+        else:
+            results = [run_job(job) for job in job_args]
+
+        for run, model_vars, datacollector_vars in results:
+            self.store(params_by_run[run], run, model_vars, datacollector_vars)
+            if keys.get(run) is not None:
+                self.cache.put(keys[run], model_vars, datacollector_vars)
+
+    def store(self, params, run, model_vars, datacollector_vars):
+        """Store the results of a single run. """
+        key = tuple(params.values()) + (run,)
+        self.model_vars[key] = model_vars
+        if datacollector_vars is not None:
+            self.datacollector_model_vars[key] = datacollector_vars
+
+    def get_model_vars_dataframe(self):
+        """Return a DataFrame with the model reporters of every run. """
+        index_cols = list(self.variable_parameters.keys()) + ["Run"]
+        records = [dict(zip(index_cols, key), **values) for key, values in self.model_vars.items()]
+
+        df = pd.DataFrame(records, columns=index_cols + sorted(self.model_reporters))
+        df = df.sort_values(by="Run")
+        for param, val in self.fixed_parameters.items():
+            df[param] = [val] * df.shape[0]
+        return df
+
+    def get_collector_model(self):
+        """Return the datacollector DataFrame of every run, keyed by (params..., run). """
+        return self.datacollector_model_vars
@@ -0,0 +1,52 @@
+import gc
+import tracemalloc
+import uuid
+
+from agents.cognitive_agents.offenderAgent import PossibleOffender
+from agents.cognitive_agents.victimAgent import SafeLocation, PossibleVictim
+from model.model import Model
+
+# Memory taken by each agent, with integer ids and __slots__ (compact), and with uuid4 ids and
+# a per instance __dict__ (as the agents were before).
+#
+# Run from the violent_crime_at_night directory with:
+#     python -m benchmarks.agent_memory
+
+N_AGENTS = 10000
+
+
+def with_dict(cls):
+    """Return a subclass of the agent class which has a per instance __dict__. """
+    return type(cls.__name__, (cls,), {})
+
+
+def bytes_per_agent(factory, n=N_AGENTS):
+    """Return the average number of bytes allocated for each of n agents made by factory. """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    agents = [factory() for _ in range(n)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del agents
+    return (after - before) / n
+
+
+def main():
+    model = Model(1, 0, 0, 1, 0.5, 1, 50, 50, seed=0)
+    goal = SafeLocation(model.next_id(), model)
+
+    agent_types = {"SafeLocation": (SafeLocation, ()),
+                   "PossibleVictim": (PossibleVictim, (goal,)),
+                   "PossibleOffender": (PossibleOffender, (0.5,))}
+
+    print("%-18s %12s %12s" % ("agent", "dict+uuid4", "compact"))
+    for name, (cls, args) in agent_types.items():
+        dict_cls = with_dict(cls)
+        before = bytes_per_agent(lambda: dict_cls(uuid.uuid4(), model, *args))
+        after = bytes_per_agent(lambda: cls(model.next_id(), model, *args))
+        print("%-18s %12.0f %12.0f" % (name, before, after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+import types
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from model.model import Model
+
+# Memory taken by the model at a series of grid sizes and step counts: the peak and current
+# memory traced while running it, and the memory held by each class of agent and by each
+# structure of the model (grid, schedule, datacollector, crime field, ...). It also checks the
+# structures against each other, to spot leaks such as agents left on the grid after they have
+# been removed from the schedule.
+#
+# Run from the violent_crime_at_night directory with:
+#     python -m benchmarks.memory --sizes 50 100 200 --steps 0 50 100
+#     python -m benchmarks.memory --output memory.json
+
+SEED = 2021
+
+# Model parameters, scaled with the area of the grid from those of a 50x50 grid.
+PARAMS = dict(n_victims=50, n_offenders=15, n_criminal_generators=3, r_criminal_generators=4,
+              max_cp=0.5, pop_count=0)
+
+# Structures of the model whose memory is reported, by attribute path. The neighbourhood cache
+# of the grid is reported on its own, as it grows with every new position queried.
+STRUCTURES = ("grid._neighborhood_cache", "grid", "schedule", "datacollector", "crime_field", "illuminance",
+              "victim_engine", "offender_engine", "streams", "aggregates", "instrumentation")
+
+# Shared objects which are never counted as part of the structure referencing them.
+SHARED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                types.MethodType)
+
+
+def deep_size(obj, seen):
+    """Return the size of obj and of the objects it references which are not in seen (a set of
+    ids), adding them all to seen. """
+    size = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, SHARED_TYPES):
+            continue
+        seen.add(id(o))
+        size += sys.getsizeof(o)
+
+        if isinstance(o, np.ndarray):
+            # Views are counted with the array owning the data.
+            if o.base is not None:
+                stack.append(o.base)
+            continue
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        if hasattr(o, "__dict__"):
+            stack.append(o.__dict__)
+        for cls in type(o).__mro__:
+            for slot in getattr(cls, "__slots__", ()):
+                if hasattr(o, slot):
+                    stack.append(getattr(o, slot))
+    return size
+
+
+def model_agents(model):
+    """Return every agent of the model: those in the schedule and the hotspots of the crime field. """
+    return list(model.schedule.agents) + list(model.crime_field.areas.values())
+
+
+def grid_agents(grid):
+    """Return a list of every agent placed on the grid. """
+    if hasattr(grid, "chunks"):
+        return [agent for chunk in grid.chunks.values() for cell in chunk.values() for agent in cell]
+    return [agent for column in grid.grid for cell in column for agent in cell]
+
+
+def memory_by_owner(model):
+    """Return the bytes held by each class of agent and by each structure of the model. Objects
+    referenced by several owners are counted once, with the agents first, then the structures in
+    order, and what is left of the model as "model". """
+    agents = model_agents(model)
+    seen = {id(model)} | {id(agent) for agent in agents}
+
+    by_class = defaultdict(int)
+    for agent in agents:
+        seen.discard(id(agent))
+        by_class[type(agent).__name__] += deep_size(agent, seen)
+
+    by_structure = {}
+    for name in STRUCTURES:
+        structure = model
+        for attribute in name.split("."):
+            structure = getattr(structure, attribute, None)
+        if structure is not None:
+            by_structure[name] = deep_size(structure, seen)
+    seen.discard(id(model))
+    by_structure["model"] = deep_size(model, seen)
+
+    return dict(by_class), by_structure
+
+
+def find_leaks(model):
+    """Check the structures of the model against each other, and return the number of objects
+    which are held by one structure while they should have been released by it. """
+    scheduled = set(id(agent) for agent in model.schedule.agents)
+    on_grid = grid_agents(model.grid)
+    indexed = [agent for index in model.grid.indexes.values() for cell in index.values() for agent in cell]
+    crime_field = model.crime_field
+    owned = np.unique(crime_field.hotspots.find_many(crime_field.area_id[crime_field.area_id >= 0]))
+
+    return {
+        # Agents still on the grid, or in its indexes, after they have left the schedule.
+        "grid_agents_not_scheduled": sum(id(agent) not in scheduled for agent in on_grid),
+        "indexed_agents_not_scheduled": sum(id(agent) not in scheduled for agent in indexed),
+        # Hotspots still held by the crime field once every position they owned has expired.
+        "hotspots_without_positions": len(set(crime_field.areas) - set(owned.tolist())),
+        # Ids given to the hotspots of the crime field, which are never reused.
+        "hotspot_ids": len(crime_field.hotspots),
+        # Neighbourhoods cached by the grid.
+        "neighborhood_cache_entries": len(model.grid._neighborhood_cache),
+    }
+
+
+def measure(width, checkpoints, engine="object", space="dense"):
+    """Run a model of the size given, and return its memory after construction and at every
+    step count of checkpoints. """
+    scale = (width * width) / (50 * 50)
+    params = dict(PARAMS, width=width, height=width,
+                  n_victims=int(PARAMS["n_victims"] * scale), n_offenders=int(PARAMS["n_offenders"] * scale),
+                  n_criminal_generators=max(int(PARAMS["n_criminal_generators"] * scale), 1))
+
+    gc.collect()
+    tracemalloc.start()
+    model = Model(**params, engine=engine, seed=SEED, space=space)
+    results = []
+    for step in sorted(checkpoints):
+        while model.schedule.steps < step and model.running:
+            model.step()
+        current, peak = tracemalloc.get_traced_memory()
+        by_class, by_structure = memory_by_owner(model)
+        results.append({"width": width, "steps": model.schedule.steps, "engine": engine, "space": space,
+                        "current": current, "peak": peak,
+                        "agents": dict(Counter(type(agent).__name__ for agent in model_agents(model))),
+                        "by_class": by_class, "by_structure": by_structure,
+                        "leaks": find_leaks(model)})
+    tracemalloc.stop()
+    return results
+
+
+def print_results(results):
+    mb = 2 ** 20
+    for r in results:
+        print("%dx%d, %s engine, %s space, step %d: current %.2f MB, peak %.2f MB"
+              % (r["width"], r["width"], r["engine"], r["space"], r["steps"], r["current"] / mb, r["peak"] / mb))
+        for name, size in sorted(r["by_class"].items(), key=lambda item: -item[1]):
+            print("    %-22s %6d agents %10.1f KB" % (name, r["agents"].get(name, 0), size / 1024))
+        for name, size in sorted(r["by_structure"].items(), key=lambda item: -item[1]):
+            print("    %-22s %17.1f KB" % (name, size / 1024))
+        growth = ("hotspot_ids", "neighborhood_cache_entries")
+        leaks = {name: n for name, n in r["leaks"].items() if n and name not in growth}
+        print("    leaks: %s, hotspot ids: %d, cached neighbourhoods: %d"
+              % (leaks or "none", r["leaks"]["hotspot_ids"], r["leaks"]["neighborhood_cache_entries"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report the memory of the model by size and step count.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[50, 100, 200])
+    parser.add_argument("--steps", nargs="+", type=int, default=[0, 25, 50])
+    parser.add_argument("--engine", choices=["object", "array"], default="object")
+    parser.add_argument("--space", choices=["dense", "sparse"], default="dense")
+    parser.add_argument("--output", help="file to write the results to, as JSON")
+    args = parser.parse_args(argv)
+
+    results = []
+    for width in args.sizes:
+        results.extend(measure(width, args.steps, args.engine, args.space))
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
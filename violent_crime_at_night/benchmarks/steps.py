@@ -0,0 +1,225 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+import mesa
+import numpy as np
+
+from agents.cognitive_agents.offenderAgent import PossibleOffender
+from agents.cognitive_agents.victimAgent import PossibleVictim
+from agents.environmental_agents.CrimeAttractor import CrimeAttractor
+from model.model import Model
+
+# Timings of model construction, model steps and the hot paths of the agents, for a set of
+# scenarios, written as JSON and optionally compared against a saved baseline.
+#
+# Run from the violent_crime_at_night directory with:
+#     python -m benchmarks.steps --output baseline.json
+#     python -m benchmarks.steps --compare baseline.json
+#
+# Every benchmark is repeated on a new model built from the same seed, and the minimum and median
+# time of a single call are reported.
+
+SEED = 2021
+
+# Parameters of the model in every scenario.
+SCENARIOS = {
+    "small": dict(n_victims=50, n_offenders=15, n_criminal_generators=3, r_criminal_generators=4,
+                  max_cp=0.5, pop_count=0, width=50, height=50),
+    "crowded": dict(n_victims=400, n_offenders=120, n_criminal_generators=3, r_criminal_generators=4,
+                    max_cp=0.5, pop_count=0, width=50, height=50),
+    "crime_heavy": dict(n_victims=100, n_offenders=30, n_criminal_generators=6, r_criminal_generators=8,
+                        max_cp=1, pop_count=0, width=50, height=50),
+    "large": dict(n_victims=1000, n_offenders=300, n_criminal_generators=40, r_criminal_generators=6,
+                  max_cp=0.5, pop_count=0, width=500, height=500),
+    "large_array": dict(n_victims=1000, n_offenders=300, n_criminal_generators=40, r_criminal_generators=6,
+                        max_cp=0.5, pop_count=0, width=500, height=500, engine="array"),
+}
+
+# Number of steps taken before the agent benchmarks, so that there are hotspots and victims
+# fleeing them.
+WARMUP_STEPS = 5
+
+
+def new_model(params, seed=SEED):
+    return Model(**params, seed=seed)
+
+
+def warm_model(params):
+    model = new_model(params)
+    for _ in range(WARMUP_STEPS):
+        if not model.running:
+            break
+        model.step()
+    return model
+
+
+def bench_init(params):
+    """Time the construction of a model. """
+    t = time.perf_counter()
+    new_model(params)
+    return time.perf_counter() - t, 1
+
+
+def bench_step(params, n_steps=10):
+    """Time the steps of a model, from its construction. """
+    model = new_model(params)
+    n = 0
+    t = time.perf_counter()
+    while n < n_steps and model.running:
+        model.step()
+        n += 1
+    return time.perf_counter() - t, n
+
+
+def bench_agents(agent_type, method):
+    """Return a benchmark timing method(agent) for every agent of the type in a warm model. """
+    def bench(params):
+        model = warm_model(params)
+        agents = model.schedule.agents_of_type(agent_type)
+        t = time.perf_counter()
+        for agent in agents:
+            method(agent)
+        return time.perf_counter() - t, len(agents)
+    return bench
+
+
+def bench_move_away_from_danger(params):
+    """Time move_away_from_danger for every victim of a warm model with danger around it. """
+    model = warm_model(params)
+    victims = [(victim, victim.surrounding_danger())
+               for victim in model.schedule.agents_of_type(PossibleVictim)]
+    victims = [(victim, surr_danger) for victim, surr_danger in victims if surr_danger]
+    t = time.perf_counter()
+    for victim, surr_danger in victims:
+        victim.move_away_from_danger(surr_danger)
+    return time.perf_counter() - t, len(victims)
+
+
+def bench_hotspot_merging(params, n_hotspots=100):
+    """Time adding hotspots to a warm model, clustered so that most of them merge. A hotspot is
+    added to the model when it is created. """
+    model = warm_model(params)
+    rng = random.Random(SEED)
+    centres = [(rng.randrange(model.width), rng.randrange(model.height)) for _ in range(5)]
+    poss = []
+    for _ in range(n_hotspots):
+        x, y = rng.choice(centres)
+        poss.append((min(max(x + rng.randint(-3, 3), 0), model.width - 1),
+                     min(max(y + rng.randint(-3, 3), 0), model.height - 1)))
+    t = time.perf_counter()
+    for pos in poss:
+        CrimeAttractor(model.next_id(), model, pos, model.hotspot_rad)
+    return time.perf_counter() - t, n_hotspots
+
+
+BENCHMARKS = {
+    "init": bench_init,
+    "step": bench_step,
+    "get_surr_crime": bench_agents(PossibleOffender, PossibleOffender.get_surr_crime),
+    "get_target": bench_agents(PossibleOffender, PossibleOffender.get_target),
+    "surrounding_danger": bench_agents(PossibleVictim, PossibleVictim.surrounding_danger),
+    "move_away_from_danger": bench_move_away_from_danger,
+    "hotspot_merging": bench_hotspot_merging,
+}
+
+# Benchmarks of the agents, which have nothing to time with the array engine.
+AGENT_BENCHMARKS = ("get_surr_crime", "get_target", "surrounding_danger", "move_away_from_danger")
+
+
+def run_benchmark(bench, params, repeat):
+    """Return the minimum, median and mean time of a call of the benchmark over the repeats. """
+    times = []
+    calls = 0
+    for _ in range(repeat):
+        elapsed, calls = bench(params)
+        if calls:
+            times.append(elapsed / calls)
+    if not times:
+        return None
+    return {"calls": calls, "min": min(times), "median": statistics.median(times),
+            "mean": statistics.mean(times)}
+
+
+def run_suite(scenarios, benchmarks, repeat):
+    """Run the benchmarks in every scenario, and return the results with their environment. """
+    results = {}
+    for scenario in scenarios:
+        params = SCENARIOS[scenario]
+        results[scenario] = {}
+        for name in benchmarks:
+            if params.get("engine") == "array" and name in AGENT_BENCHMARKS:
+                continue
+            result = run_benchmark(BENCHMARKS[name], params, repeat)
+            if result is not None:
+                results[scenario][name] = result
+                print("%-12s %-22s %12.3f us" % (scenario, name, result["median"] * 1e6), file=sys.stderr)
+
+    return {"environment": {"python": platform.python_version(), "platform": platform.platform(),
+                            "numpy": np.__version__, "mesa": mesa.__version__,
+                            "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+            "repeat": repeat,
+            "results": results}
+
+
+def compare(results, baseline, threshold, statistic="min"):
+    """Print the times (the statistic given) against those of the baseline, and return the names
+    of the benchmarks which are slower by more than the threshold (a fraction). """
+    regressions = []
+    print("%-12s %-22s %12s %12s %8s" % ("scenario", "benchmark", "baseline us", "current us", "ratio"))
+    for scenario, benchmarks in results["results"].items():
+        for name, result in benchmarks.items():
+            base = baseline["results"].get(scenario, {}).get(name)
+            if base is None:
+                print("%-12s %-22s %12s %12.3f" % (scenario, name, "-", result[statistic] * 1e6))
+                continue
+            ratio = result[statistic] / base[statistic]
+            flag = ""
+            if ratio > 1 + threshold:
+                flag = "  slower"
+                regressions.append((scenario, name))
+            elif ratio < 1 - threshold:
+                flag = "  faster"
+            print("%-12s %-22s %12.3f %12.3f %8.2f%s" % (scenario, name, base[statistic] * 1e6,
+                                                       result[statistic] * 1e6, ratio, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the model and the agents' hot paths.")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="file to write the results to, as JSON")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="fraction by which a benchmark may be slower than the baseline")
+    parser.add_argument("--statistic", choices=["min", "median", "mean"], default="min",
+                        help="time of a call compared against the baseline")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.scenarios, args.benchmarks, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    elif not args.compare:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.statistic)
+        if regressions:
+            print("%d benchmarks slower than the baseline" % len(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
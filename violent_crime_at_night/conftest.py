@@ -0,0 +1,2 @@
+# The tests import the project packages (model, batch, agents) from this directory, as the
+# scripts run from it do.
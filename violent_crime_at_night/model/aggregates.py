@@ -0,0 +1,36 @@
+class Aggregates:
+    """Running aggregates of the model, such as the number of victims or the sum of their fear.
+
+    Rather than being computed by scanning the agents, every aggregate is updated by the agents
+    (or the engines) when their state changes, so reading it is O(1). New aggregates are added
+    with register, and are then updated with add, set and reset.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.initial = {}
+
+    def register(self, name, initial=0):
+        """Add an aggregate, starting at the initial value. """
+        if name in self.values:
+            raise ValueError("Aggregate " + repr(name) + " is already registered")
+        self.values[name] = initial
+        self.initial[name] = initial
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+    def __contains__(self, name):
+        return name in self.values
+
+    def add(self, name, delta):
+        """Add delta to the aggregate. """
+        self.values[name] += delta
+
+    def set(self, name, value):
+        """Set the value of the aggregate. """
+        self.values[name] = value
+
+    def reset(self, name):
+        """Set the aggregate back to its initial value. """
+        self.values[name] = self.initial[name]
@@ -0,0 +1,249 @@
+import numpy as np
+
+from agents.environmental_agents import CrimeField, CrimeGenerator
+from agents.environmental_agents.CrimeField import window_sums
+from model.aggregates import Aggregates
+from model.datacollection import ColumnarDataCollector
+from model.instrumentation import Instrumentation, NULL_INSTRUMENTATION
+from model.model import average_perception_of_safety, crime_rate_single_run
+from model.offender_engine import OffenderEngine
+from model.rng import RandomStreams
+from model.space import IndexedMultiGrid
+from model.victim_engine import VictimEngine
+
+
+class BatchedCrimeField:
+    """The crime fields of every replicate of a BatchedModel.
+
+    Every replicate has a CrimeField of its own in fields, to which its crime generators and
+    attractors are added as in Model, merging its hotspots. The reputation and the summed area
+    tables of the fields are views of arrays with a leading replicate axis, indexed as
+    [replicate, x, y], so the engines read those of every replicate at once.
+    """
+
+    # Counts the queries of the fields, set by the model.
+    instrumentation = NULL_INSTRUMENTATION
+
+    def __init__(self, replicates, width, height):
+        self.width = width
+        self.height = height
+
+        self.reputation = np.zeros((replicates, width, height))
+        self.reputation_table = np.zeros((replicates, width + 1, height + 1))
+        self.crime_count_table = np.zeros((replicates, width + 1, height + 1), dtype=int)
+        self.fields = [CrimeField(width, height, views={"reputation": self.reputation[r],
+                                                        "reputation_table": self.reputation_table[r],
+                                                        "crime_count_table": self.crime_count_table[r]})
+                       for r in range(replicates)]
+
+    def window_sums_many(self, poss, radius, replicates):
+        """Return the number of criminal positions within radius of each of the (n, 2) array of
+        positions, in the replicate of each, and the sum of their reputations. """
+        for field in self.fields:
+            if field.reputation_changed:
+                field.update_summed_area()
+        return window_sums(self.crime_count_table, self.reputation_table, poss, radius, replicates,
+                           self.instrumentation)
+
+    def step(self, running):
+        """Deteriorate the reputation of the hotspots of the running replicates. """
+        for r in np.flatnonzero(running).tolist():
+            self.fields[r].step()
+
+
+class Replicate:
+    """One of the replicates of a BatchedModel, in the place of its Model: its crime field,
+    crime generators and attractors, and its aggregates and datacollector. It has the attributes
+    of Model read by its model reporters (the parameters, aggregates, total_crimes and running),
+    so the reporters of Model can be passed a replicate. """
+
+    def __init__(self, model, index, streams):
+        self.model = model
+        self.index = index
+        self.streams = streams
+        self.seed = streams.seed
+        self.current_id = 0
+        self.instrumentation = model.instrumentation
+        self.grid = model.grid
+        self.crime_field = model.crime_field.fields[index]
+
+        self.width = model.width
+        self.height = model.height
+        self.num_victims = model.num_victims
+        self.num_offenders = model.num_offenders
+        self.num_crime_areas = model.num_crime_areas
+        self.crime_area_rad = model.crime_area_rad
+        self.hotspot_rad = model.hotspot_rad
+        self.max_criminal_preference = model.max_criminal_preference
+        self.pop_count = model.pop_count
+
+        # Running aggregates of the replicate, as those of Model.
+        self.aggregates = Aggregates()
+        self.aggregates.register("victims")
+        self.aggregates.register("fear", 0.0)
+        self.aggregates.register("crimes", 0.0)
+        self.aggregates.register("total_crimes")
+
+        self.datacollector = ColumnarDataCollector(
+            model_reporters={"Average Perception of Safety": average_perception_of_safety,
+                             "Crime-rate": crime_rate_single_run},
+        )
+
+    def next_id(self):
+        """Return the next id of an agent of the replicate. """
+        self.current_id += 1
+        return self.current_id
+
+    @property
+    def running(self):
+        return bool(self.model.running[self.index])
+
+    @property
+    def steps(self):
+        """Number of steps the replicate has been advanced by. """
+        return int(self.model.steps[self.index])
+
+    @property
+    def crime_number(self):
+        """Number of crimes committed in this time step. """
+        return self.aggregates["crimes"]
+
+    @property
+    def total_crimes(self):
+        """Number of crimes committed since the replicate was created. """
+        return self.aggregates["total_crimes"]
+
+    def increment_crimes(self):
+        self.aggregates.add("crimes", 1)
+        self.aggregates.add("total_crimes", 1)
+
+
+class BatchedModel:
+    """Several replicates of Model with the array engine, one per seed, advanced all at once.
+
+    The victims and the offenders of every replicate are held by a single VictimEngine and
+    OffenderEngine, in arrays with a leading replicate axis, so every step of the model is a
+    few array operations over every replicate rather than one model step per replicate. The
+    reputation of the crime fields is held likewise, and the illuminance is the same for every
+    replicate, so its leading axis is a view of a single raster.
+
+    Replicate r gives the same results as Model(..., engine="array", seed=seeds[r]): it draws
+    its random numbers from streams of its own, derived from its seed as those of Model, and
+    it stops running, and is no longer stepped, once it has no victims left. Each replicate is
+    a Replicate in replicates, with its own datacollector, which can be passed to the model
+    reporters of Model.
+
+    If instrument is True, the wall time of every stage of every step, and the counters of the
+    work done by the engines and the crime fields of every replicate, are recorded by
+    self.instrumentation, as in Model.
+    """
+
+    def __init__(self, seeds, n_victims, n_offenders, n_criminal_generators, r_criminal_generators, max_cp,
+                 pop_count, width, height, instrument=False):
+        self.instrumentation = Instrumentation() if instrument else NULL_INSTRUMENTATION
+        start = self.instrumentation.clock()
+
+        streams = [RandomStreams(seed) for seed in seeds]
+        self.seeds = [s.seed for s in streams]
+        n = len(streams)
+
+        self.width = width
+        self.height = height
+        self.running = np.ones(n, dtype=bool)
+        self.steps = np.zeros(n, dtype=int)
+
+        # User settable parameters, the same for every replicate.
+        self.num_victims = n_victims
+        self.num_offenders = n_offenders
+        self.num_crime_areas = n_criminal_generators
+        self.crime_area_rad = r_criminal_generators
+        self.hotspot_rad = 1
+        self.max_criminal_preference = max_cp
+        self.pop_count = pop_count
+
+        # The grid only gives the neighbourhoods of the crime areas, it holds no agents.
+        self.grid = IndexedMultiGrid(width, height, torus=False)
+        self.grid.instrumentation = self.instrumentation
+
+        x, y = np.indices((width, height))
+        self.illuminance = np.broadcast_to((x + y) / (width + height - 2), (n, width, height))
+        self.crime_field = BatchedCrimeField(n, width, height)
+        self.crime_field.instrumentation = self.instrumentation
+        for field in self.crime_field.fields:
+            field.instrumentation = self.instrumentation
+        self.replicates = [Replicate(self, r, s) for r, s in enumerate(streams)]
+
+        # Place the victims, the offenders and the crime generators of every replicate in the
+        # same order as Model.
+        goal_poss, victim_poss, offender_poss, centroids = [], [], [], []
+        for replicate in self.replicates:
+            layout = replicate.streams.stream("layout")
+
+            def get_random_pos():
+                return layout.randrange(width), layout.randrange(height)
+
+            goal_poss.append([])
+            victim_poss.append([])
+            for i in range(n_victims):
+                goal_poss[-1].append(get_random_pos())
+                victim_poss[-1].append(get_random_pos())
+            offender_poss.append([get_random_pos() for i in range(n_offenders)])
+            if isinstance(n_criminal_generators, int):
+                centroids.append([get_random_pos() for i in range(n_criminal_generators)])
+            else:
+                centroids.append(n_criminal_generators)
+
+        self.victim_engine = VictimEngine(self, victim_poss, goal_poss, self.replicates)
+        self.offender_engine = OffenderEngine(self, offender_poss, max_cp, self.replicates)
+        for replicate, replicate_centroids in zip(self.replicates, centroids):
+            for c in replicate_centroids:
+                CrimeGenerator(replicate.next_id(), replicate, c, r_criminal_generators)
+
+        # With every step the crime fields decay, then the victims move, then the offenders.
+        self.stages = [self.crime_field.step, self.victim_engine.step, self.offender_engine.step]
+        self.instrumentation.add_time("setup", start)
+
+        start = self.instrumentation.clock()
+        self.collect(self.running)
+        self.instrumentation.add_time("collect", start)
+        self.instrumentation.end_step(0)
+
+    def __len__(self):
+        return len(self.replicates)
+
+    def collect(self, replicates):
+        """Collect the model reporters of the replicates given by the boolean array. """
+        for r in np.flatnonzero(replicates).tolist():
+            self.replicates[r].datacollector.collect(self.replicates[r], step=int(self.steps[r]))
+
+    def step(self, replicates=None):
+        """Advance every running replicate by one step, or only those running among the
+        replicates given by the boolean array. """
+        stepping = self.running.copy()
+        if replicates is not None:
+            stepping &= replicates
+        for stage in self.stages:
+            start = self.instrumentation.clock()
+            stage(stepping)
+            self.instrumentation.add_time(stage.__qualname__, start)
+        self.steps[stepping] += 1
+
+        start = self.instrumentation.clock()
+        self.collect(stepping)
+        self.instrumentation.add_time("collect", start)
+
+        # Replicates without victims left stop running.
+        for r in np.flatnonzero(stepping).tolist():
+            aggregates = self.replicates[r].aggregates
+            if not aggregates["victims"]:
+                self.running[r] = False
+            aggregates.reset("crimes")
+        self.instrumentation.end_step(int(self.steps.max()))
+
+    def run(self, max_steps):
+        """Advance every replicate until it stops running, or reaches max_steps. """
+        while True:
+            stepping = self.running & (self.steps < max_steps)
+            if not stepping.any():
+                return
+            self.step(stepping)
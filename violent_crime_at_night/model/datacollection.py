@@ -0,0 +1,216 @@
+import bisect
+import os
+import shutil
+import tempfile
+import weakref
+from operator import attrgetter
+
+import numpy as np
+import pandas as pd
+
+
+def nan_to_none(values):
+    """Return the array of values as a list, with None for NaN. """
+    if values.dtype.kind != "f":
+        return values.tolist()
+    return [None if value != value else value for value in values.tolist()]
+
+
+class Column:
+    """A column of collected values, held in fixed size typed arrays.
+
+    Values are written into a preallocated chunk, and once the chunk is full it is kept
+    and a new one is started, so the column grows without copying what has already been
+    collected. If a spill path is given, full chunks are saved to .npy files instead of being
+    kept in memory, and are read back (memory mapped) only when they are indexed.
+
+    Indexing and slicing work as on a list, so the column can be used wherever mesa uses the
+    lists of its DataCollector. None is stored as NaN, and is given back as None when the
+    column is indexed or iterated, as from those lists. read and slices return arrays, which
+    hold the NaN.
+    """
+
+    def __init__(self, chunk_size=1024, dtype=float, spill_path=None):
+        self.chunk_size = chunk_size
+        self.dtype = dtype
+        self.spill_path = spill_path  # Format string of the path of each chunk, if spilled.
+
+        self.chunks = []  # Full chunks, either arrays or the paths they were spilled to.
+        self.offsets = []  # Index of the first value of each chunk.
+        self.buffer = np.empty(chunk_size, dtype=dtype)
+        self.fill = 0  # Number of values in the buffer.
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def append(self, value):
+        """Append a value to the column, None is stored as NaN. """
+        self.buffer[self.fill] = np.nan if value is None else value
+        self.fill += 1
+        self.length += 1
+        if self.fill == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Move the values in the buffer to a chunk of their own. """
+        if not self.fill:
+            return
+        chunk = self.buffer[:self.fill]
+        if self.spill_path is not None:
+            path = self.spill_path % len(self.chunks)
+            np.save(path, chunk)
+            chunk = path
+        else:
+            self.buffer = np.empty(self.chunk_size, dtype=self.dtype)
+        self.chunks.append(chunk)
+        self.offsets.append(self.length - self.fill)
+        self.fill = 0
+
+    def load(self, i):
+        """Return the values of the chunk. """
+        chunk = self.chunks[i]
+        if isinstance(chunk, str):
+            return np.load(chunk, mmap_mode="r")
+        return chunk
+
+    def unspill(self):
+        """Read the spilled chunks back into memory, and stop spilling. """
+        self.chunks = [np.load(chunk) if isinstance(chunk, str) else chunk for chunk in self.chunks]
+        self.spill_path = None
+
+    def read(self, start, stop):
+        """Return an array with the values from start to stop, loading only the chunks which
+        hold them. """
+        start, stop = max(start, 0), min(stop, self.length)
+        if start >= stop:
+            return np.empty(0, dtype=self.dtype)
+
+        parts = []
+        first = max(bisect.bisect_right(self.offsets, start) - 1, 0)
+        for i in range(first, len(self.chunks)):
+            offset = self.offsets[i]
+            if offset >= stop:
+                break
+            chunk = self.load(i)
+            parts.append(chunk[max(start - offset, 0):stop - offset])
+
+        buffer_offset = self.length - self.fill
+        if stop > buffer_offset:
+            parts.append(self.buffer[max(start - buffer_offset, 0):stop - buffer_offset])
+        return np.concatenate(parts)
+
+    def to_numpy(self):
+        """Return an array with all the values of the column. """
+        return self.read(0, self.length)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            if step == 1:
+                return self.read(start, stop)
+            return self.to_numpy()[index]
+
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("Column index out of range")
+        return self.tolist(index, index + 1)[0]
+
+    def __iter__(self):
+        for i in range(len(self.chunks)):
+            yield from nan_to_none(self.load(i))
+        yield from nan_to_none(self.buffer[:self.fill])
+
+    def tolist(self, start=0, stop=None):
+        """Return a list with the values from start to stop, with None for NaN. """
+        return nan_to_none(self.read(start, self.length if stop is None else stop))
+
+
+class ColumnarDataCollector:
+    """Collects the values of the model reporters into typed columns, a drop in replacement for
+    mesa's DataCollector with model reporters only. It has no agent reporters, so
+    agent_reporters is empty and get_agent_vars_dataframe returns an empty DataFrame, as mesa's
+    DataCollector does without agent reporters, for mesa's BatchRunner.
+
+    The reporters are collected every interval steps of the model schedule. As with mesa's
+    DataCollector, a reporter is either a function of the model, the name of an attribute of
+    the model, or a list of a function and the arguments to call it with. Each reporter, and
+    the step of every collection, is held in a Column, available in model_vars as with mesa's
+    DataCollector.
+
+    If a spill directory is given, the full chunks of the columns are saved to .npy files in a
+    directory of their own within it. The directory is removed by close, or once the collector
+    is garbage collected.
+    """
+
+    def __init__(self, model_reporters=None, interval=1, chunk_size=1024, spill_dir=None):
+        self.model_reporters = {name: self.make_reporter(name, reporter)
+                                for name, reporter in (model_reporters or {}).items()}
+        self.agent_reporters = {}
+        self.interval = interval
+
+        self.directory = None
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+            self.directory = tempfile.mkdtemp(prefix="run_", dir=spill_dir)
+            self.remove_directory = weakref.finalize(self, shutil.rmtree, self.directory, True)
+
+        def spill_path(name):
+            if self.directory is None:
+                return None
+            return os.path.join(self.directory, name + "_%05d.npy")
+
+        self.steps = Column(chunk_size, dtype=np.int64, spill_path=spill_path("steps"))
+        self.model_vars = {name: Column(chunk_size, spill_path=spill_path("reporter_%d" % i))
+                           for i, name in enumerate(self.model_reporters)}
+
+    @staticmethod
+    def make_reporter(name, reporter):
+        """Return the reporter as a function of the model. """
+        if isinstance(reporter, str):
+            return attrgetter(reporter)
+        if isinstance(reporter, list) and len(reporter) == 2 and callable(reporter[0]):
+            function, args = reporter
+            return lambda model: function(*args)
+        if not callable(reporter):
+            raise TypeError("Model reporter " + repr(name) + " must be a function, the name of an "
+                            "attribute or a list of a function and its arguments, not " + repr(reporter))
+        return reporter
+
+    def collect(self, model, step=None):
+        """Collect the values of the model reporters, if the model is at a collection step.
+        The step is that of the model schedule, unless given. """
+        if step is None:
+            step = model.schedule.steps
+        if step % self.interval:
+            return
+        self.steps.append(step)
+        for name, reporter in self.model_reporters.items():
+            self.model_vars[name].append(reporter(model))
+
+    def flush(self):
+        """Save the values collected so far, if spilling to disk. """
+        self.steps.flush()
+        for column in self.model_vars.values():
+            column.flush()
+
+    def close(self):
+        """Read the spilled values back into memory and remove the spill directory, once the
+        model has finished. Values collected afterwards are kept in memory. """
+        if self.directory is None:
+            return
+        self.steps.unspill()
+        for column in self.model_vars.values():
+            column.unspill()
+        self.remove_directory()
+        self.directory = None
+
+    def get_agent_vars_dataframe(self):
+        """Return an empty DataFrame, as there are no agent reporters. """
+        return pd.DataFrame()
+
+    def get_model_vars_dataframe(self):
+        """Return a DataFrame with one column per model reporter, indexed by step. """
+        return pd.DataFrame({name: column.to_numpy() for name, column in self.model_vars.items()},
+                            index=self.steps.to_numpy(), columns=list(self.model_vars))
@@ -0,0 +1,62 @@
+import numpy as np
+
+
+class DisjointSet:
+    """Disjoint sets of integer ids (union-find), with union by size and path compression.
+
+    The parents of the ids are held in a numpy array, so the roots of many ids (such as the ids
+    stored in a raster) can be found at once with find_many.
+    """
+
+    def __init__(self, capacity=64):
+        self.parent = np.arange(capacity)
+        self.size = np.ones(capacity, dtype=int)
+        self.n = 0
+
+    def __len__(self):
+        return self.n
+
+    def make_set(self):
+        """Add a new id, in a set of its own, and return it. """
+        if self.n == len(self.parent):
+            capacity = 2 * len(self.parent)
+            self.parent = np.concatenate([self.parent, np.arange(self.n, capacity)])
+            self.size = np.concatenate([self.size, np.ones(capacity - self.n, dtype=int)])
+        i = self.n
+        self.n += 1
+        return i
+
+    def find(self, i):
+        """Return the root of the set of the id. """
+        parent = self.parent
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+
+        # Point every id on the path directly at the root.
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return int(root)
+
+    def find_many(self, ids):
+        """Return an array with the root of the set of each of the ids. """
+        ids = np.asarray(ids)
+        roots = self.parent[ids]
+        while True:
+            parents = self.parent[roots]
+            if (parents == roots).all():
+                break
+            roots = parents
+        self.parent[ids] = roots
+        return roots
+
+    def union(self, a, b):
+        """Merge the sets of the ids a and b, and return the root of the merged set. """
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return a
@@ -0,0 +1,135 @@
+"""Distance kernels and neighbourhood tables shared by the agents.
+
+The scalar kernels work on plain (x, y) tuples of ints, so they can be called inside the
+agents' comprehensions without allocating any arrays.
+
+The tables hold, for a moore neighbourhood of a given radius, the (dx, dy) offset of every
+position and its distance from the centre. They are ordered like the neighbourhoods returned by
+the grid (by x and then by y), and are precomputed for the radii the agents use.
+
+The distance transform gives, for every position of a raster, the manhattan distance to the
+nearest position of a mask and which position that is.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+
+# Radii of the neighbourhoods used by the agents: their moves, and the visibility of
+# victims and offenders.
+AGENT_RADII = (1, 4, 5)
+
+
+def manhattan(a, b):
+    """Calculate the manhattan distance between two positions a and b on the grid. """
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+def chebyshev(a, b):
+    """Calculate the chebyshev (moore neighbourhood) distance between two positions a and b. """
+    return max(abs(a[0] - b[0]), abs(a[1] - b[1]))
+
+
+def euclidean(a, b):
+    """Calculate the euclidean distance between two positions a and b on the grid. """
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+
+METRICS = {"manhattan": manhattan,
+           "chebyshev": chebyshev,
+           "euclidean": euclidean}
+
+
+@lru_cache(maxsize=None)
+def moore_offsets(radius, include_center=True):
+    """Return an array with the (dx, dy) offsets of the moore neighbourhood of the radius. """
+    offsets = [(dx, dy) for dx in range(-radius, radius + 1) for dy in range(-radius, radius + 1)
+               if include_center or dx or dy]
+    offsets = np.array(offsets, dtype=int).reshape(-1, 2)
+    offsets.flags.writeable = False
+    return offsets
+
+
+@lru_cache(maxsize=None)
+def offset_distances(radius, metric="manhattan", include_center=True):
+    """Return the distance from the centre to each of the offsets of moore_offsets(radius). """
+    distance = METRICS[metric]
+    distances = np.array([distance((0, 0), offset) for offset in
+                          moore_offsets(radius, include_center).tolist()], dtype=float)
+    distances.flags.writeable = False
+    return distances
+
+
+@lru_cache(maxsize=None)
+def distance_table(radius, metric="manhattan"):
+    """Return a (2 * radius + 1) square array with the distance from its centre to every
+    position, indexed as [dx + radius, dy + radius]. """
+    table = offset_distances(radius, metric).reshape(2 * radius + 1, 2 * radius + 1)
+    return table
+
+
+def table_window(table, pos, x_slice, y_slice):
+    """Return the part of a distance table centred on pos which covers the grid window given
+    by x_slice and y_slice. """
+    radius = table.shape[0] // 2
+    return table[x_slice.start - pos[0] + radius:x_slice.stop - pos[0] + radius,
+                 y_slice.start - pos[1] + radius:y_slice.stop - pos[1] + radius]
+
+
+def gather(raster, poss, offsets, groups=None):
+    """Return the values of the raster at each of the positions plus each of the offsets,
+    and whether those positions are within the grid. Positions outside the grid take the
+    value of the nearest position within it.
+
+    If the raster has a leading axis (such as the replicates of a batched model), each position
+    is read from the raster of its group, given by groups. groups are ignored otherwise. """
+    cells = poss[:, None, :] + offsets[None, :, :]
+    width, height = raster.shape[-2:]
+    valid = ((cells[..., 0] >= 0) & (cells[..., 0] < width) &
+             (cells[..., 1] >= 0) & (cells[..., 1] < height))
+    x = np.clip(cells[..., 0], 0, width - 1)
+    y = np.clip(cells[..., 1], 0, height - 1)
+    values = raster[x, y] if raster.ndim == 2 else raster[groups[:, None], x, y]
+    return values, valid
+
+
+def values_at(raster, poss, groups=None):
+    """Return the values of the raster at each of the positions, which must be within the
+    grid. As with gather, each position is read from the raster of its group if the raster
+    has a leading axis. """
+    if raster.ndim == 2:
+        return raster[poss[:, 0], poss[:, 1]]
+    return raster[groups, poss[:, 0], poss[:, 1]]
+
+
+def manhattan_transform(mask):
+    """Return the manhattan distance from every position of the raster to the nearest position
+    where the mask is True (inf if there is none), and the flat index (x * height + y) of that
+    position. Ties are broken by the lowest (x, y), as min does with (distance, pos) tuples.
+
+    The manhattan distance is separable, so it is computed with a forward and a backward
+    running minimum along y and then along x, on keys which order the positions by
+    (distance, x, y): key = distance * width * height + x * height + y. """
+    width, height = mask.shape
+    k = width * height
+    none = np.iinfo(np.int64).max // 4
+    key = np.where(mask, np.arange(k, dtype=np.int64).reshape(width, height), none)
+
+    for axis, n in ((1, height), (0, width)):
+        shape = (1, n) if axis else (n, 1)
+        step = np.arange(n, dtype=np.int64).reshape(shape) * k
+        forward = np.minimum.accumulate(key - step, axis=axis) + step
+        backward = np.flip(np.minimum.accumulate(np.flip(key + step, axis), axis=axis), axis) - step
+        key = np.minimum(forward, backward)
+
+    found = key < none // 2
+    distance = np.where(found, key // k, np.inf)
+    nearest = np.where(found, key % k, -1)
+    return distance, nearest
+
+
+# Build the tables of the radii used by the agents up front.
+for _radius in AGENT_RADII:
+    for _metric in METRICS:
+        distance_table(_radius, _metric)
+        offset_distances(_radius, _metric, include_center=False)
@@ -0,0 +1,92 @@
+import time
+from collections import defaultdict
+
+import pandas as pd
+
+
+class Instrumentation:
+    """Records the wall time of the phases of every step of a model, and counters of the work
+    done in its hot paths.
+
+    The time of each phase (a stage of the schedule, such as the step of the agents of a type,
+    or the collection of the data) and the counters are accumulated over a step, and recorded
+    as a row of the report when the step ends. The counters used by the model are:
+        - neighborhood_queries: neighbourhoods looked up in the grid or the crime field.
+        - cells_scanned: positions examined by those queries.
+        - distance_evaluations: distances computed between positions.
+        - agents_created, agents_removed: agents added to or removed from the simulation,
+          including the crime areas, of which hotspots are removed when they expire or are
+          merged into a new one.
+        - hotspot_merges: hotspots merged into a new one.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.times = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.steps = []
+        self.rows = []
+
+    def clock(self):
+        """Return the time to pass to add_time once the phase is over. """
+        return time.perf_counter()
+
+    def add_time(self, phase, start):
+        """Add the time since start to the time of the phase in this step. """
+        self.times[phase] += time.perf_counter() - start
+
+    def count(self, counter, n=1):
+        """Add n to the counter in this step. """
+        self.counters[counter] += n
+
+    def query(self, cells):
+        """Count a neighbourhood query which examined the number of cells given. """
+        self.counters["neighborhood_queries"] += 1
+        self.counters["cells_scanned"] += cells
+
+    def end_step(self, step):
+        """Record the times and counters of the step, and start the next one. """
+        row = {"time." + phase: t for phase, t in self.times.items()}
+        row.update(self.counters)
+        self.steps.append(step)
+        self.rows.append(row)
+        self.times = defaultdict(float)
+        self.counters = defaultdict(int)
+
+    def get_report_dataframe(self):
+        """Return a DataFrame with the times (in seconds) and counters of every step, indexed by
+        step like the datacollector's model vars, so the two can be joined. """
+        report = pd.DataFrame(self.rows, index=self.steps)
+        report = report.reindex(columns=sorted(report.columns)).fillna(0)
+        counters = [column for column in report.columns if not column.startswith("time.")]
+        report[counters] = report[counters].astype(int)
+        return report
+
+    def totals(self):
+        """Return the times and counters summed over every step. """
+        return self.get_report_dataframe().sum().to_dict()
+
+
+class NullInstrumentation:
+    """Instrumentation which records nothing, used when the instrumentation of a model is off. """
+
+    enabled = False
+
+    def clock(self):
+        return 0
+
+    def add_time(self, phase, start):
+        pass
+
+    def count(self, counter, n=1):
+        pass
+
+    def query(self, cells):
+        pass
+
+    def end_step(self, step):
+        pass
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
@@ -1,53 +1,92 @@
 from mesa import Model
-from mesa.time import RandomActivation
-from mesa.space import MultiGrid
 from agents.cognitive_agents.offenderAgent import PossibleOffender
 from agents.cognitive_agents.victimAgent import SafeLocation, PossibleVictim
-from agents.environmental_agents import CrimeGenerator, GeneratorLoc
-from agents.environmental_agents.lightAgent import Light
-import uuid
-from mesa.datacollection import DataCollector
-
-crime_number = 0
+from agents.environmental_agents import CrimeField, CrimeGenerator
+from model.space import IndexedMultiGrid, IndexedSparseMultiGrid
+from model.time import TypeStagedActivation
+from model.offender_engine import OffenderEngine
+from model.victim_engine import VictimEngine
+from model.rng import RandomStreams
+from model.aggregates import Aggregates
+import numpy as np
+from model.datacollection import ColumnarDataCollector
+from model.instrumentation import Instrumentation, NULL_INSTRUMENTATION
 
 
 def compute_crime_rate(model):
     """Get the crime rate per 1000 poeple. """
-    crime_rate = (crime_number / model.pop_count) * 1000
+    crime_rate = (model.total_crimes / model.pop_count) * 1000
     return crime_rate
 
 
 def crime_rate_single_run(model):
     """Get the number of crimes commited per time step. """
-    crime_rate = (crime_number / (model.num_offenders + model.num_victims)) * 10
+    crime_rate = (model.total_crimes / (model.num_offenders + model.num_victims)) * 10
     return crime_rate
 
 
 def crime_number_per_timestep(model):
     """Return the number of crimes committed per time step"""
-    return model.crime_number
+    return model.aggregates["crimes"]
 
 
 def average_perception_of_safety(model):
     """Returns the average perception of safety of all agents in the model. """
-    agent_safety = [(1 - agent.fear) for agent in model.schedule.agents if
-                    isinstance(agent, PossibleVictim)]
-
-    if agent_safety:
-        average_safety = sum(agent_safety) / len(agent_safety)
+    n_victims = model.aggregates["victims"]
+    if n_victims:
+        average_safety = 1 - model.aggregates["fear"] / n_victims
         return average_safety
 
 
 class Model(Model):
     """A model with a number of agents.
-    It represents a space where you can experiment by varying parameters"""
+    It represents a space where you can experiment by varying parameters
 
-    def __init__(self, n_victims, n_offenders, n_criminal_generators, r_criminal_generators, max_cp,
-                 pop_count, width, height):
+    The engine determines how the possible victims and offenders are represented:
+        - "object": each victim and offender is an agent in the schedule and the grid.
+        - "array": the victims and the offenders are held and stepped all at once by a
+          VictimEngine and an OffenderEngine.
+
+    The space determines how the grid stores the agents:
+        - "dense": a MultiGrid, with a list for every cell of the grid.
+        - "sparse": a SparseMultiGrid, which only allocates the chunks of the grid holding
+          agents, for large grids with few agents.
+
+    If instrument is True, the wall time of every phase of every step, and counters of the work
+    done in the hot paths of the agents, are recorded by self.instrumentation. Otherwise it is a
+    NullInstrumentation, which records nothing.
 
-        self.grid = MultiGrid(width, height, torus=False)
-        self.schedule = RandomActivation(self)
-        self.datacollector = DataCollector(
+    Every random draw of the model and its agents comes from the random number streams of the
+    model, derived from the seed. Models with the same seed are reproducible, and models with
+    the same seed but different parameters share their random numbers (common random numbers).
+    """
+
+    def __init__(self, n_victims, n_offenders, n_criminal_generators, r_criminal_generators, max_cp,
+                 pop_count, width, height, engine="object", seed=None, space="dense",
+                 instrument=False):
+
+        self.instrumentation = Instrumentation() if instrument else NULL_INSTRUMENTATION
+        start = self.instrumentation.clock()
+
+        # Agents are given increasing integer ids by next_id.
+        self.current_id = 0
+
+        # Random number streams of the model. The schedule activates the agents in the order
+        # given by self.random, and the layout stream places the agents and the crime areas.
+        self.streams = RandomStreams(seed)
+        self.seed = self.streams.seed
+        self.random = self.streams.stream("schedule")
+        self.layout_random = self.streams.stream("layout")
+
+        if space not in ("dense", "sparse"):
+            raise ValueError("Unknown space " + repr(space))
+        self.space = space
+        grid_cls = IndexedSparseMultiGrid if space == "sparse" else IndexedMultiGrid
+        self.grid = grid_cls(width, height, torus=False,
+                             indexed_types=(PossibleVictim, PossibleOffender))
+        self.grid.instrumentation = self.instrumentation
+        self.schedule = TypeStagedActivation(self)
+        self.datacollector = ColumnarDataCollector(
             model_reporters={"Average Perception of Safety": average_perception_of_safety,
                              "Crime-rate": crime_rate_single_run},
         )
@@ -55,9 +94,30 @@ class Model(Model):
         self.height = height
         self.running = True
 
-        # Number of crimes committed per time step.
-        self.crime_number = 0.0
-
+        # Illuminance incident in each cell of the grid, indexed as [x, y].
+        self.illuminance = np.zeros((width, height))
+
+        # Criminal reputation of each cell of the grid.
+        self.crime_field = CrimeField(width, height)
+        self.crime_field.instrumentation = self.instrumentation
+
+        # Array representation of the victims and offenders, if the array engine is used.
+        if engine not in ("object", "array"):
+            raise ValueError("Unknown engine " + repr(engine))
+        self.engine = engine
+        self.victim_engine = None
+        self.offender_engine = None
+
+        # Running aggregates of the model, kept up to date by the agents:
+        #   - victims: number of victims walking home.
+        #   - fear: sum of the fear of those victims.
+        #   - crimes: number of crimes committed in this time step.
+        #   - total_crimes: number of crimes committed since the model was created.
+        self.aggregates = Aggregates()
+        self.aggregates.register("victims")
+        self.aggregates.register("fear", 0.0)
+        self.aggregates.register("crimes", 0.0)
+        self.aggregates.register("total_crimes")
 
         # User settable parameters
         self.num_victims = n_victims
@@ -80,108 +140,62 @@ class Model(Model):
         # add crime areas
         self.add_criminal_areas()
 
+        # With every step the crime field decays, then the victims move, then the offenders.
+        # Safe locations have no behaviour, so they are never stepped.
+        if self.engine == "array":
+            self.schedule.stages = [self.crime_field.step, self.victim_engine.step,
+                                    self.offender_engine.step]
+        else:
+            self.schedule.stages = [self.crime_field.step, PossibleVictim, PossibleOffender]
+        self.instrumentation.add_time("setup", start)
+
+        start = self.instrumentation.clock()
         self.datacollector.collect(self)
+        self.instrumentation.add_time("collect", start)
+        self.instrumentation.end_step(self.schedule.steps)
 
     def light_layer(self):
         """Add the light layer to the model. """
-        for i in range(self.width):
-            for j in range(self.height):
-                l = Light(uuid.uuid4(), i + j, self)
-                self.schedule.add(l)
-                # light is ordered from darkest to lightest from the
-                # bottom left corner to the top right corner.
-                self.grid.place_agent(l, (i, j))
-
-                # light is randomised, so long as the
-                # luminance difference of surrounding cells is within a limit
-                # self.grid.place_agent(l, self.r_pos(l))
-
-    def r_pos(self, new_l):
-        """Randomises the positions of the light realistically by considering the difference
-        between the illuminance in one position and another"""
-
-        # Position precisely one light agent per position.
-        valid = False
-
-        while not valid:
-            x = self.random.randrange(self.width)
-            y = self.random.randrange(self.height)
-
-            # Check if there is already a light agent in this spot
-            if not (any(isinstance(agent, Light)
-                        for agent in self.grid.get_cell_list_contents((x, y)))):
-                # Check whether given the difference in the influencing factors between the agent
-                # and surrounding agents, the new agent can be placed in this position.
-                # Returns True or False
-                if self.valid_pos((x, y), new_l, 1):
-                    valid = True
-                    return x, y
-
-    def valid_pos(self, n_pos, new_a, delta):
-        """Check whether this position is a valid position given the difference in
-        the inlfueincing factors between the new agent and the surrounding agents"""
-
-        # Get the surrounding positions
-        neighborhood = self.grid.get_neighborhood(n_pos, moore=True,
-                                                  include_center=False)
-
-        # print("Neighboring positions are " + str(neighborhood))
-
-        # Get the surrounding positions containing light agents.
-        cell_contents = []
-        for pos in neighborhood:
-            cell_contents.append(self.grid.get_cell_list_contents([pos]))
-
-        # print("these are the surrounding cell contents " + str(cell_contents))
-        f_cell_contents = [val for sublist in cell_contents for val in sublist]
-        # print("this is the flat list of the surrounding cell contents " + str(cell_contents))
-
-        surr_light = [a for a in f_cell_contents if isinstance(a, Light)]
-        # print("This is the surrounding light list: " + str(surr_light) + " there are " + str(len(surr_light)))
-
-        # If the surrounding light list is empty, return the position
-        if len(surr_light) == 0:
-            # print("I can be placed here because there is no surrounding light")
-            return True
-        else:
-            # Check whether the difference in illuminance is within the valid scope
-            for l in surr_light:
-                # print("Illuminance of surr light = " + str(l.illuminance))
-                # print("Illuminance of surr light = " + str(new_a.illuminance))
-                # print("This is the delta between illuminances " + str(abs(l.illuminance - new_a.illuminance)))
-
-                if abs(l.illuminance - new_a.illuminance) >= delta:
-                    # print("I cant be placed here because the difference in illuminance is " + str(
-                    #     abs(l.illuminance - new_a.illuminance)) +
-                    #       " which is greater than the difference allowed " + str(delta))
-                    return False
-
-        return True
+        # light is ordered from darkest to lightest from the
+        # bottom left corner to the top right corner.
+        x, y = np.indices((self.width, self.height))
+        self.illuminance = (x + y) / (self.width + self.height - 2)
 
     def get_random_pos(self):
-        x = self.random.randrange(self.grid.width)
-        y = self.random.randrange(self.grid.height)
+        x = self.layout_random.randrange(self.grid.width)
+        y = self.layout_random.randrange(self.grid.height)
         return (x, y)
 
     def add_victims(self):
+        if self.engine == "array":
+            goal_poss, poss = [], []
+            for i in range(self.num_victims):
+                goal_poss.append(self.get_random_pos())
+                poss.append(self.get_random_pos())
+            self.victim_engine = VictimEngine(self, [poss], [goal_poss], [self])
+            return
+
         for i in range(self.num_victims):
             # Generate a safe location for this agent.
-            s = SafeLocation(uuid.uuid4(), self)
+            s = SafeLocation(self.next_id(), self)
             self.schedule.add(s)
             self.grid.place_agent(s, self.get_random_pos())
 
             # Generate the agent given its safe location.
-            p = PossibleVictim(uuid.uuid4(), self, s)
+            p = PossibleVictim(self.next_id(), self, s)
             self.schedule.add(p)
             self.grid.place_agent(p, self.get_random_pos())
 
     def add_offenders(self):
+        if self.engine == "array":
+            poss = [self.get_random_pos() for i in range(self.num_offenders)]
+            self.offender_engine = OffenderEngine(self, [poss], self.max_criminal_preference, [self])
+            return
+
         for i in range(self.num_offenders):
-            c = PossibleOffender(uuid.uuid4(), self, self.max_criminal_preference)
+            c = PossibleOffender(self.next_id(), self, self.max_criminal_preference)
             self.schedule.add(c)
-            x = self.random.randrange(self.grid.width)
-            y = self.random.randrange(self.grid.height)
-            self.grid.place_agent(c, (x, y))
+            self.grid.place_agent(c, self.get_random_pos())
 
     def generate_criminal_areas(self):
         """ Return a list of criminal areas with specified centroids and radius.
@@ -197,9 +211,7 @@ class Model(Model):
             generate random centroids for the criminal areas. """
             centroids = []
             for i in range(n):
-                x = self.random.randrange(self.grid.width)
-                y = self.random.randrange(self.grid.height)
-                centroids.append((x, y))
+                centroids.append(self.get_random_pos())
             return centroids
 
         def get_surr_pos(pos, r=3):
@@ -217,7 +229,7 @@ class Model(Model):
         # For every centroid in the list, create either a hotspot or a criminal area depending
         # on the type.
         for c in centroids:
-            criminal_area.append(CrimeGenerator(uuid.uuid4(), self, c, radius))
+            criminal_area.append(CrimeGenerator(self.next_id(), self, c, radius))
 
         # Return a list of criminal areas.
         return criminal_area
@@ -228,19 +240,30 @@ class Model(Model):
         if criminal_area is None:
             criminal_area = self.generate_criminal_areas()
 
+    @property
+    def crime_number(self):
+        """Number of crimes committed in this time step. """
+        return self.aggregates["crimes"]
+
+    @property
+    def total_crimes(self):
+        """Number of crimes committed since the model was created. """
+        return self.aggregates["total_crimes"]
+
     def increment_crimes(self):
-        self.crime_number += 1
-        global crime_number
-        crime_number += 1
+        self.aggregates.add("crimes", 1)
+        self.aggregates.add("total_crimes", 1)
 
     def check_victim_agents(self):
-        if not [agent for agent in self.schedule.agents if
-                isinstance(agent, PossibleVictim)]:
+        if not self.aggregates["victims"]:
             self.running = False
 
     def step(self):
         """Advance the model by one step."""
         self.schedule.step()
+        start = self.instrumentation.clock()
         self.datacollector.collect(self)
+        self.instrumentation.add_time("collect", start)
         self.check_victim_agents()
-        self.crime_number = 0
+        self.aggregates.reset("crimes")
+        self.instrumentation.end_step(self.schedule.steps)
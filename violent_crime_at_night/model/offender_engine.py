@@ -0,0 +1,178 @@
+import numpy as np
+
+from agents.environmental_agents.CrimeAttractor import CrimeAttractor
+from model.distance import gather, moore_offsets, offset_distances
+from model.replicates import uniform
+
+
+class OffenderEngine:
+    """Struct-of-arrays representation of the possible offenders of the model.
+
+    The state of every offender (position, criminal preference, criminal fulfillment and area
+    preference) is held in numpy arrays, and the behaviour of PossibleOffender.step is computed
+    for all the offenders at once with every tick:
+        - the criminal motive intensity of every offender is computed from the crime field of
+          the model.
+        - the nearest victim within the visibility of every offender is selected as its target.
+        - the offenders chase their target, move towards the nearest criminal position or move
+          randomly, and their criminal fulfillment decreases.
+        - the offenders which have caught their target commit a crime.
+
+    All the decisions are made from the state of the model at the start of the tick. The crimes
+    are then committed one offender at a time, in order, so a victim caught by several
+    offenders is the victim of a single crime.
+
+    As with VictimEngine, the engine holds the offenders of every replicate of the model, given
+    by the model of each replicate, in arrays indexed as [replicate, offender]. Each replicate
+    draws its random numbers from its own streams, and its crimes are recorded in its model.
+    """
+
+    # The extent to which the offenders can look around, as in PossibleOffender.
+    VISIBILITY = 5
+
+    def __init__(self, model, poss, max_criminal_preference, replicates):
+        self.model = model
+        self.replicates = replicates
+        self.rngs = [replicate.streams.numpy("offender.step") for replicate in replicates]
+
+        n_replicates, n = len(replicates), len(poss[0])
+        self.pos = np.array(poss, dtype=int).reshape(n_replicates, n, 2)
+        model.instrumentation.count("agents_created", n_replicates * n)
+
+        # Internal levels of the offenders, sampled as in PossibleOffender.
+        levels = np.array([[rng.uniform(0, max_criminal_preference, n), rng.uniform(0, 1, n), rng.uniform(0, 1, n)]
+                           for rng in (replicate.streams.numpy("offender.init") for replicate in replicates)])
+        levels = levels.reshape(n_replicates, 3, n)
+        self.CRIMINAL_PREFERENCE = np.round(levels[:, 0], 3)
+        self.criminal_fulfillment = np.round(levels[:, 1], 3)
+        self.AREA_PREFERENCE = np.round(levels[:, 2], 3)
+
+        # Offsets and distances of the positions within the visibility of the offenders,
+        # and offsets of their next moves.
+        self.visible_offsets = moore_offsets(self.VISIBILITY)
+        self.visible_distances = offset_distances(self.VISIBILITY)
+        self.move_offsets = moore_offsets(1)
+
+    def __len__(self):
+        return self.pos.shape[1]
+
+    def get_criminal_motive_intensity(self, live, replicates, pos):
+        """Return the criminal motive intensity of every offender of the live replicates, at pos
+        (a flat array, in the replicates given), whether there is any criminal position within
+        its visibility, and the nearest criminal position. """
+        motive_intensity = (self.CRIMINAL_PREFERENCE[live] - self.criminal_fulfillment[live]).reshape(-1)
+
+        reputation, visible = gather(self.model.crime_field.reputation, pos, self.visible_offsets, replicates)
+        crime_dist = np.where(visible & (reputation > 0), self.visible_distances[None, :], np.inf)
+        nearest = np.argmin(crime_dist, axis=1)
+        min_crime_dist = crime_dist[np.arange(len(pos)), nearest]
+        surr_crime = np.isfinite(min_crime_dist)
+
+        # Decrease the criminal motive intensity depending on the preference each offender has
+        # for criminal areas, and its distance from the nearest criminal position.
+        dist_influence_factor = np.where(surr_crime, min_crime_dist / ((self.VISIBILITY * 2) + 1), 1)
+        motive_intensity -= motive_intensity * (dist_influence_factor * self.AREA_PREFERENCE[live].reshape(-1))
+
+        return motive_intensity, surr_crime, pos + self.visible_offsets[nearest]
+
+    def get_targets(self, live, pos):
+        """Return the index of the nearest active victim within the visibility of every
+        offender of the live replicates at pos (an (replicates, offenders, 2) array), -1 if there
+        is none. """
+        victims = self.model.victim_engine
+        targets = np.full(pos.shape[:2], -1)
+        active = victims.active[live]
+        if not active.any():
+            return targets
+
+        # Leave out the victims which are active in none of the replicates, and order the
+        # victims of every replicate by position, so ties are broken as in
+        # PossibleOffender.get_target.
+        idx = np.flatnonzero(active.any(axis=0))
+        victim_pos = victims.pos[live][:, idx]
+        victim_idx = np.broadcast_to(idx, (len(live), idx.size))
+        order = np.lexsort((victim_idx, victim_pos[..., 1], victim_pos[..., 0]), axis=-1)
+        rows = np.arange(len(live))[:, None]
+        victim_pos = victim_pos[rows, order]
+        active = active[:, idx][rows, order]
+
+        diff = np.abs(pos[:, :, None, :] - victim_pos[:, None, :, :])
+        self.model.instrumentation.count("distance_evaluations", int(active.sum()) * pos.shape[1])
+        dist = np.where(active[:, None, :] & (diff.max(axis=3) <= self.VISIBILITY), diff.sum(axis=3), np.inf)
+        nearest = np.argmin(dist, axis=2)
+        has_target = np.isfinite(dist.min(axis=2))
+        targets[has_target] = idx[order[rows, nearest]][has_target]
+        return targets
+
+    def step(self, running=None):
+        """Advance every offender by one step, only those of the running replicates if given
+        (as a boolean array). """
+        n = len(self)
+        live = np.arange(len(self.replicates)) if running is None else np.flatnonzero(running)
+        if not n or not live.size:
+            return
+        victims = self.model.victim_engine
+        # Every offender of the live replicates is stepped, as a flat array.
+        replicates = np.repeat(live, n)
+        pos = self.pos[live].reshape(-1, 2)
+
+        motive_intensity, surr_crime, crime_pos = self.get_criminal_motive_intensity(live, replicates, pos)
+        sample_probability_motivation = np.round(uniform(self.rngs, replicates, 0, 1), 3)
+        sample_probability_opportunity = np.round(uniform(self.rngs, replicates, 0, 1), 3)
+        targets = self.get_targets(live, pos.reshape(live.size, n, 2)).reshape(-1)
+        has_target = targets >= 0
+        target_pos = victims.pos[replicates, np.maximum(targets, 0)] if victims.pos.shape[1] else pos
+
+        # Offenders motivated enough chase their target, if any. The rest move towards the
+        # nearest criminal area if they prefer criminal areas enough, or move randomly.
+        motivated = (motive_intensity > sample_probability_motivation) | \
+                    (has_target & (motive_intensity > sample_probability_opportunity))
+        sample_probability = np.round(uniform(self.rngs, replicates, 0, 1), 3)
+        chase = motivated & has_target
+        towards_crime = ~motivated & (self.AREA_PREFERENCE[live].reshape(-1) > sample_probability) & surr_crime
+        random_move = ~(chase | towards_crime)
+
+        moves = pos[:, None, :] + self.move_offsets[None, :, :]
+        _, valid_moves = gather(self.model.illuminance, pos, self.move_offsets, replicates)
+
+        # Random moves pick one of the valid moves uniformly.
+        n_valid = valid_moves.sum(axis=1)
+        choice = (uniform(self.rngs, replicates, 0, 1) * n_valid).astype(int)
+        next_move = np.argmax(np.cumsum(valid_moves, axis=1) > choice[:, None], axis=1)
+
+        # Other moves are those which result in the smallest distance from the destination.
+        destination = np.where(chase[:, None], target_pos, crime_pos)
+        dest_dist = np.where(valid_moves, np.abs(moves - destination[:, None, :]).sum(axis=2), np.inf)
+        self.model.instrumentation.count("distance_evaluations", dest_dist.size)
+        next_move = np.where(random_move, next_move, np.argmin(dest_dist, axis=1))
+
+        # Decrease the criminal fulfillment, by less if chasing a victim.
+        fulfillment = self.criminal_fulfillment[live].reshape(-1)
+        fulfillment[chase] -= fulfillment[chase] * uniform(self.rngs, replicates[chase], 0, 0.01)
+        fulfillment[random_move] -= uniform(self.rngs, replicates[random_move], 0, 0.02)
+        self.criminal_fulfillment[live] = fulfillment.reshape(live.size, n)
+
+        pos = moves[np.arange(len(pos)), next_move]
+        self.pos[live] = pos.reshape(live.size, n, 2)
+
+        caught = chase & (pos == target_pos).all(axis=1)
+        for i in np.flatnonzero(caught).tolist():
+            self.commit_organised_crime(int(replicates[i]), i % n, targets[i])
+
+    def commit_organised_crime(self, replicate, offender, victim):
+        """The offender of the replicate commits a crime against the victim it has caught,
+        unless another offender has already done so. """
+        victims = self.model.victim_engine
+        if not victims.active[replicate, victim]:
+            return
+
+        # Remove the victim from the simulation.
+        victims.remove(replicate, victim)
+
+        # Increase the criminal fulfillment of this offender
+        self.criminal_fulfillment[replicate, offender] += self.rngs[replicate].uniform(0.4, 1)
+
+        # Record this crime in the model of the replicate and add a crime attractor.
+        model = self.replicates[replicate]
+        model.increment_crimes()
+        CrimeAttractor(model.next_id(), model, tuple(self.pos[replicate, offender].tolist()), model.hotspot_rad)
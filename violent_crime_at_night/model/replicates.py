@@ -0,0 +1,30 @@
+import numpy as np
+
+# Helpers for the flat arrays of the engines, which hold the victims or offenders of every
+# replicate of a model, ordered by replicate: groups is the sorted array of the replicate of
+# every element. Every replicate is handled on its own, so it gets the same results as a model
+# of its own, and a model with a single replicate is handled at once.
+
+
+def uniform(rngs, groups, low, high):
+    """Return a uniform draw for every element of groups, drawn in order from the stream of its
+    replicate, so every replicate draws the same numbers as a model of its own drawing as many
+    at once. """
+    if not len(groups) or groups[0] == groups[-1]:
+        return rngs[groups[0] if len(groups) else 0].uniform(low, high, len(groups))
+    values = np.empty(len(groups))
+    replicates, starts, counts = np.unique(groups, return_index=True, return_counts=True)
+    for r, start, count in zip(replicates.tolist(), starts.tolist(), counts.tolist()):
+        values[start:start + count] = rngs[r].uniform(low, high, count)
+    return values
+
+
+def group_sums(values, groups):
+    """Return the replicates in groups, and the sum of the values of each. """
+    if not len(groups):
+        return [], []
+    if groups[0] == groups[-1]:
+        return [int(groups[0])], [values.sum()]
+    replicates, starts, counts = np.unique(groups, return_index=True, return_counts=True)
+    return replicates.tolist(), [values[start:start + count].sum()
+                                 for start, count in zip(starts.tolist(), counts.tolist())]
@@ -0,0 +1,44 @@
+import hashlib
+import random
+
+import numpy as np
+
+
+def derive_seed(seed, *keys):
+    """Derive a 64 bit seed from the seed and the keys, so that every combination of keys
+    gets an independent seed. """
+    digest = hashlib.blake2b(repr((seed,) + keys).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class RandomStreams:
+    """The random number streams of a model, one per purpose, all derived from a single seed.
+
+    Every stochastic draw of the model goes through the stream of its purpose (for example the
+    initial levels of the victims, or the decisions of the offenders with every step), so the
+    draws made for one purpose do not shift the draws made for the others. Two models with the
+    same seed draw the same numbers for the same purposes, even if their parameters differ,
+    which allows comparing parameter values with common random numbers.
+
+    If no seed is given, a seed is drawn from the operating system, and kept in seed so the
+    run can be reproduced.
+    """
+
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(64)
+        self.seed = seed
+        self.streams = {}
+        self.numpy_streams = {}
+
+    def stream(self, purpose):
+        """Return the random.Random stream of the purpose. """
+        if purpose not in self.streams:
+            self.streams[purpose] = random.Random(derive_seed(self.seed, purpose))
+        return self.streams[purpose]
+
+    def numpy(self, purpose):
+        """Return the numpy Generator stream of the purpose. """
+        if purpose not in self.numpy_streams:
+            self.numpy_streams[purpose] = np.random.default_rng(derive_seed(self.seed, purpose))
+        return self.numpy_streams[purpose]
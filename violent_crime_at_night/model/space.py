@@ -0,0 +1,245 @@
+from mesa.space import MultiGrid
+
+from model.instrumentation import NULL_INSTRUMENTATION
+
+
+class TypeIndexedGrid:
+    """Mixin for a grid which keeps a separate spatial index for each of the indexed agent types.
+
+    Each index maps the occupied positions to the agents of that type in the position, and is
+    updated whenever an agent is placed, moved or removed from the grid. This way, neighbourhood
+    queries for a single type of agent only touch the agents of that type, instead of every agent
+    in every cell of the neighbourhood.
+
+    Neighbourhood queries are counted by the instrumentation of the grid, set by the model.
+    """
+
+    instrumentation = NULL_INSTRUMENTATION
+
+    def __init__(self, width, height, torus, indexed_types=(), **kwargs):
+        super().__init__(width, height, torus, **kwargs)
+        self.indexes = {agent_type: {} for agent_type in indexed_types}
+
+    def get_index(self, agent):
+        """Return the index for the type of the agent, None if the type is not indexed. """
+        for agent_type, index in self.indexes.items():
+            if isinstance(agent, agent_type):
+                return index
+        return None
+
+    def _place_agent(self, pos, agent):
+        """Place the agent at the correct location, and add it to its index. """
+        super()._place_agent(pos, agent)
+        index = self.get_index(agent)
+        if index is not None:
+            cell = index.setdefault(pos, [])
+            if agent not in cell:
+                cell.append(agent)
+
+    def _remove_agent(self, pos, agent):
+        """Remove the agent from the given location, and from its index. """
+        super()._remove_agent(pos, agent)
+        index = self.get_index(agent)
+        if index is not None:
+            cell = index[pos]
+            cell.remove(agent)
+            if not cell:
+                del index[pos]
+
+    def get_neighborhood(self, pos, moore, include_center=False, radius=1):
+        neighborhood = super().get_neighborhood(pos, moore, include_center, radius)
+        self.instrumentation.query(len(neighborhood))
+        return neighborhood
+
+    def get_typed_neighbors(self, pos, agent_type, radius=1, include_center=True):
+        """Return the agents of agent_type within the (moore) radius of pos, ordered by position. """
+        index = self.indexes[agent_type]
+
+        if self.torus or len(index) > (2 * radius + 1) ** 2:
+            # Look up every position of the neighbourhood in the index.
+            neighborhood = self.get_neighborhood(pos, moore=True, include_center=include_center, radius=radius)
+            occupied = [n_pos for n_pos in neighborhood if n_pos in index]
+        else:
+            # There are fewer occupied positions than positions in the neighbourhood.
+            self.instrumentation.query(len(index))
+            x, y = pos
+            occupied = sorted(n_pos for n_pos in index
+                              if abs(n_pos[0] - x) <= radius and abs(n_pos[1] - y) <= radius and
+                              (include_center or n_pos != pos))
+
+        return [agent for n_pos in occupied for agent in index[n_pos]]
+
+
+class IndexedMultiGrid(TypeIndexedGrid, MultiGrid):
+    """A MultiGrid which keeps a separate spatial index for each of the indexed agent types. """
+    pass
+
+
+class SparseMultiGrid:
+    """A grid where each cell can hold several agents, with the surface of mesa's MultiGrid the
+    agents use, which only allocates storage for the parts of the grid holding agents.
+
+    The grid is split into square chunks of chunk_size cells. Each chunk maps its occupied
+    positions to the agents in them, and is created when an agent is placed in it and dropped
+    when its last agent leaves, so memory grows with the number of agents rather than with the
+    area of the grid. Static layers, such as the light, are held in arrays by the model.
+
+    Unlike mesa's grids, it does not keep the set of empty cells, so it does not support
+    find_empty or move_to_empty, and the neighbourhood cache is bounded to cache_size entries.
+    """
+
+    def __init__(self, width, height, torus, chunk_size=16, cache_size=2 ** 16):
+        self.width = width
+        self.height = height
+        self.torus = torus
+        self.chunk_size = chunk_size
+
+        # Occupied chunks by (x, y) chunk coordinates, each a dict of positions to agents.
+        self.chunks = {}
+
+        self.cache_size = cache_size
+        self._neighborhood_cache = {}
+
+    def chunk_key(self, pos):
+        """Return the coordinates of the chunk holding the position. """
+        return pos[0] // self.chunk_size, pos[1] // self.chunk_size
+
+    def get_cell(self, pos):
+        """Return the list of agents in the position, None if it holds none. """
+        chunk = self.chunks.get(self.chunk_key(pos))
+        if chunk is None:
+            return None
+        return chunk.get(pos)
+
+    def __getitem__(self, pos):
+        """Return the list of agents in the (x, y) position. """
+        cell = self.get_cell(self.torus_adj(tuple(pos)))
+        return [] if cell is None else cell
+
+    def __len__(self):
+        """Return the number of occupied positions. """
+        return sum(len(chunk) for chunk in self.chunks.values())
+
+    def torus_adj(self, pos):
+        """Convert coordinate, handling torus looping. """
+        if not self.out_of_bounds(pos):
+            return pos
+        elif not self.torus:
+            raise Exception("Point out of bounds, and space non-toroidal.")
+        else:
+            return pos[0] % self.width, pos[1] % self.height
+
+    def out_of_bounds(self, pos):
+        """Determines whether position is off the grid. """
+        x, y = pos
+        return x < 0 or x >= self.width or y < 0 or y >= self.height
+
+    def is_cell_empty(self, pos):
+        """Returns whether the position holds no agent. """
+        return self.get_cell(pos) is None
+
+    def place_agent(self, agent, pos):
+        """Position an agent on the grid, and set its pos variable. """
+        self._place_agent(pos, agent)
+        agent.pos = pos
+
+    def remove_agent(self, agent):
+        """Remove the agent from the grid and set its pos variable to None. """
+        self._remove_agent(agent.pos, agent)
+        agent.pos = None
+
+    def move_agent(self, agent, pos):
+        """Move an agent from its current position to pos. """
+        pos = self.torus_adj(pos)
+        self._remove_agent(agent.pos, agent)
+        self._place_agent(pos, agent)
+        agent.pos = pos
+
+    def _place_agent(self, pos, agent):
+        """Place the agent at the correct location, allocating its chunk if needed. """
+        chunk = self.chunks.setdefault(self.chunk_key(pos), {})
+        cell = chunk.setdefault(pos, [])
+        if agent not in cell:
+            cell.append(agent)
+
+    def _remove_agent(self, pos, agent):
+        """Remove the agent from the given location, dropping its cell and chunk once empty. """
+        key = self.chunk_key(pos)
+        chunk = self.chunks[key]
+        cell = chunk[pos]
+        cell.remove(agent)
+        if not cell:
+            del chunk[pos]
+            if not chunk:
+                del self.chunks[key]
+
+    def get_neighborhood(self, pos, moore, include_center=False, radius=1):
+        """Return a sorted list of the positions within radius of pos, as mesa's grids do. """
+        cache_key = (pos, moore, include_center, radius)
+        neighborhood = self._neighborhood_cache.get(cache_key)
+        if neighborhood is None:
+            coordinates = set()
+            x, y = pos
+            for dy in range(-radius, radius + 1):
+                for dx in range(-radius, radius + 1):
+                    if dx == 0 and dy == 0 and not include_center:
+                        continue
+                    if not moore and abs(dx) + abs(dy) > radius:
+                        continue
+                    coord = (x + dx, y + dy)
+                    if self.out_of_bounds(coord):
+                        if not self.torus:
+                            continue
+                        coord = self.torus_adj(coord)
+                    coordinates.add(coord)
+            neighborhood = sorted(coordinates)
+
+            if len(self._neighborhood_cache) >= self.cache_size:
+                self._neighborhood_cache.clear()
+            self._neighborhood_cache[cache_key] = neighborhood
+        return neighborhood
+
+    def iter_neighborhood(self, pos, moore, include_center=False, radius=1):
+        yield from self.get_neighborhood(pos, moore, include_center, radius)
+
+    def iter_cell_list_contents(self, cell_list):
+        """Return an iterator of the agents in the positions of cell_list, in order. """
+        if isinstance(cell_list, tuple) and len(cell_list) == 2 and isinstance(cell_list[0], int):
+            cell_list = [cell_list]
+        for pos in cell_list:
+            cell = self.get_cell(pos)
+            if cell is not None:
+                yield from cell
+
+    def get_cell_list_contents(self, cell_list):
+        """Return a list of the agents in the positions of cell_list, in order. """
+        return list(self.iter_cell_list_contents(cell_list))
+
+    def iter_neighbors(self, pos, moore, include_center=False, radius=1):
+        """Return an iterator of the agents within radius of pos, ordered by position. """
+        if self.torus or not moore:
+            return self.iter_cell_list_contents(self.get_neighborhood(pos, moore, include_center, radius))
+
+        # Only look at the occupied positions of the chunks overlapping the neighbourhood.
+        x, y = pos
+        x0, y0 = self.chunk_key((max(x - radius, 0), max(y - radius, 0)))
+        x1, y1 = self.chunk_key((min(x + radius, self.width - 1), min(y + radius, self.height - 1)))
+        occupied = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                chunk = self.chunks.get((cx, cy))
+                if chunk is not None:
+                    occupied.extend(n_pos for n_pos in chunk
+                                    if abs(n_pos[0] - x) <= radius and abs(n_pos[1] - y) <= radius and
+                                    (include_center or n_pos != pos))
+        occupied.sort()
+        return self.iter_cell_list_contents(occupied)
+
+    def get_neighbors(self, pos, moore, include_center=False, radius=1):
+        """Return a list of the agents within radius of pos, ordered by position. """
+        return list(self.iter_neighbors(pos, moore, include_center, radius))
+
+
+class IndexedSparseMultiGrid(TypeIndexedGrid, SparseMultiGrid):
+    """A SparseMultiGrid which keeps a separate spatial index for each of the indexed agent types. """
+    pass
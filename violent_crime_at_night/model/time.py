@@ -0,0 +1,71 @@
+from collections import OrderedDict
+
+from mesa.time import BaseScheduler
+
+
+class TypeStagedActivation(BaseScheduler):
+    """A scheduler which keeps the agents in one bucket per type, and activates them in stages.
+
+    Each stage is either an agent type, whose agents are stepped in a random order, or a
+    function which is called with no arguments (for example the decay of the crime field, or
+    the step of an array engine). The stages run in the order given with every step.
+
+    Agents whose type is not in any stage are passive: they are kept in their bucket, so they
+    can be looked up, but they are never iterated nor stepped.
+
+    The time of every stage is recorded by the instrumentation of the model, as the phase named
+    after the agent type or the function.
+    """
+
+    def __init__(self, model, stages=()):
+        super().__init__(model)
+        self.stages = list(stages)
+        self.buckets = {}  # Type -> OrderedDict of the agents of the type, by unique id.
+
+    def add(self, agent):
+        """Add an agent to the schedule, in the bucket of its type. """
+        super().add(agent)
+        self.model.instrumentation.count("agents_created")
+        self.buckets.setdefault(type(agent), OrderedDict())[agent.unique_id] = agent
+
+    def remove(self, agent):
+        """Remove an agent from the schedule. """
+        super().remove(agent)
+        self.model.instrumentation.count("agents_removed")
+        del self.buckets[type(agent)][agent.unique_id]
+
+    def agents_of_type(self, agent_type):
+        """Return a list with the agents of the type, including its subclasses. """
+        return [agent for bucket_type, bucket in self.buckets.items()
+                if issubclass(bucket_type, agent_type) for agent in bucket.values()]
+
+    def get_type_count(self, agent_type):
+        """Return the number of agents of the type, including its subclasses. """
+        return sum(len(bucket) for bucket_type, bucket in self.buckets.items()
+                   if issubclass(bucket_type, agent_type))
+
+    def step_type(self, agent_type):
+        """Step the agents of the type in a random order. Agents removed while stepping the
+        others are not stepped. """
+        buckets = [bucket for bucket_type, bucket in self.buckets.items()
+                   if issubclass(bucket_type, agent_type)]
+        keys = [(i, key) for i, bucket in enumerate(buckets) for key in bucket]
+        self.model.random.shuffle(keys)
+        for i, key in keys:
+            agent = buckets[i].get(key)
+            if agent is not None:
+                agent.step()
+
+    def step(self):
+        """Run every stage, in order. """
+        instrumentation = self.model.instrumentation
+        for stage in self.stages:
+            start = instrumentation.clock()
+            if isinstance(stage, type):
+                self.step_type(stage)
+                instrumentation.add_time(stage.__name__, start)
+            else:
+                stage()
+                instrumentation.add_time(stage.__qualname__, start)
+        self.steps += 1
+        self.time += 1
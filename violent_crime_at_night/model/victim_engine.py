@@ -0,0 +1,180 @@
+import numpy as np
+
+from model.distance import gather, moore_offsets, values_at
+from model.replicates import group_sums, uniform
+
+
+class VictimEngine:
+    """Struct-of-arrays representation of the possible victims of the model.
+
+    The state of every victim (position, goal position, fear and internal levels) is held in
+    numpy arrays, and the behaviour of PossibleVictim.step is computed for all the victims at
+    once with every tick:
+        - victims which have reached their safe location are marked as safe.
+        - the surrounding danger of every victim is read from the crime field of the model.
+        - the fear of the victims is updated depending on the danger and their familiarity
+          with the area.
+        - the victims either move towards their safe location, or if they are scared enough,
+          make the move which trades off distance to the goal, distance to and reputation of
+          the surrounding crime, and illuminance.
+
+    The victims are independent of each other, so the outcome is the same as stepping each
+    victim in turn, except that the random numbers are drawn from the numpy streams of the model.
+
+    The engine holds the victims of every replicate of the model, each given by the model of
+    the replicate (with its streams and aggregates): a Model is its only replicate, and a
+    BatchedModel has many. The arrays are indexed as [replicate, victim], and the victims of
+    every replicate are stepped at once, as a flat array ordered by replicate and then by
+    victim. Every replicate draws its random numbers from its own streams, so it gives the same
+    results as a model of its own.
+    """
+
+    # The visibility of the victims, and the area around their safe location they are familiar
+    # with, as in PossibleVictim.
+    VISIBILITY = 4
+    SAFE_AREA_PERIMETER = 4
+
+    def __init__(self, model, poss, goal_poss, replicates):
+        self.model = model
+        self.replicates = replicates
+        self.rngs = [replicate.streams.numpy("victim.step") for replicate in replicates]
+
+        n_replicates, n = len(replicates), len(poss[0])
+        self.pos = np.array(poss, dtype=int).reshape(n_replicates, n, 2)
+        self.goal_pos = np.array(goal_poss, dtype=int).reshape(n_replicates, n, 2)
+        self.fear = np.zeros((n_replicates, n))
+
+        # Internal levels of the victims, sampled as in PossibleVictim.
+        levels = np.array([[rng.uniform(0, 1, n) for _ in range(3)] for rng in
+                           (replicate.streams.numpy("victim.init") for replicate in replicates)])
+        levels = levels.reshape(n_replicates, 3, n)
+        self.PERCEPTION_CAPABILITIES = np.round(levels[:, 0], 3)
+        self.FEAR_SUSCEPTIBILITY = np.round(levels[:, 1], 3)
+        self.ENVIRONMENTAL_INFLUENCE = (self.FEAR_SUSCEPTIBILITY + self.PERCEPTION_CAPABILITIES) / 2
+        self.LIGHT_PREFERENCE = np.round(levels[:, 2], 3)
+
+        # Victims which have reached their safe location, and victims still walking home.
+        self.is_safe = np.zeros((n_replicates, n), dtype=bool)
+        self.active = np.ones((n_replicates, n), dtype=bool)
+        for replicate in replicates:
+            replicate.aggregates.add("victims", n)
+        model.instrumentation.count("agents_created", n_replicates * n)
+
+        # Offsets of the positions within the visibility of the victims, of their next moves,
+        # and the manhattan distance from each move to each visible position.
+        self.visible_offsets = moore_offsets(self.VISIBILITY, include_center=False)
+        self.move_offsets = moore_offsets(1, include_center=False)
+        self.move_distances = np.abs(self.move_offsets[:, None, :] -
+                                     self.visible_offsets[None, :, :]).sum(axis=2)
+
+    def __len__(self):
+        return int(self.active.sum())
+
+    def add_to_aggregate(self, name, replicates, values, old_values=None):
+        """Add the sum of the values of each replicate (given by the sorted array replicates)
+        to its aggregate, less the sum of the old values if given. """
+        groups, sums = group_sums(values, replicates)
+        if old_values is not None:
+            sums = [total - old for total, old in zip(sums, group_sums(old_values, replicates)[1])]
+        for r, total in zip(groups, sums):
+            self.replicates[r].aggregates.add(name, total)
+
+    def remove(self, replicate, index):
+        """Remove the victim of the replicate from the simulation. """
+        self.active[replicate, index] = False
+        self.model.instrumentation.count("agents_removed")
+        aggregates = self.replicates[replicate].aggregates
+        aggregates.add("victims", -1)
+        aggregates.add("fear", -self.fear[replicate, index])
+
+    def step(self, running=None):
+        """Advance every active victim by one step, only those of the running replicates if
+        given (as a boolean array). """
+        active = self.active if running is None else self.active & running[:, None]
+
+        # Victims in their safe location are removed from the simulation.
+        arrived = active & (self.pos == self.goal_pos).all(axis=2)
+        self.is_safe |= arrived
+        self.active &= ~arrived
+        if arrived.any():
+            replicates, _ = np.nonzero(arrived)
+            self.model.instrumentation.count("agents_removed", replicates.size)
+            self.add_to_aggregate("victims", replicates, np.full(replicates.size, -1))
+            self.add_to_aggregate("fear", replicates, -self.fear[arrived])
+
+        replicates, idx = np.nonzero(active & ~arrived)
+        if not idx.size:
+            return
+        pos = self.pos[replicates, idx]
+        goal_pos = self.goal_pos[replicates, idx]
+        fear = self.fear[replicates, idx]
+
+        # Check for surrounding danger, and its average criminal reputation, leaving out the
+        # position of each victim.
+        crime_field = self.model.crime_field
+        n_crime, reputation_sum = crime_field.window_sums_many(pos, self.VISIBILITY, replicates)
+        own_reputation = values_at(crime_field.reputation, pos, replicates)
+        own_crime = own_reputation > 0
+        n_crime = n_crime - own_crime
+        reputation_sum = reputation_sum - np.where(own_crime, own_reputation, 0)
+        danger = n_crime > 0
+        avg_surr_reputation = np.round(reputation_sum / np.maximum(n_crime, 1), 3)
+
+        # Victims which are not familiar with the area get more scared depending on the danger,
+        # those which are familiar with it calm down.
+        familiar = (np.abs(pos - goal_pos).max(axis=1) <=
+                    self.SAFE_AREA_PERIMETER + self.VISIBILITY)
+        scared = danger & ~familiar
+        fear[scared] += avg_surr_reputation[scared] * \
+            self.ENVIRONMENTAL_INFLUENCE[replicates[scared], idx[scared]]
+        calm = danger & familiar
+        fear[calm] -= fear[calm] * uniform(self.rngs, replicates[calm], 0, 0.1)
+
+        # Victims which are scared enough move away from danger, the rest move towards
+        # their safe location.
+        sample_probability = uniform(self.rngs, replicates, 0, 1)
+        flee = danger & (fear > sample_probability)
+
+        moves = pos[:, None, :] + self.move_offsets[None, :, :]
+        light, valid_moves = gather(self.model.illuminance, pos, self.move_offsets, replicates)
+        goal_dist = np.where(valid_moves, np.abs(moves - goal_pos[:, None, :]).sum(axis=2), np.inf)
+        self.model.instrumentation.count("distance_evaluations", goal_dist.size)
+
+        next_move = np.argmin(goal_dist, axis=1)
+        if flee.any():
+            reputation, visible = gather(crime_field.reputation, pos[flee], self.visible_offsets, replicates[flee])
+            next_move[flee] = self.move_away_from_danger(
+                goal_dist[flee], visible & (reputation > 0), valid_moves[flee], light[flee],
+                gather(crime_field.reputation, pos[flee], self.move_offsets, replicates[flee])[0])
+
+        fear -= fear * uniform(self.rngs, replicates, 0, 0.6)
+
+        self.add_to_aggregate("fear", replicates, fear, self.fear[replicates, idx])
+        self.fear[replicates, idx] = fear
+        self.pos[replicates, idx] = moves[np.arange(idx.size), next_move]
+
+    def move_away_from_danger(self, goal_dist, crime, valid_moves, light, move_reputation):
+        """Return the index of the move which each fleeing victim makes, given by the lowest
+        sum of its rank in each of the orderings used by PossibleVictim.move_away_from_danger. """
+        n, n_moves = goal_dist.shape
+
+        def ranks(values, reverse=False):
+            """Rank the moves by increasing value (decreasing if reverse), ties broken by
+            increasing position (decreasing if reverse). """
+            if reverse:
+                order = n_moves - 1 - np.argsort(-values[:, ::-1], axis=1, kind="stable")
+            else:
+                order = np.argsort(values, axis=1, kind="stable")
+            move_ranks = np.empty((n, n_moves), dtype=int)
+            np.put_along_axis(move_ranks, order, np.arange(1, n_moves + 1)[None, :], axis=1)
+            return move_ranks
+
+        # Resulting distance from each move to the nearest visible criminal position.
+        crime_dist = np.where(crime[:, None, :], self.move_distances[None, :, :], np.inf).min(axis=2)
+
+        idx_sum = (ranks(goal_dist) +
+                   ranks(np.where(valid_moves, crime_dist, -np.inf), reverse=True) +
+                   ranks(np.where(valid_moves, move_reputation, np.inf)) +
+                   ranks(np.where(valid_moves, light, np.inf)))
+
+        return np.argmin(np.where(valid_moves, idx_sum, np.iinfo(int).max), axis=1)
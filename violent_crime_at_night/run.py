@@ -1,11 +1,17 @@
-from mesa.batchrunner import BatchRunner
+from batch import AdaptiveSweepRunner, RunCache, SweepRunner
 from model.model import Model, compute_crime_rate
 import matplotlib.pyplot as plt
 import numpy as np
 
 graph = 2  # Change the value of this variable to display a different graph.
 
-if graph == 1:
+# The runs are spread over a pool of processes, so the sweeps must only run in the main process.
+# Completed runs are kept on disk, so changing the graphs does not run the sweeps again. The cache
+# is only created there too, so importing this module (as the workers do) creates no directory.
+if __name__ == "__main__":
+    cache = RunCache(".run_cache", max_bytes=100 * 2 ** 20)
+
+if __name__ == "__main__" and graph == 1:
     # ----------------------------------------------------------
     # 1 - Bar chart for crime rate and varying criminal preferences.
     # ----------------------------------------------------------
@@ -23,25 +29,35 @@ if graph == 1:
     # variable_params = None
     variable_params = {"max_cp": np.arange(0, 1.1, 0.1)}
 
-    batch_run = BatchRunner(Model,
-                            variable_params,
-                            fixed_params,
-                            iterations=7,  # Number of iterations the model runs for
-                            max_steps=100,
-                            model_reporters={"crimerate": compute_crime_rate})
+    # Every value of max_cp is run with the same seeds (common random numbers), and only as
+    # many times as needed for the 95% confidence interval of its crime rate to be narrow enough.
+    batch_run = AdaptiveSweepRunner(Model,
+                                    variable_params,
+                                    fixed_params,
+                                    reporter="crimerate",
+                                    target_width=0.01,  # Width of the confidence interval
+                                    min_iterations=3,
+                                    max_iterations=20,
+                                    max_steps=100,
+                                    model_reporters={"crimerate": compute_crime_rate},
+                                    seed=2021,
+                                    cache=cache)
     batch_run.run_all()
     run_data = batch_run.get_model_vars_dataframe()
     print(run_data)
 
-    reduced_data = run_data.loc[:, ["max_cp", "crimerate"]]
-    reduced_data = reduced_data.groupby(["max_cp"], as_index=False).max()
+    # Each value of max_cp is run a different number of times, so its crime rate is plotted as
+    # the mean of its runs, with the half width of the 95% confidence interval as error bars.
+    reduced_data = batch_run.get_iterations_dataframe()
+    print(reduced_data)
 
     x = list(round(i, 2) for i in reduced_data.max_cp)
-    y = list(reduced_data.crimerate)
+    y = list(reduced_data["mean"])
+    errors = list(reduced_data.ci_width / 2)
 
     x_pos = [i for i, _ in enumerate(x)]
 
-    plt.bar(x_pos, y, color='red')
+    plt.bar(x_pos, y, yerr=errors, capsize=3, color='red')
     plt.xlabel("Maximum Offender Criminal Preference")
     plt.ylabel("Crime Rate per 1000 population")
     plt.title("Effect of Offender Criminal Preference on Crime-rate")
@@ -50,7 +66,7 @@ if graph == 1:
 
     plt.show()
 
-if graph == 2:
+if __name__ == "__main__" and graph == 2:
     # ----------------------------------------------------------
     # 2 - Line chart for crime rate.
     # ----------------------------------------------------------
@@ -68,18 +84,21 @@ if graph == 2:
     variable_params = None
     # variable_params = {"max_cp": np.arange(0, 1.1, 0.1)}
 
-    batch_run = BatchRunner(Model,
+    batch_run = SweepRunner(Model,
                             variable_params,
                             fixed_params,
                             iterations=7,  # Number of iterations the model runs for
                             max_steps=100,
-                            model_reporters={"crimerate": compute_crime_rate})
+                            model_reporters={"crimerate": compute_crime_rate},
+                            seed=2021,
+                            cache=cache)
     batch_run.run_all()
     run_data = batch_run.get_model_vars_dataframe()
     print(run_data)
 
-    run_data = run_data.sort_index()
-    plt.plot(run_data.crimerate, label="Criminal Preference = " + str(fixed_params.get("max_cp")))
+    # Each iteration represents a day, the crime-rate accumulates over the days.
+    run_data = run_data.sort_values(by="Run")
+    plt.plot(run_data.crimerate.cumsum().tolist(), label="Criminal Preference = " + str(fixed_params.get("max_cp")))
     plt.title("Crime-rate per 1000 Population Overtime")
     plt.ylabel("Crime Rate per 1000 population")
     plt.xlabel("Day")
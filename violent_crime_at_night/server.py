@@ -1,92 +1,185 @@
-from colorsys import hls_to_rgb
-
-from mesa.visualization.ModularVisualization import ModularServer
+import numpy as np
 from mesa.visualization.UserParam import UserSettableParameter
-from mesa.visualization.modules import CanvasGrid
-from mesa.visualization.modules import ChartModule
-from webcolors import rgb_to_hex
 
 from agents.cognitive_agents.offenderAgent import PossibleOffender
 from agents.cognitive_agents.victimAgent import SafeLocation, PossibleVictim
-from agents.environmental_agents import GeneratorLoc
-from agents.environmental_agents.CrimeAttractor import AttractorLoc
-from agents.environmental_agents.lightAgent import Light
 from model.model import Model
+from visualization import ColorTable, DeltaCanvasGrid, FastForwardServer, RasterCanvas, StepChartModule, StepControls
+
+# Element showing the grid: "delta" draws a portrayal per agent and criminal position, "raster"
+# sends an image with a pixel per cell, for large grids.
+canvas = "delta"
+
+# Number of steps the model advances for every frame rendered, until changed in the page.
+render_every = 1
+
 
+# Colours of the light layer and of the criminal positions, by lightness.
+LIGHT_COLORS = ColorTable((0, 0, 0))
+CRIME_COLORS = ColorTable((350, 0.36, .85))
 
-def adjust_color_lightness(hls_color, factor):
-    h, l, s = hls_color
-    l = factor
-    n_r, n_g, n_b = hls_to_rgb(h, l, s)
 
-    n_r *= 255
-    n_g *= 255
-    n_b *= 255
+def light_colors(model):
+    """Return the colour of the light layer in every cell, indexed as [x, y]. """
+    return LIGHT_COLORS.lookup(model.illuminance)
 
-    new_hex = rgb_to_hex((int(n_r), int(n_g), int(n_b)))
-    return new_hex
+
+def crime_portrayal(color):
+    portrayal = {}
+
+    portrayal["Shape"] = "rect"
+    portrayal["Color"] = color
+    portrayal["Filled"] = "true"
+    portrayal["Layer"] = 1
+    portrayal["h"] = 1
+    portrayal["w"] = 1
+
+    return portrayal
+
+
+def crime_portrayals(model):
+    """Return the positions and portrayals of the criminal positions. The lightness of a
+    hotspot position is given by its reputation relative to the hotspot's, and that of a
+    crime generator position by its reputation. """
+    crime_field = model.crime_field
+    portrayals = []
+    xs, ys = np.nonzero(crime_field.reputation > 0)
+    for pos in zip(xs.tolist(), ys.tolist()):
+        area = crime_field.get_area(pos)
+        if area is not None:
+            lightness = 1 - (crime_field.attractor_reputation[pos] / area.criminal_reputation)
+        elif crime_field.generator_reputation[pos] > 0:
+            lightness = 1 - crime_field.generator_reputation[pos]
+        else:
+            continue
+        portrayals.append((pos, crime_portrayal(CRIME_COLORS[lightness])))
+    return portrayals
+
+
+def crime_lightness(model):
+    """Return the lightness of every criminal position as crime_portrayals gives it, nan for
+    the other positions, indexed as [x, y]. """
+    crime_field = model.crime_field
+    lightness = np.full((model.width, model.height), np.nan)
+    generator = crime_field.generator_reputation > 0
+    lightness[generator] = 1 - crime_field.generator_reputation[generator]
+    area_reputation = crime_field.area_reputation()
+    hotspot = area_reputation > 0
+    lightness[hotspot] = 1 - crime_field.attractor_reputation[hotspot] / area_reputation[hotspot]
+    return lightness
+
+
+def hex_to_rgb(color):
+    color = color.strip().lstrip("#")
+    return [int(color[i:i + 2], 16) for i in (0, 2, 4)]
+
+
+def raster_frame(model):
+    """Return the colour of every cell, as a (width, height, 3) array of rgb values: the light
+    layer, covered by the criminal positions, covered by the safe locations, victims and
+    offenders. """
+    frame = LIGHT_COLORS.lookup_rgb(model.illuminance)
+
+    lightness = crime_lightness(model)
+    crime = ~np.isnan(lightness)
+    frame[crime] = CRIME_COLORS.lookup_rgb(lightness[crime])
+
+    if model.engine == "array":
+        victims = model.victim_engine
+        layers = [(safe_location_portrayal(), victims.goal_pos[victims.active]),
+                  (victim_portrayal(), victims.pos[victims.active]),
+                  (offender_portrayal(), model.offender_engine.pos.reshape(-1, 2))]
+    else:
+        layers = [(portrayal(), np.array([agent.pos for agent in model.schedule.agents_of_type(agent_type)
+                                          if agent.pos is not None], dtype=int).reshape(-1, 2))
+                  for portrayal, agent_type in [(safe_location_portrayal, SafeLocation),
+                                                (victim_portrayal, PossibleVictim),
+                                                (offender_portrayal, PossibleOffender)]]
+    for portrayal, poss in layers:
+        frame[poss[:, 0], poss[:, 1]] = hex_to_rgb(portrayal["Color"])
+    return frame
 
 
 def agent_portrayal(agent):
     portrayal = {}
 
-    if type(agent) is Light:
-        portrayal["Shape"] = "rect"
-        portrayal["Color"] = adjust_color_lightness((0, 0, 0), agent.illuminance)
-        portrayal["Filled"] = "true"
-        portrayal["Layer"] = 0
-        portrayal["h"] = 1
-        portrayal["w"] = 1
-
-    if type(agent) is GeneratorLoc:
-        portrayal["Shape"] = "rect"
-        portrayal["Color"] = adjust_color_lightness((350, 0.36, .85), (1 - agent.reputation))
-        portrayal["Filled"] = "true"
-        portrayal["Layer"] = 1
-        portrayal["h"] = 1
-        portrayal["w"] = 1
-
-    if type(agent) is AttractorLoc:
-        portrayal["Shape"] = "rect"
-        portrayal["Color"] = adjust_color_lightness((350, 0.36, .85),
-                                                    (1 - (agent.reputation / agent.centroid_reputation)))
-        portrayal["Filled"] = "true"
-        portrayal["Layer"] = 1
-        portrayal["h"] = 1
-        portrayal["w"] = 1
-
-    elif type(agent) is PossibleVictim:
-        portrayal["Shape"] = "circle"
-        portrayal["Color"] = "#66ccff"
-        portrayal["Filled"] = True
-        portrayal["Layer"] = 2
-        portrayal["r"] = 0.5
+    if type(agent) is PossibleVictim:
+        portrayal = victim_portrayal()
 
     elif type(agent) is PossibleOffender:
-        portrayal["Shape"] = "circle"
-        portrayal["Color"] = "#e21818"
-        portrayal["Filled"] = True
-        portrayal["Layer"] = 2
-        portrayal["r"] = .9
+        portrayal = offender_portrayal()
 
     if type(agent) is SafeLocation:
-        portrayal["Shape"] = "rect"
-        portrayal["Color"] = "	#0088cc"
-        portrayal["Filled"] = "true"
-        portrayal["Layer"] = 2
-        portrayal["h"] = 1
-        portrayal["w"] = 1
+        portrayal = safe_location_portrayal()
+
+    return portrayal
+
+
+def victim_portrayal():
+    portrayal = {}
+
+    portrayal["Shape"] = "circle"
+    portrayal["Color"] = "#66ccff"
+    portrayal["Filled"] = True
+    portrayal["Layer"] = 2
+    portrayal["r"] = 0.5
+
+    return portrayal
+
+
+def offender_portrayal():
+    portrayal = {}
+
+    portrayal["Shape"] = "circle"
+    portrayal["Color"] = "#e21818"
+    portrayal["Filled"] = True
+    portrayal["Layer"] = 2
+    portrayal["r"] = .9
 
     return portrayal
 
 
-grid = CanvasGrid(agent_portrayal, 50, 50, 800, 800)
-chart1 = ChartModule(
+def safe_location_portrayal():
+    portrayal = {}
+
+    portrayal["Shape"] = "rect"
+    portrayal["Color"] = "	#0088cc"
+    portrayal["Filled"] = "true"
+    portrayal["Layer"] = 2
+    portrayal["h"] = 1
+    portrayal["w"] = 1
+
+    return portrayal
+
+
+def engine_portrayal(model):
+    """Return the positions and portrayals of the victims and offenders held by the array
+    engine, and of the safe locations of the victims. """
+    portrayals = []
+    if model.engine == "array":
+        victims = model.victim_engine
+        for pos, goal_pos in zip(victims.pos[victims.active].tolist(),
+                                 victims.goal_pos[victims.active].tolist()):
+            portrayals.append((pos, victim_portrayal()))
+            portrayals.append((goal_pos, safe_location_portrayal()))
+        for pos in model.offender_engine.pos.reshape(-1, 2).tolist():
+            portrayals.append((pos, offender_portrayal()))
+    return portrayals
+
+
+if canvas == "raster":
+    grid = RasterCanvas(raster_frame, 50, 50, 800, 800)
+else:
+    grid = DeltaCanvasGrid(agent_portrayal, 50, 50, 800, 800,
+                           background_method=light_colors,
+                           cell_portrayal_method=crime_portrayals,
+                           model_portrayal_method=engine_portrayal)
+chart1 = StepChartModule(
     [{"Label": "Average Perception of Safety", "Color": "#0000FF"}],
     data_collector_name="datacollector"
 )
 
-chart2 = ChartModule(
+chart2 = StepChartModule(
     [{"Label": "Crime-rate", "Color": "black"}],
     data_collector_name="datacollector"
 )
@@ -105,10 +198,13 @@ model_params = {
     "width": 50
 }
 
-server = ModularServer(Model,
-                       [grid, chart1, chart2],
-                       "Violent Crime when Walking Home Alone at Night",
-                       model_params)
+controls = StepControls(render_every)
+
+server = FastForwardServer(Model,
+                           [controls, grid, chart1, chart2],
+                           "Violent Crime when Walking Home Alone at Night",
+                           model_params,
+                           render_every=render_every)
 
 server.port = 8002
 server.launch()
@@ -0,0 +1,33 @@
+import math
+import statistics
+
+import pytest
+
+from batch.adaptive import ci_width, t_cdf, t_quantile
+
+# Quantiles of Student's t distribution, from published tables, by (p, degrees of freedom).
+T_TABLE = {(0.975, 1): 12.706204736, (0.975, 2): 4.302652730, (0.975, 5): 2.570581836,
+           (0.975, 30): 2.042272456, (0.95, 1): 6.313751515, (0.95, 2): 2.919985580,
+           (0.95, 5): 2.015048373, (0.95, 30): 1.697260887, (0.995, 1): 63.656741163,
+           (0.995, 5): 4.032142984}
+
+
+@pytest.mark.parametrize("p, df", sorted(T_TABLE))
+def test_t_quantile_matches_table(p, df):
+    assert t_quantile(p, df) == pytest.approx(T_TABLE[p, df], rel=1e-8)
+    assert t_quantile(1 - p, df) == pytest.approx(-T_TABLE[p, df], rel=1e-8)
+
+
+@pytest.mark.parametrize("df", [1, 2, 3, 5, 30])
+def test_t_cdf_inverts_the_quantile(df):
+    assert t_cdf(0, df) == 0.5
+    for p in (0.6, 0.9, 0.975):
+        assert t_cdf(t_quantile(p, df), df) == pytest.approx(p, abs=1e-12)
+
+
+def test_ci_width():
+    values = [1.0, 2.0, 4.0]
+    expected = 2 * T_TABLE[0.975, 2] * statistics.stdev(values) / math.sqrt(3)
+    assert ci_width(values) == pytest.approx(expected, rel=1e-8)
+    assert ci_width([1.0]) == math.inf
+    assert math.isnan(ci_width([1.0, None, 2.0]))
@@ -0,0 +1,58 @@
+import pytest
+
+from agents.cognitive_agents.victimAgent import PossibleVictim, SafeLocation
+from model.aggregates import Aggregates
+from model.model import Model, average_perception_of_safety
+
+
+def test_register_add_set_and_reset():
+    aggregates = Aggregates()
+    aggregates.register("victims")
+    aggregates.register("fear", 0.5)
+    assert "fear" in aggregates and "crimes" not in aggregates
+    with pytest.raises(ValueError):
+        aggregates.register("victims")
+
+    aggregates.add("victims", 3)
+    aggregates.add("fear", 0.25)
+    assert aggregates["victims"] == 3
+    assert aggregates["fear"] == 0.75
+    aggregates.set("victims", 7)
+    assert aggregates["victims"] == 7
+    aggregates.reset("fear")
+    aggregates.reset("victims")
+    assert aggregates.values == {"victims": 0, "fear": 0.5}
+
+
+def recount(model):
+    """Return the number of victims, the sum of their fear and the total number of crimes,
+    counted from the agents of the model. """
+    if model.engine == "array":
+        engine = model.victim_engine
+        active = engine.active[0]
+        return int(active.sum()), engine.fear[0][active].sum(), None
+    victims = model.schedule.agents_of_type(PossibleVictim)
+    # A victim of a crime leaves its safe location behind, one which arrived removes it.
+    crimes = model.schedule.get_type_count(SafeLocation) - len(victims)
+    return len(victims), sum(victim.fear for victim in victims), crimes
+
+
+@pytest.mark.parametrize("engine", ["object", "array"])
+def test_aggregates_match_a_recount(engine):
+    model = Model(30, 10, 3, 3, 0.9, 335000, 20, 20, engine=engine, seed=5)
+    for _ in range(60):
+        victims, fear, crimes = recount(model)
+        assert model.aggregates["victims"] == victims
+        assert model.aggregates["fear"] == pytest.approx(fear)
+        if crimes is not None:
+            assert model.total_crimes == crimes
+        if victims:
+            assert average_perception_of_safety(model) == pytest.approx(1 - fear / victims)
+        else:
+            assert average_perception_of_safety(model) is None
+        if not model.running:
+            break
+        model.step()
+        # The crimes of the step are reset once they have been collected.
+        assert model.crime_number == 0
+    assert model.total_crimes > 0
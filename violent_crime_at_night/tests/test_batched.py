@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch import BatchedSweepRunner, SweepRunner
+from model.batched import BatchedModel
+from model.model import Model, compute_crime_rate
+from model.rng import derive_seed
+
+PARAMS = dict(n_victims=50, n_offenders=15, n_criminal_generators=3, r_criminal_generators=4,
+              max_cp=0.8, pop_count=335000, width=50, height=50)
+MAX_STEPS = 100
+
+
+def run_model(seed, **params):
+    model = Model(**params, engine="array", seed=seed)
+    while model.running and model.schedule.steps < MAX_STEPS:
+        model.step()
+    return model
+
+
+@pytest.mark.parametrize("max_cp", [0.2, 0.8])
+def test_replicates_match_separate_array_models(max_cp):
+    params = dict(PARAMS, max_cp=max_cp)
+    seeds = [derive_seed(2021, "iteration", i) for i in range(4)]
+    batched = BatchedModel(seeds, **params)
+    batched.run(MAX_STEPS)
+
+    for seed, replicate in zip(seeds, batched.replicates):
+        model = run_model(seed, **params)
+        assert replicate.steps == model.schedule.steps
+        assert replicate.running == model.running
+        assert replicate.total_crimes == model.total_crimes
+        assert compute_crime_rate(replicate) == compute_crime_rate(model)
+        assert replicate.aggregates.values == model.aggregates.values
+        assert np.array_equal(batched.crime_field.reputation[replicate.index], model.crime_field.reputation)
+        pd.testing.assert_frame_equal(replicate.datacollector.get_model_vars_dataframe(),
+                                      model.datacollector.get_model_vars_dataframe(), check_exact=True)
+
+
+def test_replicates_count_the_work_of_separate_array_models():
+    seeds = [derive_seed(2021, "iteration", i) for i in range(3)]
+    batched = BatchedModel(seeds, **PARAMS, instrument=True)
+    batched.run(MAX_STEPS)
+
+    expected = {}
+    for seed in seeds:
+        model = Model(**PARAMS, engine="array", seed=seed, instrument=True)
+        while model.running and model.schedule.steps < MAX_STEPS:
+            model.step()
+        for counter, n in model.instrumentation.totals().items():
+            if not counter.startswith("time."):
+                expected[counter] = expected.get(counter, 0) + n
+    counters = {counter: n for counter, n in batched.instrumentation.totals().items()
+                if not counter.startswith("time.")}
+    assert counters == expected
+    assert counters["distance_evaluations"] > 0
+
+
+def test_batched_sweep_matches_sweep_of_array_models():
+    fixed = {name: value for name, value in PARAMS.items() if name != "max_cp"}
+    kwargs = dict(iterations=3, max_steps=MAX_STEPS, model_reporters={"crimerate": compute_crime_rate},
+                  processes=1, collect_datacollector=True, seed=2021)
+    sweep = SweepRunner(Model, {"max_cp": [0.2, 0.8]}, dict(fixed, engine="array"), **kwargs)
+    sweep.run_all()
+    batched = BatchedSweepRunner({"max_cp": [0.2, 0.8]}, dict(fixed, engine="array"), **kwargs)
+    batched.run_all()
+
+    pd.testing.assert_frame_equal(batched.get_model_vars_dataframe(), sweep.get_model_vars_dataframe())
+    assert batched.get_collector_model().keys() == sweep.get_collector_model().keys()
+    for key, df in sweep.get_collector_model().items():
+        pd.testing.assert_frame_equal(batched.get_collector_model()[key], df, check_exact=True)
+
+
+def test_batched_sweep_only_runs_the_array_engine():
+    with pytest.raises(ValueError):
+        BatchedSweepRunner(fixed_parameters=dict(PARAMS, engine="object"))
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from benchmarks import steps
+
+SMALL = dict(n_victims=20, n_offenders=6, n_criminal_generators=3, r_criminal_generators=2,
+             max_cp=0.8, pop_count=0, width=20, height=20)
+
+
+@pytest.fixture
+def scenarios(monkeypatch):
+    monkeypatch.setitem(steps.SCENARIOS, "tiny", SMALL)
+    monkeypatch.setitem(steps.SCENARIOS, "tiny_array", dict(SMALL, engine="array"))
+    return ["tiny", "tiny_array"]
+
+
+def test_suite_times_every_benchmark(scenarios):
+    results = steps.run_suite(scenarios, list(steps.BENCHMARKS), repeat=2)
+    assert set(results["environment"]) == {"python", "platform", "numpy", "mesa", "time"}
+    assert set(results["results"]["tiny"]) == set(steps.BENCHMARKS)
+    # The agent benchmarks are skipped with the array engine.
+    assert set(results["results"]["tiny_array"]) == set(steps.BENCHMARKS) - set(steps.AGENT_BENCHMARKS)
+    for result in results["results"]["tiny"].values():
+        assert result["calls"] > 0
+        assert 0 < result["min"] <= result["median"]
+    json.dumps(results)
+
+
+def test_hotspot_merging_adds_every_hotspot_once(monkeypatch):
+    models = []
+    warm_model = steps.warm_model
+
+    def keep_warm_model(params):
+        models.append(warm_model(params))
+        return models[-1]
+
+    monkeypatch.setattr(steps, "warm_model", keep_warm_model)
+    elapsed, calls = steps.bench_hotspot_merging(SMALL, n_hotspots=30)
+    assert calls == 30 and elapsed > 0
+
+    # Every hotspot is given one id when it is added, besides those of the crimes of the warm up.
+    field = models[0].crime_field
+    assert len(field.hotspots) == models[0].total_crimes + 30
+
+    # The clustered hotspots merge into a few, each owning the positions of its set.
+    assert 0 < len(field.areas) < 30
+    owned = field.area_id >= 0
+    roots = set(field.hotspots.find_many(field.area_id[owned]).tolist())
+    assert roots == set(field.areas)
+    assert sum(field.area_cells.values()) == owned.sum()
+
+
+def result(t):
+    return {"calls": 1, "min": t, "median": t, "mean": t}
+
+
+def test_compare_flags_the_benchmarks_slower_than_the_threshold(capsys):
+    baseline = {"results": {"tiny": {"init": result(1.0), "step": result(1.0), "get_target": result(1.0)}}}
+    current = {"results": {"tiny": {"init": result(1.05), "step": result(1.5), "get_target": result(0.5),
+                                    "hotspot_merging": result(1.0)}}}
+    assert steps.compare(current, baseline, threshold=0.1) == [("tiny", "step")]
+    assert steps.compare(current, baseline, threshold=0.01) == [("tiny", "init"), ("tiny", "step")]
+    output = capsys.readouterr().out
+    assert "slower" in output and "faster" in output
+
+
+def test_main_writes_and_compares_against_a_baseline(scenarios, tmp_path, monkeypatch):
+    baseline = tmp_path / "baseline.json"
+    argv = ["--scenarios", "tiny", "--benchmarks", "init", "step", "--repeat", "1"]
+    assert steps.main(argv + ["--output", str(baseline)]) == 0
+    saved = json.loads(baseline.read_text())
+    assert set(saved["results"]["tiny"]) == {"init", "step"}
+
+    # A baseline far faster than any run is a regression, a far slower one is not.
+    for stats in saved["results"]["tiny"].values():
+        stats["min"] *= 1e-6
+    baseline.write_text(json.dumps(saved))
+    assert steps.main(argv + ["--compare", str(baseline)]) == 1
+    for stats in saved["results"]["tiny"].values():
+        stats["min"] *= 1e12
+    baseline.write_text(json.dumps(saved))
+    assert steps.main(argv + ["--compare", str(baseline)]) == 0
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from batch.cache import RunCache, source_hash
+
+
+def test_round_trip_keeps_the_collection_steps(tmp_path):
+    cache = RunCache(str(tmp_path))
+    datacollector_vars = pd.DataFrame({"Average Perception of Safety": [0.9, 0.85, np.nan],
+                                       "Crime-rate": [0.0, 0.5, 1.5]},
+                                      index=np.array([0, 5, 10]))
+    model_vars = {"crimerate": 2.5}
+
+    cache.put("run", model_vars, datacollector_vars)
+    cached_model_vars, cached_datacollector_vars = cache.get("run")
+
+    assert cached_model_vars == model_vars
+    pd.testing.assert_frame_equal(cached_datacollector_vars, datacollector_vars)
+
+
+def test_round_trip_without_datacollector(tmp_path):
+    cache = RunCache(str(tmp_path))
+    cache.put("run", {"crimerate": 1.0})
+    assert cache.get("run") == ({"crimerate": 1.0}, None)
+    assert cache.get("missing") is None
+
+
+def test_source_hash_covers_only_the_source_packages(tmp_path):
+    for path in ["model/model.py", "agents/agent.py", "batch/sweep.py", "run.py"]:
+        (tmp_path / path).parent.mkdir(exist_ok=True)
+        (tmp_path / path).write_text("# " + path + "\n")
+    digest = source_hash(str(tmp_path))
+
+    (tmp_path / "run.py").write_text("# plots\n")
+    (tmp_path / "model" / "notes.txt").write_text("notes\n")
+    assert source_hash(str(tmp_path)) == digest
+
+    (tmp_path / "agents" / "agent.py").write_text("# changed\n")
+    assert source_hash(str(tmp_path)) != digest
+
+
+def test_key_does_not_depend_on_the_imported_modules(tmp_path):
+    from model.model import Model
+    kwargs = {"n_victims": 1, "seed": 1}
+    key = RunCache(str(tmp_path)).key(Model, kwargs, 10, {})
+
+    import batch.batched  # noqa: F401
+    import benchmarks.steps  # noqa: F401
+    assert RunCache(str(tmp_path)).key(Model, kwargs, 10, {}) == key
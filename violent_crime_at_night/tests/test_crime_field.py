@@ -0,0 +1,77 @@
+import math
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from agents.environmental_agents import CrimeField
+from model.distance import manhattan
+
+
+def random_field(rng, width, height, density):
+    """Return a crime field with random reputations, a fraction density of its positions criminal. """
+    field = CrimeField(width, height)
+    field.reputation = np.where(rng.random((width, height)) < density, np.round(rng.uniform(0.1, 1, (width, height)), 3), 0)
+    field.crime_changed = True
+    field.reputation_changed = True
+    return field
+
+
+@pytest.mark.parametrize("width, height, density", [(12, 9, 0.05), (7, 15, 0.3), (1, 6, 0.5), (10, 10, 0.01)])
+def test_nearest_crime_matches_scan(width, height, density):
+    rng = np.random.default_rng(width * height)
+    for _ in range(5):
+        field = random_field(rng, width, height, density)
+        crimes = [(x, y) for x in range(width) for y in range(height) if field.reputation[x, y] > 0]
+        for x in range(width):
+            for y in range(height):
+                distance, nearest = field.get_nearest_crime((x, y))
+                if not crimes:
+                    assert (distance, nearest) == (math.inf, None)
+                    continue
+                # The lowest position among the nearest, as min gives on (distance, pos).
+                assert (distance, nearest) == min((manhattan((x, y), c), c) for c in crimes)
+
+
+def test_nearest_crime_without_crime():
+    field = CrimeField(6, 4)
+    for pos in [(0, 0), (5, 3), (0, 3), (2, 1)]:
+        assert field.get_nearest_crime(pos) == (math.inf, None)
+
+
+def test_nearest_crime_in_a_corner():
+    field = CrimeField(8, 5)
+    field.reputation[7, 4] = 0.5
+    assert field.get_nearest_crime((0, 0)) == (11, (7, 4))
+    assert field.get_nearest_crime((7, 4)) == (0, (7, 4))
+    assert field.get_nearest_crime((7, 0)) == (4, (7, 4))
+
+
+@pytest.mark.parametrize("radius", [0, 1, 4, 5, 20])
+def test_window_sums_match_slice_sums(radius):
+    rng = np.random.default_rng(radius)
+    width, height = 17, 11
+    field = random_field(rng, width, height, 0.3)
+    poss = [(8, 5), (3, 7),  # Interior.
+            (0, 5), (16, 4), (9, 0), (6, 10),  # Edges.
+            (0, 0), (0, 10), (16, 0), (16, 10)]  # Corners.
+
+    expected = []
+    for x, y in poss:
+        window = field.reputation[max(x - radius, 0):x + radius + 1, max(y - radius, 0):y + radius + 1]
+        expected.append((int((window > 0).sum()), window.sum()))
+        n_crime, reputation_sum = field.window_sums((x, y), radius)
+        assert n_crime == expected[-1][0]
+        assert reputation_sum == pytest.approx(expected[-1][1])
+
+    n_crime, reputation_sum = field.window_sums_many(np.array(poss), radius)
+    assert n_crime.tolist() == [n for n, _ in expected]
+    assert reputation_sum == pytest.approx([s for _, s in expected])
+
+
+def test_window_sums_follow_reputation_changes():
+    field = CrimeField(10, 10)
+    assert field.window_sums((5, 5), 2) == (0, 0.0)
+    field.add_generator(SimpleNamespace(centroid=(6, 6), radius=0, criminal_reputation=0.5))
+    assert field.window_sums((5, 5), 2) == (1, pytest.approx(0.5))
+    assert field.window_sums((0, 0), 2) == (0, 0.0)
@@ -0,0 +1,77 @@
+import gc
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from mesa.batchrunner import BatchRunner
+
+from model.datacollection import ColumnarDataCollector
+from model.model import Model, compute_crime_rate
+
+PARAMS = dict(n_victims=10, n_offenders=4, n_criminal_generators=1, r_criminal_generators=2,
+              max_cp=0.5, pop_count=1000, width=15, height=15)
+
+
+def test_agent_reporters_are_empty():
+    collector = ColumnarDataCollector(model_reporters={"a": lambda model: 1})
+    assert collector.agent_reporters == {}
+    assert collector.get_agent_vars_dataframe().empty
+
+
+def collect_all(collector, values):
+    for step, value in enumerate(values):
+        collector.collect(SimpleNamespace(value=value), step=step)
+
+
+def test_none_is_given_back_as_none():
+    collector = ColumnarDataCollector(model_reporters={"safety": lambda model: model.value}, chunk_size=2)
+    collect_all(collector, [0.5, None, 0.25, None])
+    column = collector.model_vars["safety"]
+
+    assert column[-1] is None
+    assert column[0] == 0.5
+    assert list(column) == [0.5, None, 0.25, None]
+    assert column.tolist(1, 3) == [None, 0.25]
+    assert np.isnan(collector.get_model_vars_dataframe()["safety"].iloc[-1])
+
+
+def test_attribute_and_function_reporters():
+    collector = ColumnarDataCollector(model_reporters={"value": "value", "constant": [max, (2, 3)]})
+    collect_all(collector, [1.0, 2.0])
+    assert list(collector.model_vars["value"]) == [1.0, 2.0]
+    assert list(collector.model_vars["constant"]) == [3.0, 3.0]
+
+    with pytest.raises(TypeError):
+        ColumnarDataCollector(model_reporters={"value": 1})
+
+
+def test_spill_directory_is_removed(tmp_path):
+    collector = ColumnarDataCollector(model_reporters={"value": "value"}, chunk_size=2, spill_dir=str(tmp_path))
+    collect_all(collector, [1.0, 2.0, 3.0, 4.0, 5.0])
+    assert len(list(tmp_path.iterdir())) == 1
+
+    collector.close()
+    assert not list(tmp_path.iterdir())
+    collect_all(collector, [6.0, 7.0])
+    assert list(collector.model_vars["value"]) == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0]
+
+    collector = ColumnarDataCollector(model_reporters={"value": "value"}, chunk_size=2, spill_dir=str(tmp_path))
+    collect_all(collector, [1.0, 2.0, 3.0])
+    del collector
+    gc.collect()
+    assert not list(tmp_path.iterdir())
+
+
+def test_mesa_batch_runner():
+    batch_run = BatchRunner(Model, {"max_cp": [0.2, 0.8]}, dict(PARAMS, seed=1), iterations=1, max_steps=3,
+                            model_reporters={"crimerate": compute_crime_rate}, display_progress=False)
+    batch_run.run_all()
+
+    assert len(batch_run.get_model_vars_dataframe()) == 2
+    collected = batch_run.get_collector_model()
+    assert len(collected) == 2
+    for df in collected.values():
+        assert list(df.columns) == ["Average Perception of Safety", "Crime-rate"]
+        assert list(df.index) == list(range(len(df)))
+    assert all(df.empty for df in batch_run.get_collector_agents().values())
@@ -0,0 +1,106 @@
+import json
+from colorsys import hls_to_rgb
+
+import numpy as np
+from webcolors import rgb_to_hex
+
+from agents.cognitive_agents.offenderAgent import PossibleOffender
+from agents.cognitive_agents.victimAgent import PossibleVictim, SafeLocation
+from model.model import Model
+from visualization import ColorTable, DeltaCanvasGrid
+
+LIGHT_COLORS = ColorTable((0, 0, 0))
+CRIME_COLORS = ColorTable((350, 0.36, .85))
+
+
+def agent_portrayal(agent):
+    shapes = {PossibleVictim: "circle", PossibleOffender: "circle", SafeLocation: "rect"}
+    colors = {PossibleVictim: "blue", PossibleOffender: "black", SafeLocation: "green"}
+    return {"Shape": shapes[type(agent)], "Color": colors[type(agent)], "Filled": "true", "Layer": 1}
+
+
+def crime_portrayals(model):
+    reputation = model.crime_field.reputation
+    x, y = np.nonzero(reputation > 0)
+    colors = CRIME_COLORS.lookup(1 - reputation[x, y] / 2)
+    return [((int(i), int(j)), {"Shape": "rect", "Color": str(c), "Filled": "true", "Layer": 0})
+            for i, j, c in zip(x.tolist(), y.tolist(), colors.tolist())]
+
+
+def light_colors(model):
+    return LIGHT_COLORS.lookup(model.illuminance)
+
+
+def new_grid():
+    return DeltaCanvasGrid(agent_portrayal, 20, 20, background_method=light_colors,
+                           cell_portrayal_method=crime_portrayals)
+
+
+class Client:
+    """The state DeltaCanvasModule.js keeps from the frames it is sent. """
+
+    def __init__(self):
+        self.background = None
+        self.cells = {}
+
+    def render(self, data):
+        data = json.loads(json.dumps(data))
+        if data.get("background"):
+            self.background = data["background"]
+            self.cells = {}
+        for x, y in data["removed"]:
+            del self.cells[x, y]
+        for x, y, portrayals in data["changed"]:
+            self.cells[x, y] = portrayals
+
+
+def full_render(model):
+    """Return the background and the portrayals of every cell, rendered from scratch. """
+    data = json.loads(json.dumps(new_grid().render(model)))
+    assert data["removed"] == []
+    return data["background"], {(x, y): portrayals for x, y, portrayals in data["changed"]}
+
+
+def test_deltas_reproduce_a_full_render():
+    model = Model(30, 10, 3, 3, 0.9, 335000, 20, 20, seed=5)
+    grid = new_grid()
+    client = Client()
+
+    frame = grid.render(model)
+    client.render(frame)
+    background, cells = full_render(model)
+    assert client.background == background
+    assert client.cells == cells
+
+    sizes = []
+    for _ in range(30):
+        model.step()
+        frame = grid.render(model)
+        # The background is only sent with the first frame of a model.
+        assert "background" not in frame
+        sizes.append(len(frame["changed"]) + len(frame["removed"]))
+        client.render(frame)
+        assert client.cells == full_render(model)[1]
+    assert model.total_crimes > 0
+    assert sum(sizes) < 30 * len(cells)
+
+    # An unchanged model sends an empty frame.
+    assert grid.render(model) == {"changed": [], "removed": []}
+
+    # A new model sends its background and every cell again.
+    model = Model(20, 6, 3, 2, 0.9, 335000, 20, 20, seed=4)
+    client.render(grid.render(model))
+    background, cells = full_render(model)
+    assert client.background == background
+    assert client.cells == cells
+
+
+def test_color_table_matches_the_conversion_of_each_colour():
+    table = ColorTable((350, 0.36, .85), levels=11)
+    for i, lightness in enumerate(np.linspace(0, 1, 11)):
+        rgb = tuple(int(c * 255) for c in hls_to_rgb(350, i / 10, .85))
+        assert table[lightness] == rgb_to_hex(rgb)
+        assert tuple(table.lookup_rgb(np.array([lightness]))[0]) == rgb
+    assert table[-1] == table[0]
+    assert table[2] == table[1]
+    assert table.lookup(np.array([[0.0, 1.0]])).shape == (1, 2)
@@ -0,0 +1,142 @@
+import numpy as np
+import pytest
+
+from agents.environmental_agents import CrimeField
+from agents.environmental_agents.CrimeAttractor import CrimeAttractor
+from model.disjoint_set import DisjointSet
+from model.model import Model
+from model.rng import RandomStreams
+
+
+def test_make_set_grows_past_capacity():
+    hotspots = DisjointSet(capacity=2)
+    ids = [hotspots.make_set() for _ in range(5)]
+    assert ids == [0, 1, 2, 3, 4]
+    assert len(hotspots) == 5
+    assert [hotspots.find(i) for i in ids] == ids
+
+
+def test_union_and_find():
+    hotspots = DisjointSet()
+    a, b, c, d = (hotspots.make_set() for _ in range(4))
+    root = hotspots.union(a, b)
+    assert hotspots.find(a) == hotspots.find(b) == root
+    assert hotspots.find(c) == c
+
+    # The root of the larger set is kept.
+    assert hotspots.union(c, root) == root
+    assert hotspots.union(d, c) == root
+    assert hotspots.find_many([a, b, c, d]).tolist() == [root] * 4
+    assert hotspots.union(a, d) == root
+
+
+def test_path_compression():
+    hotspots = DisjointSet()
+    for _ in range(5):
+        hotspots.make_set()
+    hotspots.parent[1:5] = [0, 1, 2, 3]  # A chain 4 -> 3 -> 2 -> 1 -> 0.
+
+    assert hotspots.find(4) == 0
+    assert hotspots.parent[:5].tolist() == [0, 0, 0, 0, 0]
+
+    hotspots.parent[1:5] = [0, 1, 2, 3]
+    assert hotspots.find_many([4, 3]).tolist() == [0, 0]
+    assert hotspots.parent[[3, 4]].tolist() == [0, 0]
+
+
+class Attractor:
+    """A crime attractor with the attributes the crime field reads, without a model. """
+
+    def __init__(self, centroid, criminal_reputation):
+        self.centroid = centroid
+        self.radius = 1
+        self.criminal_reputation = criminal_reputation
+        self.area_id = None
+
+
+def test_overlapping_attractors_share_one_area():
+    field = CrimeField(10, 10)
+    first = Attractor((4, 4), 0.8)
+    field.add_attractor(first, 0.15)
+    second = Attractor((5, 5), 0.6)
+    overlapping = field.get_attractors(second.centroid, second.radius + 1)
+    assert overlapping == {first}
+    field.add_attractor(second, 0.15, overlapping)
+
+    # The positions of both attractors belong to a single hotspot, represented by the newest.
+    owned = field.area_id >= 0
+    roots = np.unique(field.hotspots.find_many(field.area_id[owned]))
+    assert roots.tolist() == [second.area_id]
+    assert field.areas == {second.area_id: second}
+    assert field.get_area((3, 3)) is field.get_area((6, 6)) is second
+
+    # The hotspot covers the union of the two crime areas, not an area grown from both radii.
+    expected_owned = np.zeros((10, 10), dtype=bool)
+    expected_owned[3:6, 3:6] = True
+    expected_owned[4:7, 4:7] = True
+    assert (owned == expected_owned).all()
+    assert field.area_cells[second.area_id] == expected_owned.sum()
+
+    # Each position keeps the highest reputation either attractor gives it, and deteriorates
+    # by 0.15 of that reputation.
+    expected = np.zeros((10, 10))
+    expected[3:6, 3:6] = 0.4
+    expected[4:7, 4:7] = np.maximum(expected[4:7, 4:7], 0.3)
+    expected[4, 4] = 0.8
+    expected[5, 5] = 0.6
+    assert field.attractor_reputation == pytest.approx(expected)
+    assert field.reputation_decrease == pytest.approx(expected * 0.15)
+    assert field.reputation == pytest.approx(expected)
+
+
+def test_merged_crime_attractor_takes_the_highest_reputation():
+    model = Model(0, 1, 0, 1, 0.5, 1000, 10, 10, seed=3)
+    stream = RandomStreams(3).stream(CrimeAttractor.RANDOM_STREAM)
+    reputations = [round(stream.uniform(0.5, 1), 3) for _ in range(2)]
+
+    first = CrimeAttractor(model.next_id(), model, (4, 4), 1)
+    second = CrimeAttractor(model.next_id(), model, (6, 6), 1)
+
+    assert model.crime_field.areas == {second.area_id: second}
+    assert first.criminal_reputation == reputations[0]
+    assert second.criminal_reputation == max(reputations)
+    assert second.centroid == (5, 5)
+
+    # Every position of the merged hotspot takes its reputation from the merged centroid and
+    # reputation.
+    field = model.crime_field
+    owned = field.area_id >= 0
+    expected_owned = np.zeros((10, 10), dtype=bool)
+    expected_owned[3:6, 3:6] = True
+    expected_owned[5:8, 5:8] = True
+    assert (owned == expected_owned).all()
+    x, y = np.nonzero(owned)
+    expected = max(reputations) / (np.rint(np.hypot(x - 5, y - 5)) + 1)
+    assert field.attractor_reputation[owned] == pytest.approx(expected)
+    assert field.reputation_decrease[owned] == pytest.approx(expected * 0.15)
+    assert field.reputation[owned] == pytest.approx(expected)
+    assert (field.attractor_reputation[~owned] == 0).all()
+
+
+def test_stamp_area_covers_the_merged_hotspots_only():
+    field = CrimeField(12, 12)
+    first = Attractor((2, 2), 0.8)
+    field.add_attractor(first, 0.15)
+    second = Attractor((3, 3), 0.6)
+    field.add_attractor(second, 0.15, {first})
+    other = Attractor((9, 9), 0.5)
+    field.add_attractor(other, 0.15)
+    assert field.area_bounds[second.area_id] == (1, 5, 1, 5)
+
+    second.centroid = (2, 2)
+    second.criminal_reputation = 0.8
+    field.stamp_area(second, 0.15)
+
+    expected = np.zeros((12, 12))
+    x, y = np.indices((12, 12))
+    owned = (field.area_id >= 0) & (field.hotspots.find_many(np.maximum(field.area_id, 0)) == second.area_id)
+    expected[owned] = 0.8 / (np.rint(np.hypot(x - 2, y - 2)) + 1)[owned]
+    expected[8:11, 8:11] = 0.5 / 2
+    expected[9, 9] = 0.5
+    assert field.attractor_reputation == pytest.approx(expected)
+    assert field.reputation == pytest.approx(expected)
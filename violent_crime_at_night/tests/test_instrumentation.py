@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agents.environmental_agents import CrimeField
+from model.instrumentation import Instrumentation, NullInstrumentation, NULL_INSTRUMENTATION
+from model.model import Model
+
+PARAMS = dict(n_victims=20, n_offenders=6, n_criminal_generators=3, r_criminal_generators=2,
+              max_cp=0.8, pop_count=335000, width=20, height=20)
+
+
+def test_counters_and_times_are_recorded_per_step():
+    instrumentation = Instrumentation()
+    instrumentation.count("agents_created", 3)
+    instrumentation.add_time("setup", instrumentation.clock())
+    instrumentation.end_step(0)
+    instrumentation.query(9)
+    instrumentation.query(4)
+    instrumentation.count("agents_removed")
+    instrumentation.end_step(1)
+
+    report = instrumentation.get_report_dataframe()
+    assert report.index.tolist() == [0, 1]
+    assert report.columns.tolist() == ["agents_created", "agents_removed", "cells_scanned",
+                                       "neighborhood_queries", "time.setup"]
+    assert report["agents_created"].tolist() == [3, 0]
+    assert report["agents_removed"].tolist() == [0, 1]
+    assert report["neighborhood_queries"].tolist() == [0, 2]
+    assert report["cells_scanned"].tolist() == [0, 13]
+    assert report["neighborhood_queries"].dtype == np.int64
+    assert report["time.setup"].iloc[0] >= 0
+    assert report["time.setup"].iloc[1] == 0
+
+    totals = instrumentation.totals()
+    assert totals["cells_scanned"] == 13
+    assert totals["agents_created"] == 3
+
+
+def test_null_instrumentation_records_nothing():
+    instrumentation = NULL_INSTRUMENTATION
+    assert isinstance(instrumentation, NullInstrumentation)
+    assert not instrumentation.enabled
+    assert instrumentation.clock() == 0
+    instrumentation.add_time("setup", 0)
+    instrumentation.count("agents_created", 3)
+    instrumentation.query(9)
+    instrumentation.end_step(0)
+    assert not hasattr(instrumentation, "counters")
+    assert not hasattr(instrumentation, "get_report_dataframe")
+
+
+def test_window_sums_count_the_cells_of_their_windows():
+    field = CrimeField(10, 8)
+    field.instrumentation = Instrumentation()
+    field.window_sums((5, 4), 1)
+    field.window_sums((0, 0), 2)
+    field.window_sums_many(np.array([[9, 7], [5, 4]]), 2)
+    field.instrumentation.end_step(0)
+
+    totals = field.instrumentation.totals()
+    assert totals["neighborhood_queries"] == 4
+    # A 3x3 window, and 3x3, 3x3 and 5x5 windows of radius 2 clipped by the edges.
+    assert totals["cells_scanned"] == 9 + 9 + 9 + 25
+
+
+# With the object engine every victim has a safe location, an agent of its own.
+@pytest.mark.parametrize("engine, per_victim", [("array", 1), ("object", 2)])
+def test_crime_areas_are_counted_as_agents(engine, per_victim):
+    model = Model(**PARAMS, engine=engine, seed=7, instrument=True)
+    assert model.instrumentation.totals()["agents_created"] == per_victim * 20 + 6 + 3
+
+    for _ in range(40):
+        model.step()
+    totals = model.instrumentation.totals()
+    attractors = model.total_crimes
+    hotspots = len(model.crime_field.areas)
+    assert totals["agents_created"] == per_victim * 20 + 6 + 3 + attractors
+    # The victims which arrived are removed with their safe location, those which fell victim
+    # to a crime without it, and every attractor which is not a hotspot any more has been
+    # merged or has expired.
+    arrived = 20 - model.aggregates["victims"] - attractors
+    assert totals["agents_removed"] == per_victim * arrived + attractors + attractors - hotspots
+
+
+def test_instrumentation_does_not_change_the_results():
+    frames = []
+    for instrument in (False, True):
+        model = Model(**PARAMS, engine="array", seed=7, instrument=instrument)
+        assert model.instrumentation.enabled == instrument
+        for _ in range(40):
+            model.step()
+        frames.append(model.datacollector.get_model_vars_dataframe())
+    pd.testing.assert_frame_equal(frames[0], frames[1], check_exact=True)
@@ -0,0 +1,56 @@
+import json
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from benchmarks import memory
+
+
+def test_deep_size_counts_shared_objects_once():
+    shared = list(range(100))
+    a = {"values": shared}
+    b = SimpleNamespace(values=shared)
+
+    seen = set()
+    size_a = memory.deep_size(a, seen)
+    size_b = memory.deep_size(b, seen)
+    assert size_a > sys.getsizeof(shared)
+    assert size_b < sys.getsizeof(shared)
+    assert memory.deep_size(shared, seen) == 0
+
+
+def test_deep_size_counts_views_with_their_array():
+    array = np.zeros((100, 100))
+    view = array[10:20]
+    seen = set()
+    assert memory.deep_size(view, seen) >= array.nbytes
+    assert memory.deep_size(array, seen) == 0
+
+
+@pytest.mark.parametrize("engine, space", [("object", "dense"), ("object", "sparse"), ("array", "dense")])
+def test_measure_reports_every_checkpoint_without_leaks(engine, space):
+    results = memory.measure(20, [0, 8], engine=engine, space=space)
+    assert [r["steps"] for r in results] == [0, 8]
+    for r in results:
+        assert 0 < r["current"] <= r["peak"]
+        assert {"grid", "schedule", "datacollector", "crime_field", "model"} <= set(r["by_structure"])
+        assert set(r["by_class"]) == set(r["agents"])
+        leaks = r["leaks"]
+        assert leaks["grid_agents_not_scheduled"] == 0
+        assert leaks["indexed_agents_not_scheduled"] == 0
+        assert leaks["hotspots_without_positions"] == 0
+    if engine == "array":
+        assert "victim_engine" in results[0]["by_structure"]
+    else:
+        assert results[0]["agents"]["PossibleVictim"] == 8
+    json.dumps(results)
+
+
+def test_main_writes_the_results(tmp_path, capsys):
+    output = tmp_path / "memory.json"
+    memory.main(["--sizes", "20", "--steps", "0", "5", "--output", str(output)])
+    results = json.loads(output.read_text())
+    assert [(r["width"], r["steps"]) for r in results] == [(20, 0), (20, 5)]
+    assert "20x20, object engine, dense space, step 5" in capsys.readouterr().out
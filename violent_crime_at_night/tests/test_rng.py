@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+
+from model.model import Model
+from model.rng import RandomStreams, derive_seed
+
+
+def test_derive_seed_is_deterministic_and_distinct():
+    assert derive_seed(1, "iteration", 0) == derive_seed(1, "iteration", 0)
+    seeds = {derive_seed(1, "iteration", i) for i in range(100)}
+    seeds |= {derive_seed(2, "iteration", i) for i in range(100)}
+    assert len(seeds) == 200
+    assert all(0 <= seed < 2 ** 64 for seed in seeds)
+
+
+def test_same_seed_draws_the_same_numbers():
+    a, b = RandomStreams(42), RandomStreams(42)
+    assert [a.stream("layout").random() for _ in range(5)] == [b.stream("layout").random() for _ in range(5)]
+    assert (a.numpy("levels").uniform(0, 1, 5) == b.numpy("levels").uniform(0, 1, 5)).all()
+    assert RandomStreams(43).stream("layout").random() != RandomStreams(42).stream("layout").random()
+
+
+def test_purposes_are_independent():
+    a, b = RandomStreams(42), RandomStreams(42)
+    assert a.stream("layout").random() != a.stream("victim_step").random()
+    b.stream("layout").random()
+
+    # Drawing from one purpose does not shift the draws of the others.
+    for _ in range(10):
+        a.stream("victim_step").random()
+        a.numpy("victim_step").random()
+    assert a.stream("layout").random() == b.stream("layout").random()
+    assert a.numpy("layout").random() == b.numpy("layout").random()
+
+    # The same stream is given back for a purpose.
+    assert a.stream("layout") is a.stream("layout")
+    assert a.numpy("layout") is a.numpy("layout")
+
+
+def test_unseeded_streams_keep_their_seed():
+    a = RandomStreams()
+    assert isinstance(a.seed, int)
+    b = RandomStreams(a.seed)
+    assert [a.stream("layout").random() for _ in range(3)] == [b.stream("layout").random() for _ in range(3)]
+
+
+@pytest.mark.parametrize("engine", ["object", "array"])
+def test_models_with_the_same_seed_give_the_same_run(engine):
+    frames = []
+    for _ in range(2):
+        model = Model(20, 6, 3, 2, 0.8, 335000, 20, 20, engine=engine, seed=11)
+        for _ in range(30):
+            model.step()
+        frames.append(model.datacollector.get_model_vars_dataframe())
+    pd.testing.assert_frame_equal(frames[0], frames[1], check_exact=True)
@@ -0,0 +1,116 @@
+import random
+
+import pandas as pd
+import pytest
+from mesa import Agent
+from mesa.space import MultiGrid
+
+from model.model import Model
+from model.space import IndexedMultiGrid, IndexedSparseMultiGrid, SparseMultiGrid
+
+
+class Walker(Agent):
+    pass
+
+
+class Runner(Agent):
+    pass
+
+
+def populate(grids, rng, width, height, n):
+    """Place the same n agents at random positions in every grid, and return the agents of each. """
+    agents = [[] for _ in grids]
+    for i in range(n):
+        pos = rng.randrange(width), rng.randrange(height)
+        agent_type = Walker if i % 3 else Runner
+        for grid, grid_agents in zip(grids, agents):
+            agent = agent_type(i, None)
+            grid.place_agent(agent, pos)
+            grid_agents.append(agent)
+    return agents
+
+
+def ids(agents):
+    return [agent.unique_id for agent in agents]
+
+
+@pytest.mark.parametrize("torus", [False, True])
+def test_neighbourhoods_match_multigrid(torus):
+    rng = random.Random(1)
+    width, height = 23, 17
+    dense = MultiGrid(width, height, torus)
+    sparse = SparseMultiGrid(width, height, torus, chunk_size=4)
+    dense_agents, sparse_agents = populate([dense, sparse], rng, width, height, 60)
+
+    for step in range(3):
+        for _ in range(40):
+            pos = rng.randrange(width), rng.randrange(height)
+            for moore in (True, False):
+                for include_center in (True, False):
+                    for radius in (0, 1, 3, 9):
+                        assert sparse.get_neighborhood(pos, moore, include_center, radius) == \
+                               dense.get_neighborhood(pos, moore, include_center, radius)
+                        assert ids(sparse.get_neighbors(pos, moore, include_center, radius)) == \
+                               ids(dense.get_neighbors(pos, moore, include_center, radius))
+            assert ids(sparse[pos]) == ids(dense[pos[0]][pos[1]])
+            assert sparse.is_cell_empty(pos) == dense.is_cell_empty(pos)
+
+        # Move some agents and remove others, in both grids alike.
+        for i in rng.sample(range(len(dense_agents)), 15):
+            if dense_agents[i].pos is None:
+                continue
+            pos = rng.randrange(width), rng.randrange(height)
+            dense.move_agent(dense_agents[i], pos)
+            sparse.move_agent(sparse_agents[i], pos)
+        for i in rng.sample(range(len(dense_agents)), 5):
+            if dense_agents[i].pos is not None:
+                dense.remove_agent(dense_agents[i])
+                sparse.remove_agent(sparse_agents[i])
+
+
+def test_chunks_are_only_kept_while_they_hold_agents():
+    grid = SparseMultiGrid(100, 100, False, chunk_size=10)
+    a, b = Walker(0, None), Walker(1, None)
+    grid.place_agent(a, (5, 5))
+    grid.place_agent(b, (95, 95))
+    assert set(grid.chunks) == {(0, 0), (9, 9)}
+    assert len(grid) == 2
+
+    grid.move_agent(a, (6, 5))
+    assert set(grid.chunks) == {(0, 0), (9, 9)}
+    grid.move_agent(b, (50, 50))
+    assert set(grid.chunks) == {(0, 0), (5, 5)}
+    grid.remove_agent(a)
+    assert set(grid.chunks) == {(5, 5)}
+    assert a.pos is None
+    assert grid[6, 5] == []
+
+
+def test_neighbourhood_cache_is_bounded():
+    grid = SparseMultiGrid(50, 50, False, cache_size=10)
+    for x in range(50):
+        grid.get_neighborhood((x, 0), True)
+        assert len(grid._neighborhood_cache) <= 10
+
+
+def test_typed_neighbours_match_the_dense_grid():
+    rng = random.Random(2)
+    dense = IndexedMultiGrid(30, 30, False, indexed_types=(Walker, Runner))
+    sparse = IndexedSparseMultiGrid(30, 30, False, indexed_types=(Walker, Runner), chunk_size=8)
+    populate([dense, sparse], rng, 30, 30, 80)
+    for _ in range(50):
+        pos = rng.randrange(30), rng.randrange(30)
+        for agent_type in (Walker, Runner):
+            for radius in (1, 4, 12):
+                assert ids(sparse.get_typed_neighbors(pos, agent_type, radius)) == \
+                       ids(dense.get_typed_neighbors(pos, agent_type, radius))
+
+
+def test_dense_and_sparse_models_give_the_same_run():
+    frames = []
+    for space in ("dense", "sparse"):
+        model = Model(30, 10, 3, 3, 0.9, 335000, 20, 20, seed=5, space=space)
+        for _ in range(40):
+            model.step()
+        frames.append(model.datacollector.get_model_vars_dataframe())
+    pd.testing.assert_frame_equal(frames[0], frames[1], check_exact=True)
@@ -0,0 +1,22 @@
+import json
+from types import SimpleNamespace
+
+from model.datacollection import ColumnarDataCollector
+from visualization.step_chart import StepChartModule
+
+
+def test_values_are_sent_once_as_json():
+    collector = ColumnarDataCollector(model_reporters={"safety": lambda model: model.value})
+    model = SimpleNamespace(datacollector=collector)
+    chart = StepChartModule([{"Label": "safety", "Color": "black"}])
+
+    for step, value in enumerate([0.5, float("inf")]):
+        model.value = value
+        collector.collect(model, step=step)
+    assert chart.render(model) == {"steps": [0, 1], "values": [[0.5, None]]}
+
+    model.value = None
+    collector.collect(model, step=2)
+    frame = chart.render(model)
+    assert json.loads(json.dumps(frame, allow_nan=False)) == {"steps": [2], "values": [[None]]}
+    assert chart.render(model) == {"steps": [], "values": [[]]}
@@ -0,0 +1,119 @@
+from mesa import Agent, Model
+
+from model.instrumentation import Instrumentation
+from model.time import TypeStagedActivation
+
+
+class Walker(Agent):
+    def step(self):
+        self.model.log.append(("walker", self.unique_id))
+
+
+class Runner(Walker):
+    def step(self):
+        self.model.log.append(("runner", self.unique_id))
+
+
+class Passive(Agent):
+    def step(self):
+        raise AssertionError("passive agents are never stepped")
+
+
+class Remover(Agent):
+    """Removes the target agent from the schedule when stepped. """
+
+    def __init__(self, unique_id, model, target=None):
+        super().__init__(unique_id, model)
+        self.target = target
+
+    def step(self):
+        self.model.log.append(("remover", self.unique_id))
+        if self.target is not None and self.target.unique_id in self.model.schedule._agents:
+            self.model.schedule.remove(self.target)
+
+
+class StagedModel(Model):
+    def __init__(self, seed=0):
+        super().__init__()
+        self.random.seed(seed)
+        self.instrumentation = Instrumentation()
+        self.log = []
+        self.schedule = TypeStagedActivation(self)
+
+
+def test_stages_run_in_order():
+    model = StagedModel()
+    for i in range(3):
+        model.schedule.add(Walker(i, model))
+    model.schedule.add(Passive(10, model))
+    model.schedule.stages = [lambda: model.log.append("first"), Walker, lambda: model.log.append("last")]
+    model.schedule.step()
+
+    assert model.log[0] == "first"
+    assert sorted(model.log[1:-1]) == [("walker", 0), ("walker", 1), ("walker", 2)]
+    assert model.log[-1] == "last"
+    assert model.schedule.steps == 1
+
+    model.instrumentation.end_step(1)
+    times = model.instrumentation.get_report_dataframe().columns
+    assert "time.Walker" in times
+
+
+def test_agent_types_include_subclasses_and_passive_agents():
+    model = StagedModel()
+    model.schedule.add(Walker(0, model))
+    model.schedule.add(Runner(1, model))
+    model.schedule.add(Passive(2, model))
+    model.schedule.stages = [Walker]
+
+    assert [agent.unique_id for agent in model.schedule.agents_of_type(Walker)] == [0, 1]
+    assert model.schedule.get_type_count(Walker) == 2
+    assert model.schedule.get_type_count(Passive) == 1
+    assert model.schedule.get_agent_count() == 3
+
+    model.schedule.step()
+    assert sorted(model.log) == [("runner", 1), ("walker", 0)]
+
+
+def test_agents_are_stepped_in_a_random_order():
+    orders = set()
+    for seed in range(10):
+        model = StagedModel(seed)
+        for i in range(6):
+            model.schedule.add(Walker(i, model))
+        model.schedule.stages = [Walker]
+        model.schedule.step()
+        orders.add(tuple(model.log))
+    assert len(orders) > 1
+
+
+def test_agents_removed_during_the_step_are_not_stepped():
+    for seed in range(10):
+        model = StagedModel(seed)
+        walkers = [Walker(i, model) for i in range(5)]
+        for walker in walkers:
+            model.schedule.add(walker)
+        remover = Remover(5, model, walkers[2])
+        model.schedule.add(remover)
+        model.schedule.stages = [Remover, Walker]
+        model.schedule.step()
+
+        assert ("walker", 2) not in model.log
+        assert sorted(model.log) == [("remover", 5), ("walker", 0), ("walker", 1), ("walker", 3), ("walker", 4)]
+        assert model.schedule.get_type_count(Walker) == 4
+
+        # Within a stage, the removed agent is only stepped if it came before its remover.
+        model = StagedModel(seed)
+        target = Remover(0, model)
+        model.schedule.add(target)
+        model.schedule.add(Remover(1, model, target))
+        model.schedule.stages = [Remover]
+        model.schedule.step()
+        assert model.log in ([("remover", 1)], [("remover", 0), ("remover", 1)])
+        assert model.schedule.get_type_count(Remover) == 1
+
+    instrumentation = model.instrumentation
+    instrumentation.end_step(1)
+    totals = instrumentation.totals()
+    assert totals["agents_created"] == 2
+    assert totals["agents_removed"] == 1
@@ -0,0 +1,81 @@
+var DeltaCanvasModule = function(canvas_width, canvas_height, grid_width, grid_height) {
+	// Create the element
+	// ------------------
+
+	var canvas_tag = `<canvas width="${canvas_width}" height="${canvas_height}" class="world-grid"/>`
+	var parent_div_tag = '<div style="height:' + canvas_height + 'px;" class="world-grid-parent"></div>'
+
+	var canvas = $(canvas_tag)[0];
+	var interaction_canvas = $(canvas_tag)[0];
+	var parent = $(parent_div_tag)[0];
+
+	$("#elements").append(parent);
+	parent.append(canvas);
+	parent.append(interaction_canvas);
+
+	var context = canvas.getContext("2d");
+	var interactionHandler = new InteractionHandler(canvas_width, canvas_height, grid_width, grid_height, interaction_canvas.getContext("2d"));
+	var canvasDraw = new GridVisualization(canvas_width, canvas_height, grid_width, grid_height, context, interactionHandler);
+
+	var cellWidth = Math.floor(canvas_width / grid_width);
+	var cellHeight = Math.floor(canvas_height / grid_height);
+
+	// State of the grid, updated by the deltas sent by the server:
+	// the background colour of every cell, indexed as [x][y], and the
+	// portrayals of the cells which have any, keyed by "x,y".
+	var background = null;
+	var cells = {};
+
+	var drawBackground = function() {
+		if (background === null)
+			return;
+		for (var x = 0; x < background.length; x++) {
+			var column = background[x];
+			for (var y = 0; y < column.length; y++) {
+				context.fillStyle = column[y];
+				context.fillRect(x * cellWidth, (grid_height - y - 1) * cellHeight, cellWidth, cellHeight);
+			}
+		}
+	};
+
+	this.render = function(data) {
+		// A background is sent when the model is reset, along with every cell.
+		if (data.background) {
+			background = data.background;
+			cells = {};
+		}
+		for (var i = 0; i < data.removed.length; i++)
+			delete cells[data.removed[i][0] + "," + data.removed[i][1]];
+		for (var i = 0; i < data.changed.length; i++) {
+			var cell = data.changed[i];
+			cells[cell[0] + "," + cell[1]] = cell;
+		}
+
+		// Group the portrayals by layer. The drawing code modifies the
+		// portrayals it is given, so it is given copies.
+		var layers = {};
+		for (var key in cells) {
+			var cell = cells[key];
+			for (var j = 0; j < cell[2].length; j++) {
+				var p = Object.assign({}, cell[2][j]);
+				p.x = cell[0];
+				p.y = cell[1];
+				(layers[p.Layer] = layers[p.Layer] || []).push(p);
+			}
+		}
+
+		canvasDraw.resetCanvas();
+		drawBackground();
+		var order = Object.keys(layers).sort(function(a, b) { return a - b; });
+		for (var k = 0; k < order.length; k++)
+			canvasDraw.drawLayer(layers[order[k]]);
+		canvasDraw.drawGridLines("#eee");
+	};
+
+	this.reset = function() {
+		background = null;
+		cells = {};
+		canvasDraw.resetCanvas();
+	};
+
+};
@@ -0,0 +1,33 @@
+var RasterCanvasModule = function(canvas_width, canvas_height) {
+	// Create the element
+	// ------------------
+
+	var canvas_tag = `<canvas width="${canvas_width}" height="${canvas_height}" class="world-grid"/>`
+	var parent_div_tag = '<div style="height:' + canvas_height + 'px;" class="world-grid-parent"></div>'
+
+	var canvas = $(canvas_tag)[0];
+	var parent = $(parent_div_tag)[0];
+
+	$("#elements").append(parent);
+	parent.append(canvas);
+
+	var context = canvas.getContext("2d");
+
+	// Every frame is an image with a pixel per cell, scaled up to the
+	// canvas without smoothing so the cells keep sharp edges.
+	var image = new Image();
+	image.onload = function() {
+		context.imageSmoothingEnabled = false;
+		context.clearRect(0, 0, canvas_width, canvas_height);
+		context.drawImage(image, 0, 0, canvas_width, canvas_height);
+	};
+
+	this.render = function(data) {
+		image.src = data;
+	};
+
+	this.reset = function() {
+		context.clearRect(0, 0, canvas_width, canvas_height);
+	};
+
+};
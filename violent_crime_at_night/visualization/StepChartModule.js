@@ -0,0 +1,62 @@
+var StepChartModule = function(series, canvas_width, canvas_height) {
+	// Create the element
+	// ------------------
+
+	var canvas_tag = "<canvas width='" + canvas_width + "' height='" + canvas_height + "' ";
+	canvas_tag += "style='border:1px dotted'></canvas>";
+	var canvas = $(canvas_tag)[0];
+	$("#elements").append(canvas);
+	var context = canvas.getContext("2d");
+
+	var convertColorOpacity = function(hex) {
+		if (hex.indexOf('#') != 0)
+			return 'rgba(0,0,0,0.1)';
+		hex = hex.replace('#', '');
+		var r = parseInt(hex.substring(0, 2), 16);
+		var g = parseInt(hex.substring(2, 4), 16);
+		var b = parseInt(hex.substring(4, 6), 16);
+		return 'rgba(' + r + ',' + g + ',' + b + ',0.1)';
+	};
+
+	var datasets = [];
+	for (var i = 0; i < series.length; i++) {
+		datasets.push({
+			label: series[i].Label,
+			borderColor: series[i].Color,
+			backgroundColor: convertColorOpacity(series[i].Color),
+			data: []
+		});
+	}
+
+	var chart = new Chart(context, {
+		type: 'line',
+		data: {labels: [], datasets: datasets},
+		options: {
+			responsive: true,
+			tooltips: {mode: 'index', intersect: false},
+			hover: {mode: 'nearest', intersect: true},
+			scales: {
+				xAxes: [{display: true, scaleLabel: {display: true}, ticks: {maxTicksLimit: 11}}],
+				yAxes: [{display: true, scaleLabel: {display: true}}]
+			}
+		}
+	});
+
+	// Every frame holds the values collected since the last one, with
+	// their steps, so the chart is updated once per frame.
+	this.render = function(data) {
+		for (var i = 0; i < data.steps.length; i++) {
+			chart.data.labels.push(data.steps[i]);
+			for (var j = 0; j < data.values.length; j++)
+				chart.data.datasets[j].data.push(data.values[j][i]);
+		}
+		chart.update();
+	};
+
+	this.reset = function() {
+		chart.data.labels = [];
+		chart.data.datasets.forEach(function(dataset) { dataset.data = []; });
+		chart.update();
+	};
+
+};
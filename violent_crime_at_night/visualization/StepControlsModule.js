@@ -0,0 +1,40 @@
+var StepControlsModule = function(render_every, fast_forward_steps) {
+	// Create the element
+	// ------------------
+
+	var controls = $([
+		"<div class='form-inline' style='margin-bottom: 10px;'>",
+		"<label class='label label-primary' style='margin-right: 5px;'>Steps per frame</label>",
+		"<input type='number' min='1' class='form-control input-sm' style='width: 80px; margin-right: 15px;' value='" + render_every + "'/>",
+		"<input type='number' min='1' class='form-control input-sm' style='width: 80px; margin-right: 5px;' value='" + fast_forward_steps + "'/>",
+		"<button type='button' class='btn btn-default btn-sm'>Fast-forward</button>",
+		"</div>"
+	].join(''));
+	$("#elements").append(controls);
+
+	var inputs = controls.find("input");
+	var renderEveryInput = inputs[0];
+	var fastForwardInput = inputs[1];
+
+	renderEveryInput.onchange = function() {
+		send({type: "render_every", value: Math.max(parseInt(renderEveryInput.value) || 1, 1)});
+	};
+
+	controls.find("button")[0].onclick = function() {
+		// Stop first, so the frame sent back does not schedule another step.
+		if (controller.running)
+			controller.stop();
+		if (!controller.finished)
+			send({type: "fast_forward", steps: Math.max(parseInt(fastForwardInput.value) || 0, 0)});
+	};
+
+	// Every frame holds the step of the model, which the step counter
+	// shows instead of the number of frames.
+	this.render = function(step) {
+		controller.tick = step;
+		stepDisplay.innerText = step;
+	};
+
+	this.reset = function() {};
+
+};
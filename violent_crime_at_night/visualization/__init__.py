@@ -0,0 +1,4 @@
+from visualization.delta_canvas import ColorTable, DeltaCanvasGrid
+from visualization.fast_forward import FastForwardServer, StepControls
+from visualization.raster_canvas import RasterCanvas, encode_png
+from visualization.step_chart import StepChartModule
@@ -0,0 +1,108 @@
+from collections import defaultdict
+from colorsys import hls_to_rgb
+
+import numpy as np
+from mesa.visualization.ModularVisualization import VisualizationElement
+from webcolors import rgb_to_hex
+
+
+class ColorTable:
+    """Lookup table of the hex colours of a hue and saturation, for the lightness quantised to
+    levels values between 0 and 1, so colours are never converted while rendering. """
+
+    def __init__(self, hls_color, levels=256):
+        h, _, s = hls_color
+        self.levels = levels
+        self.rgb = np.array([[int(c * 255) for c in hls_to_rgb(h, i / (levels - 1), s)]
+                             for i in range(levels)], dtype=np.uint8)
+        self.colors = np.array([rgb_to_hex(tuple(rgb)) for rgb in self.rgb.tolist()])
+
+    def index(self, lightness):
+        """Return the index in the table of the lightness (a number or an array). """
+        return np.rint(np.clip(lightness, 0, 1) * (self.levels - 1)).astype(int)
+
+    def __getitem__(self, lightness):
+        return str(self.colors[self.index(lightness)])
+
+    def lookup(self, lightness):
+        """Return an array with the colour of every lightness in the array. """
+        return self.colors[self.index(lightness)]
+
+    def lookup_rgb(self, lightness):
+        """Return an array with the (r, g, b) colour of every lightness in the array. """
+        return self.rgb[self.index(lightness)]
+
+
+class DeltaCanvasGrid(VisualizationElement):
+    """A canvas grid which sends the browser only what has changed since the last frame.
+
+    The state of the grid is made of:
+        - the background: a colour per cell, given by background_method(model) as an array
+          indexed as [x, y]. It is assumed to be static, so it is only sent when the model is
+          reset.
+        - the portrayals of each cell: those of the raster layers, given by
+          cell_portrayal_method(model) as (pos, portrayal) pairs; those of the scheduled agents,
+          given by portrayal_method(agent); and those of the agents which are not scheduled,
+          given by model_portrayal_method(model) as (pos, portrayal) pairs.
+
+    Every frame only includes the cells whose portrayals have changed, and the cells which no
+    longer have any. The deltas are relative to the last frame rendered, so the element
+    supports a single browser at a time.
+    """
+
+    package_includes = ["GridDraw.js", "InteractionHandler.js"]
+    local_includes = ["visualization/DeltaCanvasModule.js"]
+
+    def __init__(self, portrayal_method, grid_width, grid_height, canvas_width=500,
+                 canvas_height=500, background_method=None, cell_portrayal_method=None,
+                 model_portrayal_method=None):
+        super().__init__()
+        self.portrayal_method = portrayal_method
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.canvas_width = canvas_width
+        self.canvas_height = canvas_height
+        self.background_method = background_method
+        self.cell_portrayal_method = cell_portrayal_method
+        self.model_portrayal_method = model_portrayal_method
+
+        # Model of the last frame, and the portrayals of its cells.
+        self.model = None
+        self.cells = {}
+
+        new_element = "new DeltaCanvasModule({}, {}, {}, {})".format(
+            self.canvas_width, self.canvas_height, self.grid_width, self.grid_height
+        )
+        self.js_code = "elements.push(" + new_element + ");"
+
+    def cell_portrayals(self, model):
+        """Return the portrayals of every cell which has any, keyed by position. """
+        cells = defaultdict(list)
+        if self.cell_portrayal_method is not None:
+            for pos, portrayal in self.cell_portrayal_method(model):
+                cells[tuple(pos)].append(portrayal)
+        for agent in model.schedule.agents:
+            portrayal = self.portrayal_method(agent)
+            if portrayal and agent.pos is not None:
+                cells[tuple(agent.pos)].append(portrayal)
+        if self.model_portrayal_method is not None:
+            for pos, portrayal in self.model_portrayal_method(model):
+                cells[tuple(pos)].append(portrayal)
+        return cells
+
+    def render(self, model):
+        cells = self.cell_portrayals(model)
+
+        data = {}
+        if model is not self.model:
+            # A new model: send the background, and every cell.
+            self.model = model
+            self.cells = {}
+            if self.background_method is not None:
+                data["background"] = self.background_method(model).tolist()
+
+        data["changed"] = [[x, y, portrayals] for (x, y), portrayals in cells.items()
+                           if self.cells.get((x, y)) != portrayals]
+        data["removed"] = [[x, y] for (x, y) in self.cells if (x, y) not in cells]
+        self.cells = cells
+        return data
@@ -0,0 +1,84 @@
+import tornado.escape
+from mesa.visualization.ModularVisualization import ModularServer, SocketHandler, VisualizationElement
+
+
+class FastForwardSocketHandler(SocketHandler):
+    """Handler of the websocket of a FastForwardServer. On top of the messages of mesa's
+    handler, it handles:
+        - "render_every": set the number of steps the model advances for every frame.
+        - "fast_forward": advance the model by the number of steps given, then render a frame.
+    """
+
+    def on_message(self, message):
+        msg = tornado.escape.json_decode(message)
+        application = self.application
+
+        if msg["type"] == "get_step":
+            if application.verbose:
+                print(message)
+            if not application.model.running:
+                self.write_message({"type": "end"})
+            else:
+                application.step_model(application.render_every)
+                self.write_message(self.viz_state_message)
+
+        elif msg["type"] == "render_every":
+            if application.verbose:
+                print(message)
+            application.render_every = max(int(msg["value"]), 1)
+
+        elif msg["type"] == "fast_forward":
+            if application.verbose:
+                print(message)
+            application.step_model(max(int(msg["steps"]), 0))
+            self.write_message(self.viz_state_message)
+            if not application.model.running:
+                self.write_message({"type": "end"})
+
+        else:
+            super().on_message(message)
+
+
+class FastForwardServer(ModularServer):
+    """A ModularServer which can advance the model by several steps for every frame it renders,
+    and fast-forward the model by any number of steps without rendering them.
+
+    The steps which are not rendered are still collected by the model's data collector, so
+    charts which are sent every value since the last frame (StepChartModule) keep every
+    datapoint. The page controls are added by a StepControls element.
+    """
+
+    socket_handler = (r"/ws", FastForwardSocketHandler)
+    handlers = [ModularServer.page_handler, socket_handler, ModularServer.static_handler,
+                ModularServer.local_handler]
+
+    def __init__(self, model_cls, visualization_elements, name="Mesa Model", model_params={},
+                 render_every=1):
+        self.render_every = render_every
+        super().__init__(model_cls, visualization_elements, name, model_params)
+
+    def step_model(self, n_steps):
+        """Advance the model by n_steps steps, without rendering them, or until it stops running. """
+        for _ in range(n_steps):
+            if not self.model.running:
+                break
+            self.model.step()
+
+
+class StepControls(VisualizationElement):
+    """Controls of a FastForwardServer: the number of steps to advance for every frame, and a
+    button to fast-forward the model. It also shows the step of the model in the step counter
+    of the page, as the page only counts the frames. """
+
+    local_includes = ["visualization/StepControlsModule.js"]
+
+    def __init__(self, render_every=1, fast_forward_steps=100):
+        super().__init__()
+        self.render_every = render_every
+        self.fast_forward_steps = fast_forward_steps
+
+        new_element = "new StepControlsModule({}, {})".format(self.render_every, self.fast_forward_steps)
+        self.js_code = "elements.push(" + new_element + ");"
+
+    def render(self, model):
+        return model.schedule.steps
@@ -0,0 +1,53 @@
+import base64
+import struct
+import zlib
+
+import numpy as np
+from mesa.visualization.ModularVisualization import VisualizationElement
+
+
+def encode_png(image, level=6):
+    """Encode a (height, width, 3) uint8 array of rgb pixels as a PNG file, and return its bytes. """
+    height, width, _ = image.shape
+
+    # Every row of pixels is preceded by its filter type, 0 (none).
+    rows = np.zeros((height, 1 + 3 * width), dtype=np.uint8)
+    rows[:, 1:] = image.reshape(height, 3 * width)
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows.tobytes(), level))
+            + chunk(b"IEND", b""))
+
+
+class RasterCanvas(VisualizationElement):
+    """A canvas which shows the grid as a single image, with a pixel per cell.
+
+    frame_method(model) returns the rgb colour of every cell, as a (width, height, 3) uint8
+    array indexed as [x, y]. Every frame is sent to the browser as a PNG image, which is scaled
+    up to the size of the canvas, so its cost depends on the size of the grid rather than on
+    the number of agents.
+    """
+
+    local_includes = ["visualization/RasterCanvasModule.js"]
+
+    def __init__(self, frame_method, grid_width, grid_height, canvas_width=500, canvas_height=500):
+        super().__init__()
+        self.frame_method = frame_method
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.canvas_width = canvas_width
+        self.canvas_height = canvas_height
+
+        new_element = "new RasterCanvasModule({}, {})".format(self.canvas_width, self.canvas_height)
+        self.js_code = "elements.push(" + new_element + ");"
+
+    def render(self, model):
+        frame = self.frame_method(model)
+
+        # Image rows go from the top of the grid (the highest y) to the bottom.
+        image = np.ascontiguousarray(frame.transpose(1, 0, 2)[::-1])
+        return "data:image/png;base64," + base64.b64encode(encode_png(image)).decode("ascii")
@@ -0,0 +1,42 @@
+import math
+
+from mesa.visualization.modules import ChartModule
+
+
+def json_values(values):
+    """Return the array of values as a list, with None for the values JSON can not hold (NaN,
+    such as the missing values of a reporter, and infinities). """
+    return [value if math.isfinite(value) else None for value in values.tolist()]
+
+
+class StepChartModule(ChartModule):
+    """A line chart which is sent every value collected since the last frame, with its step,
+    rather than only the latest value. The chart therefore has every datapoint when the model
+    advances several steps per frame.
+
+    The data collector must hold the step of every collection in a steps column, as the
+    ColumnarDataCollector does.
+    """
+
+    package_includes = ["Chart.min.js"]
+    local_includes = ["visualization/StepChartModule.js"]
+
+    def __init__(self, series, canvas_height=200, canvas_width=500, data_collector_name="datacollector"):
+        super().__init__(series, canvas_height, canvas_width, data_collector_name)
+        self.js_code = self.js_code.replace("new ChartModule(", "new StepChartModule(")
+
+        # Model of the last frame, and the number of values sent for it.
+        self.model = None
+        self.sent = 0
+
+    def render(self, model):
+        data_collector = getattr(model, self.data_collector_name)
+        if model is not self.model:
+            self.model = model
+            self.sent = 0
+
+        start, stop = self.sent, len(data_collector.steps)
+        self.sent = stop
+        return {"steps": data_collector.steps.read(start, stop).tolist(),
+                "values": [json_values(data_collector.model_vars[s["Label"]].read(start, stop))
+                           for s in self.series]}